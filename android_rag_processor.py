@@ -1,15 +1,26 @@
+from __future__ import annotations
+
 import os
 import json
+import uuid
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional, Tuple
 from dotenv import load_dotenv
-import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
-import tqdm
+from file_table import FileTable
+from kotlin_dependency_graph import KotlinDependencyGraph
+from profiling import profiler
+from telemetry import telemetry
+from token_accounting import accountant, BudgetExceededError
+from token_utils import CHARS_PER_TOKEN
+from unified_store import UnifiedStore, chunk_counts, record_id, unified_layout, unified_store_path
+
+# LangChain, Chroma and tqdm are imported where they are first used, so importing this module stays cheap
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+    from langchain.schema import Document
+
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,7 +32,9 @@ class AndroidProjectRAGProcessor:
     Processes all relevant files in the Android project and stores them in a vector database.
     """
     
-    def __init__(self, project_path: str = "ANDROID_APP"):
+    def __init__(self, project_path: str = "ANDROID_APP", embeddings: Any = None):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         load_dotenv()
         
         self.project_path = Path(project_path)
@@ -36,11 +49,16 @@ class AndroidProjectRAGProcessor:
         # Patterns to exclude
         self.exclude_patterns = os.getenv("EXCLUDE_PATTERNS", "__pycache__,*.pyc,.git,node_modules").split(",")
         
-        # Initialize OpenAI embeddings
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model="text-embedding-3-small"
-        )
+        # Initialize OpenAI embeddings (any LangChain embeddings object can be passed instead)
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            embeddings = OpenAIEmbeddings(
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                model=EMBEDDING_MODEL
+            )
+        # Every embedding call is checked against the token budgets and metered
+        self.embedding_model = getattr(embeddings, "model", EMBEDDING_MODEL)
+        self.embeddings = accountant.meter_embeddings(embeddings, "rag", self.embedding_model)
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -50,9 +68,37 @@ class AndroidProjectRAGProcessor:
             separators=["\n\n", "\n", " ", ""]
         )
         
-        # Initialize vector store
+        # Initialize vector store (with STORE_LAYOUT=unified, the chunks namespace of the unified store)
+        self.unified = unified_layout()
+        self.store_path = unified_store_path()
+        self._store: Optional[UnifiedStore] = None
         self.vector_store = None
+        # With INDEX_SNAPSHOT set, queries are served read-only from that snapshot file
+        self.snapshot_path = os.getenv("INDEX_SNAPSHOT")
+        self._snapshot = None
+        # Documents from the last run_full_processing, kept for in-process pipelines
+        self.documents: List[Document] = []
+        
+        # Kotlin import/reference graph used for graph-expanded retrieval
+        self.dependency_graph = KotlinDependencyGraph(os.getenv("DEPENDENCY_GRAPH_PATH", "./dependency_graph.json"))
         
+    @property
+    def store(self) -> UnifiedStore:
+        """The unified store, opened on first use."""
+        if self._store is None:
+            self._store = UnifiedStore(self.store_path, embeddings=self.embeddings)
+        return self._store
+    
+    @property
+    def file_table(self) -> FileTable:
+        """File attributes referenced by the stored chunks, kept next to the store."""
+        return FileTable.for_store(self.store_path if self.unified else self.vector_db_path)
+    
+    def _stored_metadatas(self, documents: List[Document]) -> List[Dict[str, Any]]:
+        """Compact metadata to write for `documents`, after persisting the file entries it refers to."""
+        self.file_table.flush()
+        return [FileTable.compact(doc.metadata) for doc in documents]
+    
     def get_relevant_files(self) -> List[Path]:
         """
         Recursively find all relevant files in the Android project.
@@ -72,6 +118,7 @@ class AndroidProjectRAGProcessor:
                         relevant_files.append(file_path)
                         
         logger.info(f"Found {len(relevant_files)} relevant files to process")
+        telemetry.gauge("files_discovered", len(relevant_files))
         return relevant_files
     
     def read_file_content(self, file_path: Path) -> Optional[str]:
@@ -130,6 +177,8 @@ class AndroidProjectRAGProcessor:
         """
         Process a single file and return a list of Document objects.
         """
+        from langchain.schema import Document
+
         content = self.read_file_content(file_path)
         if not content:
             return []
@@ -145,12 +194,22 @@ class AndroidProjectRAGProcessor:
             # If splitting fails, use the whole content as one chunk
             chunks = [content]
         
+        # File attributes are stored once in the file table; chunks are stored with the file id and offsets
+        file_id = self.file_table.register({**metadata, "total_chunks": len(chunks)})
+        
         # Create Document objects
         documents = []
+        offset = 0
         for i, chunk in enumerate(chunks):
+            start = content.find(chunk, offset)
+            if start != -1:
+                offset = start + 1
             doc_metadata = metadata.copy()
+            doc_metadata["file_id"] = file_id
             doc_metadata["chunk_index"] = i
             doc_metadata["total_chunks"] = len(chunks)
+            doc_metadata["start"] = start
+            doc_metadata["end"] = start + len(chunk) if start != -1 else -1
             
             document = Document(
                 page_content=chunk,
@@ -158,40 +217,128 @@ class AndroidProjectRAGProcessor:
             )
             documents.append(document)
         
+        telemetry.incr("files_processed", language=metadata["language"])
+        telemetry.incr("chunks", len(documents), language=metadata["language"])
         return documents
     
-    def process_project(self) -> List[Document]:
+    def iter_project(self, relevant_files: Optional[List[Path]] = None) -> Iterator[Tuple[Path, List[Document]]]:
         """
-        Process all relevant files in the Android project.
+        Process the project file by file, yielding each file's documents as soon as they are ready.
         """
-        relevant_files = self.get_relevant_files()
-        all_documents = []
-        
+        import tqdm
+
+        relevant_files = relevant_files if relevant_files is not None else self.get_relevant_files()
         logger.info(f"Processing {len(relevant_files)} files...")
         
         for file_path in tqdm.tqdm(relevant_files, desc="Processing files"):
             try:
                 documents = self.process_file(file_path)
-                all_documents.extend(documents)
                 logger.debug(f"Processed {file_path}: {len(documents)} chunks")
             except Exception as e:
                 logger.error(f"Error processing {file_path}: {e}")
+                continue
+            yield file_path, documents
+    
+    def process_project(self, relevant_files: Optional[List[Path]] = None) -> List[Document]:
+        """
+        Process all relevant files in the Android project.
+        """
+        all_documents = []
+        for _, documents in self.iter_project(relevant_files):
+            all_documents.extend(documents)
         
         logger.info(f"Total documents created: {len(all_documents)}")
         return all_documents
     
+    def add_documents(self, documents: List[Document], vectors: Optional[List[List[float]]] = None) -> List[List[float]]:
+        """
+        Embed documents and append them to the vector store (opened on first use).
+        Precomputed `vectors` (e.g. from a snapshot) are stored as they are instead.
+        Returns the vectors so later stages can store them without embedding again.
+        """
+        from langchain_community.vectorstores import Chroma
+
+        if not documents:
+            return []
+        if self.unified:
+            # Chunks already stored with the same text keep their vectors and are not embedded again
+            vectors = self.store.add("chunks", [record_id(doc.metadata) for doc in documents],
+                                     [doc.page_content for doc in documents], self._stored_metadatas(documents),
+                                     embeddings=vectors)
+            # Chunks past a re-ingested file's new chunk count would otherwise linger
+            self.store.prune("chunks", chunk_counts(doc.metadata for doc in documents))
+            self.vector_store = self.store.namespace("chunks")
+            return vectors
+        if self.vector_store is None:
+            self.vector_store = Chroma(
+                persist_directory=self.vector_db_path,
+                embedding_function=self.embeddings
+            )
+        
+        texts = [doc.page_content for doc in documents]
+        if vectors is None:
+            with telemetry.timer("embedding_seconds", store="chunks"):
+                vectors = self.embeddings.embed_documents(texts)
+        with telemetry.timer("store_write_seconds", store="chunks"):
+            self.vector_store._collection.add(
+                ids=[str(uuid.uuid4()) for _ in documents],
+                embeddings=vectors,
+                documents=texts,
+                metadatas=self._stored_metadatas(documents)
+            )
+        return vectors
+    
+    def remove_deleted_files(self, relevant_files: List[Path]) -> int:
+        """
+        Delete the stored records of files that are no longer part of the project
+        (unified store only). Returns the number of records deleted.
+        """
+        if not self.unified:
+            return 0
+        current = {str(file_path.relative_to(self.project_path)) for file_path in relevant_files}
+        current.add("FILE_STRUCTURE_TREE")
+        removed = [file_id for file_path, file_id in self.file_table.ids.items() if file_path not in current]
+        deleted = self.store.remove_files(removed)
+        if deleted:
+            logger.info(f"Removed {deleted} records of {len(removed)} deleted files from the unified store")
+        return deleted
+    
+    def estimate_embedding_tokens(self, relevant_files: Optional[List[Path]] = None) -> int:
+        """
+        Dry-run estimate of the tokens embedding the project will take, from file sizes alone:
+        chunk overlap is embedded twice, so the estimate grows with CHUNK_OVERLAP.
+        """
+        relevant_files = relevant_files if relevant_files is not None else self.get_relevant_files()
+        total_chars = sum(os.path.getsize(file_path) for file_path in relevant_files)
+        overlap_factor = self.chunk_size / max(1, self.chunk_size - self.chunk_overlap)
+        return int(total_chars * overlap_factor / CHARS_PER_TOKEN)
+    
+    def preflight_embedding(self, relevant_files: Optional[List[Path]] = None) -> Dict[str, Any]:
+        """Fail fast with BudgetExceededError when embedding the project would exceed the budgets."""
+        tokens = self.estimate_embedding_tokens(relevant_files)
+        return accountant.preflight("rag", {self.embedding_model: (tokens, 0)})
+    
     def create_vector_store(self, documents: List[Document]) -> Chroma:
         """
         Create and populate the vector store with documents.
         """
+        from langchain_community.vectorstores import Chroma
+
         logger.info("Creating vector store...")
         
-        # Create vector store
-        vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory=self.vector_db_path
-        )
+        if self.unified:
+            self.add_documents(documents)
+            logger.info(f"Chunks stored in the unified store at {self.store.path}")
+            return self.vector_store
+        
+        # Create vector store (embedding happens inside, so the write time includes it)
+        with telemetry.timer("store_write_seconds", store="chunks"):
+            vector_store = Chroma.from_texts(
+                texts=[doc.page_content for doc in documents],
+                embedding=self.embeddings,
+                metadatas=self._stored_metadatas(documents),
+                persist_directory=self.vector_db_path
+            )
         
         # Persist the vector store
         vector_store.persist()
@@ -203,6 +350,26 @@ class AndroidProjectRAGProcessor:
         """
         Load existing vector store.
         """
+        from langchain_community.vectorstores import Chroma
+
+        if self.snapshot_path:
+            if self._snapshot is None:
+                from index_snapshot import IndexSnapshot, chunking_config
+
+                if not os.path.exists(self.snapshot_path):
+                    logger.warning(f"No index snapshot found at {self.snapshot_path}")
+                    return None
+                # Refuses snapshots embedded with another model
+                self._snapshot = IndexSnapshot(self.snapshot_path, embeddings=self.embeddings,
+                                               embedding_model=self.embedding_model,
+                                               chunking=chunking_config(self))
+                logger.info(f"Loaded index snapshot {self.snapshot_path}")
+            return self._snapshot
+        if self.unified:
+            if not os.path.exists(self.store_path):
+                logger.warning("No existing unified store found")
+                return None
+            return self.store.namespace("chunks")
         if os.path.exists(self.vector_db_path):
             vector_store = Chroma(
                 persist_directory=self.vector_db_path,
@@ -214,9 +381,10 @@ class AndroidProjectRAGProcessor:
             logger.warning("No existing vector store found")
             return None
     
-    def query_knowledge_base(self, query: str, k: int = 5) -> List[Document]:
+    def query_knowledge_base(self, query: str, k: int = 5, namespaces: Optional[List[str]] = None) -> List[Document]:
         """
-        Query the knowledge base for relevant documents.
+        Query the knowledge base for relevant documents. With the unified store, `namespaces`
+        (e.g. ["chunks", "components"]) searches several namespaces in one query.
         """
         vector_store = self.load_vector_store()
         if not vector_store:
@@ -224,24 +392,78 @@ class AndroidProjectRAGProcessor:
             return []
         
         try:
-            results = vector_store.similarity_search(query, k=k)
+            with telemetry.span("query", k=k) as span:
+                if self.unified and namespaces and not self.snapshot_path:
+                    results = self.store.similarity_search(query, k=k, namespaces=namespaces)
+                else:
+                    results = vector_store.similarity_search(query, k=k)
+                for doc in results:
+                    doc.metadata = self.file_table.hydrate(doc.metadata)
+                span.set("results", len(results))
+            telemetry.observe("query_seconds", span.duration)
             return results
         except Exception as e:
             logger.error(f"Error querying vector store: {e}")
             return []
     
+    def get_file_documents(self, file_paths: List[str], max_chunks_per_file: int = 2) -> List[Document]:
+        """
+        Fetch stored chunks for the given files with a metadata lookup (no vector search).
+        """
+        from langchain.schema import Document
+
+        if not file_paths:
+            return []
+        
+        vector_store = self.vector_store or self.load_vector_store()
+        if not vector_store:
+            return []
+        
+        try:
+            # A snapshot resolves paths through the file table it carries
+            file_ids = [] if self.snapshot_path else self.file_table.ids_for(file_paths)
+            if file_ids:
+                where = {"file_id": file_ids[0]} if len(file_ids) == 1 else {"file_id": {"$in": file_ids}}
+            else:
+                # Stores written before the file table keep the path in every chunk
+                where = {"file_path": file_paths[0]} if len(file_paths) == 1 else {"file_path": {"$in": list(file_paths)}}
+            docs = vector_store.get(where=where)
+        except Exception as e:
+            logger.error(f"Error fetching documents for {file_paths}: {e}")
+            return []
+        
+        # Keep the first chunks of each file, in the requested file order
+        by_file: Dict[str, List[Document]] = {}
+        for doc_text, meta in zip(docs["documents"], docs["metadatas"]):
+            meta = self.file_table.hydrate(meta)
+            by_file.setdefault(meta.get("file_path", ""), []).append(Document(page_content=doc_text, metadata=meta))
+        
+        documents = []
+        for file_path in file_paths:
+            chunks = sorted(by_file.get(file_path, []), key=lambda d: d.metadata.get("chunk_index", 0))
+            documents.extend(chunks[:max_chunks_per_file])
+        return documents
+    
+    def get_related_files(self, file_paths: List[str], limit: int = 3) -> List[str]:
+        """
+        Get the 1-hop dependency graph neighbours of the given files.
+        """
+        if not self.dependency_graph.files and not self.dependency_graph.load():
+            logger.warning("No dependency graph available")
+            return []
+        return self.dependency_graph.neighbors(file_paths, limit=limit)
+    
     def get_project_summary(self) -> Dict[str, Any]:
         """
         Get a summary of the processed project.
         """
-        vector_store = self.load_vector_store()
+        vector_store = self.vector_store or self.load_vector_store()
         if not vector_store:
             return {"error": "No vector store available"}
         
         try:
             # Get collection info
-            collection = vector_store._collection
-            count = collection.count()
+            count = vector_store._collection.count() if hasattr(vector_store, "_collection") else vector_store.count()
             
             # Get unique file types
             file_types = set()
@@ -251,7 +473,7 @@ class AndroidProjectRAGProcessor:
             # For now, we'll return basic info
             summary = {
                 "total_documents": count,
-                "vector_db_path": self.vector_db_path,
+                "vector_db_path": self.snapshot_path or (self.store_path if self.unified else self.vector_db_path),
                 "project_path": str(self.project_path),
                 "chunk_size": self.chunk_size,
                 "chunk_overlap": self.chunk_overlap
@@ -281,6 +503,8 @@ class AndroidProjectRAGProcessor:
         """
         Create a Document object for the file structure tree.
         """
+        from langchain.schema import Document
+
         tree_str = self.generate_file_structure_tree()
         metadata = {
             "file_path": "FILE_STRUCTURE_TREE",
@@ -292,12 +516,21 @@ class AndroidProjectRAGProcessor:
             "directory": "",
             "description": "This document contains the file structure tree of the project."
         }
+        metadata["file_id"] = self.file_table.register({**metadata, "total_chunks": 1})
         return Document(page_content=tree_str, metadata=metadata)
 
     def create_file_structure_vector_store(self, file_structure_doc: Document) -> Chroma:
         """
         Create and persist a vector store for the file structure tree document only.
         """
+        from langchain_community.vectorstores import Chroma
+
+        if self.unified:
+            # The tree is already a record of the chunks namespace: joining structure reuses its vector
+            self.store.add("structure", [record_id(file_structure_doc.metadata)],
+                           [file_structure_doc.page_content], self._stored_metadatas([file_structure_doc]))
+            return self.store.namespace("structure")
+        
         # Save in a separate directory at the same level as the main vector_db
         file_structure_db_path = "./file_structure_tree_db"
         logger.info(f"Creating file structure tree vector store at {file_structure_db_path}...")
@@ -309,11 +542,13 @@ class AndroidProjectRAGProcessor:
             logger.info(f"File structure tree content length: {len(file_structure_doc.page_content)}")
             logger.info(f"File structure tree metadata: {file_structure_doc.metadata}")
             
-            vector_store = Chroma.from_documents(
-                documents=[file_structure_doc],
-                embedding=self.embeddings,
-                persist_directory=file_structure_db_path
-            )
+            with telemetry.timer("store_write_seconds", store="structure"):
+                vector_store = Chroma.from_texts(
+                    texts=[file_structure_doc.page_content],
+                    embedding=self.embeddings,
+                    metadatas=self._stored_metadatas([file_structure_doc]),
+                    persist_directory=file_structure_db_path
+                )
             vector_store.persist()
             
             # Verify the store has documents
@@ -335,19 +570,31 @@ class AndroidProjectRAGProcessor:
         """
         logger.info("Starting Android project RAG processing...")
         
+        # Refuse to start when the estimate alone exceeds the embedding budget
+        relevant_files = self.get_relevant_files()
+        self.preflight_embedding(relevant_files)
+        
         # Process all files
-        documents = self.process_project()
+        documents = self.process_project(relevant_files)
         
         if not documents:
             logger.error("No documents were processed!")
             return
         
+        # Keep the Kotlin dependency graph in sync (only changed files are re-parsed)
+        try:
+            self.dependency_graph.update_from_project(self.project_path, self.get_relevant_files())
+        except Exception as e:
+            logger.warning(f"Could not update dependency graph: {e}")
+        
         # Add file structure tree as a special document to the main RAG
         file_structure_doc = self.create_file_structure_document()
         documents.append(file_structure_doc)
         
         # Create vector store for all documents (including file structure tree)
         self.vector_store = self.create_vector_store(documents)
+        self.documents = documents
+        self.remove_deleted_files(relevant_files)
         
         # Also create a separate vector store for just the file structure tree
         self.create_file_structure_vector_store(file_structure_doc)
@@ -371,12 +618,21 @@ def main():
         logger.info("Please set your OpenAI API key in the .env file")
         return
     
+    profiler.start_from_argv()
+    
     # Initialize processor
     processor = AndroidProjectRAGProcessor()
     
     # Run full processing
-    vector_store = processor.run_full_processing()
+    try:
+        with profiler.stage("rag"):
+            vector_store = processor.run_full_processing()
+    except BudgetExceededError as e:
+        logger.error(f"❌ {e}")
+        vector_store = None
     
+    accountant.log_summary()
+    telemetry.export()
     if vector_store:
         logger.info("✅ RAG processing completed successfully!")
         logger.info("You can now query the knowledge base using the query_knowledge_base method")
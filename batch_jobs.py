@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Batch Translation Jobs
+Reads and writes translation requests as JSONL in the OpenAI Batch API format,
+so every prompt can be submitted as one offline job instead of hundreds of
+interactive calls. Includes a local executor backed by a fake chat model for
+running the whole round trip offline.
+"""
+
+import sys
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Returned by the local executor when no responses are given
+DEFAULT_FAKE_RESPONSE = """```swift
+import Foundation
+
+struct TranslatedComponent {
+}
+```"""
+
+
+def batch_request(custom_id: str, prompt: str, model: str, temperature: float) -> Dict:
+    """One chat completion request line of a batch job file."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}],
+        },
+    }
+
+
+def write_batch_file(path: str, records: Iterable[Dict]) -> int:
+    """Write request or result lines to a JSONL batch file atomically. Returns the number of lines."""
+    lines = [json.dumps(record) for record in records]
+    atomic_write_text(path, "".join(line + "\n" for line in lines))
+    return len(lines)
+
+
+def read_batch_requests(jobs_path: str) -> List[Dict]:
+    """Request lines of a JSONL job file."""
+    with open(jobs_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_batch_results(results_path: str) -> Dict[str, Dict]:
+    """
+    Map custom_id -> {"content", "usage", "error"} from a batch results file.
+    Malformed lines are skipped; failed requests have "content" set to None.
+    """
+    results = {}
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                custom_id = record["custom_id"]
+            except (ValueError, KeyError):
+                logger.warning(f"Skipping malformed result line {line_number} in {results_path}")
+                continue
+
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            error = record.get("error") or body.get("error")
+            content = None
+            if not error and response.get("status_code", 200) == 200:
+                try:
+                    content = body["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError):
+                    error = {"message": "response has no message content"}
+
+            results[custom_id] = {"content": content, "usage": body.get("usage") or {}, "error": error}
+    return results
+
+
+def batch_result(custom_id: str, content: Optional[str] = None, model: str = "",
+                 usage: Optional[Dict] = None, error: Optional[str] = None) -> Dict:
+    """One result line in the OpenAI Batch API output format."""
+    if error is not None:
+        return {"id": f"batch_req_{custom_id}", "custom_id": custom_id, "response": None,
+                "error": {"code": "local_error", "message": error}}
+    return {
+        "id": f"batch_req_{custom_id}",
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "body": {
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage or {},
+            },
+        },
+        "error": None,
+    }
+
+
+class LocalBatchExecutor:
+    """
+    Runs a batch job file against a chat model in-process and writes a results file.
+    Defaults to a fake chat model so batch mode can be exercised without an API key.
+    """
+
+    def __init__(self, llm: Any = None, responses: Optional[List[str]] = None):
+        if llm is None:
+            from langchain_core.language_models.fake_chat_models import FakeListChatModel
+            llm = FakeListChatModel(responses=responses or [DEFAULT_FAKE_RESPONSE])
+        self.llm = llm
+
+    def run(self, jobs_path: str, results_path: str) -> Dict[str, int]:
+        """Execute every request in `jobs_path` and write the results to `results_path`."""
+        stats = {"requests": 0, "succeeded": 0, "failed": 0}
+        results = []
+        for request in read_batch_requests(jobs_path):
+            stats["requests"] += 1
+            custom_id = request["custom_id"]
+            body = request.get("body", {})
+            prompt = "\n\n".join(message["content"] for message in body.get("messages", []))
+            try:
+                message = self.llm.invoke(prompt)
+            except Exception as e:
+                logger.error(f"Local batch request {custom_id} failed: {e}")
+                results.append(batch_result(custom_id, error=str(e)))
+                stats["failed"] += 1
+                continue
+
+            usage = getattr(message, "usage_metadata", None) or {}
+            results.append(batch_result(custom_id, message.content, body.get("model", ""), {
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+            }))
+            stats["succeeded"] += 1
+
+        write_batch_file(results_path, results)
+        logger.info(f"Local batch run: {stats}")
+        return stats
+
+
+def main():
+    """Write, execute locally or ingest a batch translation job."""
+    usage = ("Usage: batch_jobs.py write [jobs.jsonl]\n"
+             "       batch_jobs.py run-local [jobs.jsonl] [results.jsonl]\n"
+             "       batch_jobs.py ingest [results.jsonl] [output_dir]")
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    print("📦 Batch Translation Jobs")
+    print("=" * 40)
+
+    if command == "run-local":
+        jobs_path = sys.argv[2] if len(sys.argv) > 2 else "./translation_batch.jsonl"
+        results_path = sys.argv[3] if len(sys.argv) > 3 else "./translation_batch_results.jsonl"
+        stats = LocalBatchExecutor().run(jobs_path, results_path)
+        print(f"✅ {stats['succeeded']}/{stats['requests']} requests succeeded, results in {results_path}")
+        return
+
+    if command in ("write", "ingest"):
+        from kotlin_to_swift_translator import KotlinToSwiftTranslator
+        translator = KotlinToSwiftTranslator()
+        if command == "write":
+            jobs_path = sys.argv[2] if len(sys.argv) > 2 else "./translation_batch.jsonl"
+            manifest = translator.write_batch_jobs(jobs_path)
+            print(f"✅ {manifest['request_count']} requests for {len(manifest['components'])} components written to {jobs_path}")
+        else:
+            results_path = sys.argv[2] if len(sys.argv) > 2 else "./translation_batch_results.jsonl"
+            output_dir = sys.argv[3] if len(sys.argv) > 3 else "./swift_output"
+            translations = translator.ingest_batch_results(results_path, output_dir=output_dir)
+            print(f"✅ Wrote {len(translations)} Swift files to {output_dir}")
+        return
+
+    print(usage)
+
+
+if __name__ == "__main__":
+    main()
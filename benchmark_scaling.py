@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Scaling Benchmark
+Generates synthetic Android projects of increasing size and runs every
+pipeline stage on them with a fake embedding provider: discovery, splitting,
+dedupe, embedding, store writes, extraction, querying and cleaning.
+Throughput, latency percentiles and peak RSS per stage are reported as JSON
+for regression tracking. Each project size runs in its own process so peak
+RSS is not inherited from a smaller run.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import resource
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from file_table import FileTable
+from file_utils import atomic_write_text, sha256_text
+from synthetic_project import generate_project
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+EMBEDDING_SIZE = 1536
+EMBEDDING_BATCH_SIZE = 256
+STORE_BATCH_SIZE = 1000
+QUERIES = [
+    "How does the quiz functionality work?",
+    "What activities are in the app?",
+    "How is the score stored?",
+    "Which view model tracks the timer?",
+    "Where are the colors defined?",
+]
+QUERY_REPEATS = 4
+# Throughput drop (fraction) reported as a regression when comparing with a baseline
+REGRESSION_TOLERANCE = 0.2
+
+# Fake LLM output per translated component; cleaning has to strip the markdown around it
+FAKE_TRANSLATION = """# Swift Translation
+
+**Component:** {name}
+
+```swift
+import SwiftUI
+
+struct {name}: View {{
+    var body: some View {{
+        Text("{name}")
+    }}
+}}
+```
+"""
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(samples: List[float]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99 of latency samples in milliseconds (nearest rank)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99), "max": round(ordered[-1] * 1000, 3)}
+
+
+class StageTimer:
+    """Collects wall time, per-item latencies and peak RSS for one stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.samples: List[float] = []
+        self.started = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.started
+
+    def sample(self, started: float, items: int = 1):
+        """Record one timed call that handled `items` items."""
+        self.samples.append(time.perf_counter() - started)
+        self.items += items
+
+    def report(self) -> Dict:
+        return {
+            "items": self.items,
+            "seconds": round(self.seconds, 4),
+            "items_per_second": round(self.items / self.seconds, 1) if self.seconds else None,
+            "latency_ms": percentiles(self.samples),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def run_size(file_count: int, work_dir: str, seed: int = 0) -> Dict:
+    """Generate a project of `file_count` files in `work_dir` and benchmark every stage on it."""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_community.vectorstores import Chroma
+    from android_rag_processor import AndroidProjectRAGProcessor
+    from component_extractor import ComponentExtractor
+    from clean_swift_files import clean_swift_directory
+
+    # Per-chunk info logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    project_path = os.path.join(work_dir, "project")
+    generated = generate_project(project_path, file_count, seed)
+    embeddings = DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+    processor = AndroidProjectRAGProcessor(project_path, embeddings=embeddings)
+    processor.vector_db_path = os.path.join(work_dir, "vector_db")
+    extractor = ComponentExtractor(main_db_path=processor.vector_db_path,
+                                   component_db_path=os.path.join(work_dir, "component_vector_db"),
+                                   embeddings=embeddings)
+    stages: Dict[str, Dict] = {}
+
+    with StageTimer("discovery") as stage:
+        started = time.perf_counter()
+        files = processor.get_relevant_files()
+        stage.sample(started, len(files))
+    stages["discovery"] = stage.report()
+
+    documents = []
+    with StageTimer("splitting") as stage:
+        for file_path in files:
+            started = time.perf_counter()
+            file_documents = processor.process_file(file_path)
+            stage.sample(started)
+            documents.extend(file_documents)
+    stages["splitting"] = stage.report()
+    stages["splitting"]["chunks"] = len(documents)
+
+    seen = set()
+    unique = []
+    with StageTimer("dedupe") as stage:
+        for document in documents:
+            digest = sha256_text(document.page_content)
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(document)
+        stage.items = len(documents)
+    stages["dedupe"] = stage.report()
+    stages["dedupe"]["duplicates"] = len(documents) - len(unique)
+
+    texts = [document.page_content for document in documents]
+    vectors: List[List[float]] = []
+    with StageTimer("embedding") as stage:
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            started = time.perf_counter()
+            vectors.extend(embeddings.embed_documents(batch))
+            stage.sample(started, len(batch))
+    stages["embedding"] = stage.report()
+
+    with StageTimer("store_writes") as stage:
+        processor.file_table.flush()
+        store = Chroma(persist_directory=processor.vector_db_path, embedding_function=embeddings)
+        for start in range(0, len(documents), STORE_BATCH_SIZE):
+            batch = documents[start:start + STORE_BATCH_SIZE]
+            started = time.perf_counter()
+            store._collection.add(
+                ids=[str(uuid.uuid4()) for _ in batch],
+                embeddings=vectors[start:start + STORE_BATCH_SIZE],
+                documents=[document.page_content for document in batch],
+                metadatas=[FileTable.compact(document.metadata) for document in batch],
+            )
+            stage.sample(started, len(batch))
+    stages["store_writes"] = stage.report()
+    processor.vector_store = store
+
+    components, component_vectors = [], []
+    with StageTimer("extraction") as stage:
+        for document, vector in zip(documents, vectors):
+            started = time.perf_counter()
+            component = extractor.component_from_chunk(document.page_content, document.metadata)
+            stage.sample(started)
+            if component is not None:
+                components.append(component)
+                component_vectors.append(vector)
+        if components:
+            extractor.create_component_database(components, component_vectors)
+    stages["extraction"] = stage.report()
+    stages["extraction"]["components"] = len(components)
+
+    with StageTimer("querying") as stage:
+        for _ in range(QUERY_REPEATS):
+            for query in QUERIES:
+                started = time.perf_counter()
+                processor.query_knowledge_base(query, k=5)
+                stage.sample(started)
+    stages["querying"] = stage.report()
+
+    output_dir = Path(work_dir) / "swift_output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    seen_names = set()
+    for component in components:
+        name = component.metadata.get("name", "Unknown")
+        if name not in seen_names:
+            seen_names.add(name)
+            (output_dir / f"{name}.swift").write_text(FAKE_TRANSLATION.format(name=name), encoding='utf-8')
+    with StageTimer("cleaning") as stage:
+        started = time.perf_counter()
+        clean_stats = clean_swift_directory(str(output_dir))
+        stage.sample(started, clean_stats["files"])
+    stages["cleaning"] = stage.report()
+
+    return {"files": file_count, "generated_bytes": generated["bytes"], "stages": stages}
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Stages whose throughput dropped by more than `tolerance` against a baseline report."""
+    regressions = []
+    for size, run in results.get("sizes", {}).items():
+        baseline_run = baseline.get("sizes", {}).get(size)
+        if not baseline_run or "stages" not in run or "stages" not in baseline_run:
+            continue
+        for name, stage in run["stages"].items():
+            before = baseline_run["stages"].get(name, {}).get("items_per_second")
+            after = stage.get("items_per_second")
+            if before and after and after < before * (1 - tolerance):
+                regressions.append(f"{name}@{size}: {before} -> {after} items/s")
+    return regressions
+
+
+def run_benchmark(sizes: List[int], keep: bool = False, seed: int = 0) -> Dict:
+    """Benchmark every size in a fresh interpreter and collect the reports."""
+    results = {"python": sys.version.split()[0], "embedding_size": EMBEDDING_SIZE, "sizes": {}}
+    for size in sizes:
+        work_dir = tempfile.mkdtemp(prefix=f"rag_bench_{size}_")
+        report_path = os.path.join(work_dir, "report.json")
+        print(f"🏃 {size} files in {work_dir}", flush=True)
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", str(size),
+                                    "--work-dir", work_dir, "--seed", str(seed), "--output", report_path])
+        if completed.returncode == 0 and os.path.exists(report_path):
+            with open(report_path, 'r', encoding='utf-8') as f:
+                results["sizes"][str(size)] = json.load(f)
+        else:
+            results["sizes"][str(size)] = {"error": f"exit code {completed.returncode}"}
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    """Run the scaling benchmark: [size ...] [--output file.json] [--baseline file.json] [--keep]"""
+    args = sys.argv[1:]
+    options = {"--output": None, "--baseline": None, "--single": None, "--work-dir": None, "--seed": "0"}
+    sizes = []
+    keep = False
+    index = 0
+    while index < len(args):
+        if args[index] in options and index + 1 < len(args):
+            options[args[index]] = args[index + 1]
+            index += 2
+            continue
+        if args[index] == "--keep":
+            keep = True
+        else:
+            sizes.append(int(args[index]))
+        index += 1
+
+    # Child process: one size, report written to --output
+    if options["--single"]:
+        report = run_size(int(options["--single"]), options["--work-dir"], int(options["--seed"]))
+        atomic_write_text(options["--output"], json.dumps(report, indent=2))
+        return
+
+    print("📈 Pipeline Scaling Benchmark")
+    print("=" * 40)
+    results = run_benchmark(sizes or DEFAULT_SIZES, keep, int(options["--seed"]))
+
+    for size, run in results["sizes"].items():
+        if "error" in run:
+            print(f"❌ {size} files: {run['error']}")
+            continue
+        print(f"\n📊 {size} files")
+        for name, stage in run["stages"].items():
+            latency = stage["latency_ms"] or {}
+            print(f"  {name:<13} {stage['items']:>9} items {stage['items_per_second'] or 0:>12.1f}/s "
+                  f"p95 {latency.get('p95', 0):>9.3f} ms  rss {stage['peak_rss_mb']:>8.1f} MB")
+
+    output_path = options["--output"] or "./benchmark_scaling.json"
+    atomic_write_text(output_path, json.dumps(results, indent=2))
+    print(f"\n📄 Results written to {output_path}")
+
+    if options["--baseline"]:
+        with open(options["--baseline"], 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f))
+        if regressions:
+            print("❌ Throughput regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("✅ No throughput regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Imports every entry point in a fresh interpreter with `-X importtime` and
+reports its total import time and the slowest top-level imports as JSON, so
+cold start of short-lived CLI invocations can be kept under a budget.
+"""
+
+import os
+import re
+import sys
+import json
+import subprocess
+from typing import Dict, List, Optional
+
+from file_utils import atomic_write_text
+
+# Modules a user or worker process starts from
+ENTRY_POINTS = [
+    "rag_cli",
+    "android_rag_processor",
+    "query_interface",
+    "component_extractor",
+    "kotlin_to_swift_translator",
+    "clean_swift_files",
+    "pipeline",
+    "run_complete_workflow",
+    "batch_jobs",
+    "kotlin_swift_transpiler",
+]
+
+# "import time:       412 |       1033 |   encodings"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Entries of `-X importtime` output as {"module", "self_us", "cumulative_us", "depth"}."""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                # Nested imports are indented two spaces per level after the first space
+                "depth": max(0, (len(indent) - 1) // 2),
+            })
+    return entries
+
+
+def measure_import(module: str, top: int = 10) -> Dict:
+    """Import `module` in a fresh interpreter and summarize where its import time went."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    entries = parse_importtime(result.stderr)
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    report = {
+        "module": module,
+        "ok": result.returncode == 0,
+        # Top-level entries do not overlap, so their cumulative times add up to the whole import
+        "total_ms": round(sum(entry["cumulative_us"] for entry in top_level) / 1000, 1),
+        "slowest_imports": [
+            {"module": entry["module"], "ms": round(entry["cumulative_us"] / 1000, 1)}
+            for entry in sorted(top_level, key=lambda entry: entry["cumulative_us"], reverse=True)[:top]
+        ],
+    }
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        report["error"] = error_lines[-1] if error_lines else f"exit code {result.returncode}"
+    return report
+
+
+def run_benchmark(modules: Optional[List[str]] = None, budget_ms: Optional[float] = None) -> Dict:
+    """Measure every entry point; with a budget, list the ones that exceed it."""
+    reports = [measure_import(module) for module in modules or ENTRY_POINTS]
+    results = {"python": sys.version.split()[0], "entry_points": reports}
+    if budget_ms is not None:
+        results["budget_ms"] = budget_ms
+        results["over_budget"] = [report["module"] for report in reports if report["total_ms"] > budget_ms]
+    return results
+
+
+def main():
+    """Benchmark entry point import times: [module ...] [--budget ms] [--output file.json]"""
+    args = sys.argv[1:]
+    budget_ms = float(os.getenv("STARTUP_BUDGET_MS")) if os.getenv("STARTUP_BUDGET_MS") else None
+    output_path = None
+    modules = []
+    index = 0
+    while index < len(args):
+        if args[index] == "--budget" and index + 1 < len(args):
+            budget_ms = float(args[index + 1])
+            index += 2
+        elif args[index] == "--output" and index + 1 < len(args):
+            output_path = args[index + 1]
+            index += 2
+        else:
+            modules.append(args[index])
+            index += 1
+
+    print("⏱️  Startup Import Benchmark")
+    print("=" * 40)
+
+    results = run_benchmark(modules or None, budget_ms)
+    for report in results["entry_points"]:
+        status = "✅" if report["ok"] else "❌"
+        print(f"{status} {report['module']:<28} {report['total_ms']:8.1f} ms")
+    print(json.dumps(results, indent=2))
+
+    if output_path:
+        atomic_write_text(output_path, json.dumps(results, indent=2))
+        print(f"📄 Results written to {output_path}")
+
+    if results.get("over_budget"):
+        print(f"❌ Over the {budget_ms:.0f} ms budget: {', '.join(results['over_budget'])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
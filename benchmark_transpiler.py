@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Transpiler Benchmark
+Compares the offline single-pass transpiler against the previous chain of
+re.sub calls (kept here verbatim as the baseline) on the project's Kotlin files.
+"""
+
+import re
+import sys
+import json
+import time
+from pathlib import Path
+
+from kotlin_swift_transpiler import transpile
+
+# The regex chain _basic_translation used before the single-pass transpiler
+LEGACY_PATTERNS = {
+    # Data classes
+    r'data class (\w+)(\([^)]*\))?\s*\{': r'struct \1 {',
+    
+    # Function declarations
+    r'fun (\w+)(\([^)]*\))(\s*:\s*[^{]+)?\s*\{': r'func \1\2 {',
+    
+    # Variable declarations
+    r'val (\w+)\s*:\s*([^=]+?)(\s*=\s*[^;]+)?;?': r'let \1: \2',
+    r'var (\w+)\s*:\s*([^=]+?)(\s*=\s*[^;]+)?;?': r'var \1: \2',
+    
+    # Type conversions
+    r': String': ': String',
+    r': Int': ': Int',
+    r': Boolean': ': Bool',
+    r': Double': ': Double',
+    r': Float': ': Float',
+    r': List<([^>]+)>': r': [\1]',
+    r': Array<([^>]+)>': r': [\1]',
+    r': Map<([^,]+),\s*([^>]+)>': r': [\1: \2]',
+    
+    # Android specific to iOS
+    r'@Composable': r'struct',
+    r'@Preview': r'#Preview',
+    r'androidx\.compose\.': r'',
+    r'androidx\.': r'',
+    r'kotlinx\.': r'',
+    
+    # Common patterns
+    r'println\(': r'print(',
+    r'System\.out\.println\(': r'print(',
+}
+
+
+def legacy_translation(kotlin_code: str) -> str:
+    """The previous regex-chain fallback translation."""
+    swift_code = kotlin_code
+    for kotlin_pattern, swift_pattern in LEGACY_PATTERNS.items():
+        swift_code = re.sub(kotlin_pattern, swift_pattern, swift_code)
+    return "import Foundation\nimport SwiftUI\n\n" + swift_code
+
+
+def run_benchmark(sources, translate, iterations: int) -> dict:
+    """Time `translate` over all sources `iterations` times."""
+    total_chars = sum(len(source) for source in sources)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for source in sources:
+            translate(source)
+    elapsed = time.perf_counter() - start
+
+    files = len(sources) * iterations
+    return {
+        "seconds": round(elapsed, 4),
+        "files_per_second": round(files / elapsed, 1),
+        "mb_per_second": round(total_chars * iterations / elapsed / 1e6, 3),
+    }
+
+
+def main():
+    """Benchmark both translators on the Kotlin files of a project."""
+    project_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("ANDROID_APP")
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    sources = [path.read_text(encoding='utf-8', errors='replace') for path in sorted(project_path.rglob("*.kt"))]
+    if not sources:
+        print(f"❌ No Kotlin files found in {project_path}")
+        return
+
+    print("⏱️  Offline Translation Benchmark")
+    print("=" * 40)
+    print(f"📄 {len(sources)} files, {sum(len(s) for s in sources)} characters, {iterations} iterations")
+
+    results = {
+        "files": len(sources),
+        "iterations": iterations,
+        "legacy_regex_chain": run_benchmark(sources, legacy_translation, iterations),
+        "single_pass_transpiler": run_benchmark(sources, transpile, iterations),
+    }
+    results["speedup"] = round(results["legacy_regex_chain"]["seconds"] / results["single_pass_transpiler"]["seconds"], 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,30 @@ Cleans up existing Swift files by removing markdown formatting and extracting on
 """
 
 import os
-import re
+import json
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+
+from swift_sanitizer import sanitize_swift
+from file_utils import atomic_write_text, sha256_text
+from telemetry import telemetry
+from profiling import profiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Below this many files the directory is cleaned in-process
+PARALLEL_THRESHOLD = 32
+
+# Stat fingerprints and content hashes of files already known to be clean, so re-runs skip them
+CLEAN_STATE_FILE = ".swift_clean_state.json"
+
+# A file modified this close to the last state write may have changed again within the same mtime tick
+RACY_WINDOW_NS = 2_000_000_000
+
 def extract_swift_code(content: str) -> str:
     """
     Extract only Swift code from content, removing all markdown formatting.
@@ -24,62 +39,18 @@ def extract_swift_code(content: str) -> str:
     Returns:
         Clean Swift code without markdown formatting
     """
-    # First, try to extract code blocks marked as swift
-    swift_blocks = re.findall(r"```swift(.*?)```", content, re.DOTALL)
-    if swift_blocks:
-        # Join all swift code blocks
-        cleaned = "\n".join(block.strip() for block in swift_blocks)
-    else:
-        # If no swift code blocks, remove markdown formatting
-        lines = content.splitlines()
-        cleaned_lines = []
-        in_code_block = False
-        
-        for line in lines:
-            # Skip markdown code fences
-            if line.strip().startswith("```"):
-                in_code_block = not in_code_block
-                continue
-            
-            # Skip language tags (swift, kotlin, etc.)
-            if line.strip().lower() in ["swift", "kotlin", "```"]:
-                continue
-            
-            # Skip markdown headers
-            if line.strip().startswith("#"):
-                continue
-            
-            # Skip empty lines at the beginning and end
-            if not cleaned_lines and not line.strip():
-                continue
-            
-            cleaned_lines.append(line)
-        
-        # Remove trailing empty lines
-        while cleaned_lines and not cleaned_lines[-1].strip():
-            cleaned_lines.pop()
-        
-        cleaned = "\n".join(cleaned_lines)
-    
-    # Additional cleanup: remove any remaining markdown artifacts
-    cleaned = re.sub(r'^```.*$', '', cleaned, flags=re.MULTILINE)
-    cleaned = re.sub(r'^#+\s*.*$', '', cleaned, flags=re.MULTILINE)
-    cleaned = re.sub(r'^\*\*.*\*\*$', '', cleaned, flags=re.MULTILINE)
-    
-    # Remove extra blank lines
-    cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)
-    
-    return cleaned.strip()
+    return sanitize_swift(content)
 
-def clean_swift_file(file_path: Path) -> bool:
+def clean_swift_file(file_path: Path) -> Optional[Dict]:
     """
     Clean a single Swift file by removing markdown formatting.
+    The file is only rewritten when the cleaned content differs.
     
     Args:
         file_path: Path to the Swift file to clean
         
     Returns:
-        True if file was cleaned successfully, False otherwise
+        The file's fingerprint and whether it was rewritten, or None on error
     """
     try:
         # Read the file
@@ -89,51 +60,109 @@ def clean_swift_file(file_path: Path) -> bool:
         # Extract Swift code
         cleaned_content = extract_swift_code(content)
         
-        # Write back the cleaned content
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(cleaned_content)
+        changed = cleaned_content != content
+        if changed:
+            atomic_write_text(str(file_path), cleaned_content)
+            logger.info(f"Cleaned: {file_path}")
         
-        logger.info(f"Cleaned: {file_path}")
-        return True
+        stat = file_path.stat()
+        return {"path": str(file_path), "changed": changed, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256_text(cleaned_content)}
         
     except Exception as e:
         logger.error(f"Error cleaning {file_path}: {e}")
+        return None
+
+def _load_clean_state(state_path: Path) -> Dict[str, List]:
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _still_clean(swift_file: Path, stat: os.stat_result, entry: Optional[List], state_written_ns: int) -> bool:
+    """Whether `swift_file` still matches its recorded [size, mtime_ns, sha256] entry."""
+    if not entry or len(entry) != 3 or entry[0] != stat.st_size:
+        return False
+    if entry[1] == stat.st_mtime_ns and stat.st_mtime_ns < state_written_ns - RACY_WINDOW_NS:
+        return True
+    # The stat check is unsure (touched, or written around the last run): compare the content hash
+    try:
+        return sha256_text(swift_file.read_text(encoding='utf-8')) == entry[2]
+    except (OSError, UnicodeDecodeError):
         return False
 
-def clean_swift_directory(directory_path: str = "./swift_output") -> None:
+def clean_swift_directory(directory_path: str = "./swift_output", workers: Optional[int] = None) -> Dict[str, int]:
     """
-    Clean all Swift files in a directory recursively.
+    Clean all Swift files in a directory recursively, in parallel.
+    Files unchanged since the last run (same size and mtime) are not read again; when the
+    stat check is unsure the content hash recorded in the state file decides.
     
     Args:
         directory_path: Path to the directory containing Swift files
+        workers: Number of worker processes (default: SWIFT_CLEAN_WORKERS or the CPU count)
     """
+    stats = {"files": 0, "skipped": 0, "rewritten": 0, "unchanged": 0, "errors": 0}
     directory = Path(directory_path)
     
     if not directory.exists():
         logger.error(f"Directory not found: {directory_path}")
-        return
+        return stats
     
     # Find all Swift files
     swift_files = list(directory.rglob("*.swift"))
+    stats["files"] = len(swift_files)
     
     if not swift_files:
         logger.warning(f"No Swift files found in {directory_path}")
-        return
-    
-    logger.info(f"Found {len(swift_files)} Swift files to clean")
+        return stats
     
-    # Clean each file
-    cleaned_count = 0
+    state_path = directory / CLEAN_STATE_FILE
+    previous_state = _load_clean_state(state_path)
+    state_written_ns = state_path.stat().st_mtime_ns if previous_state else 0
+    state = {}
+    pending = []
     for swift_file in swift_files:
-        if clean_swift_file(swift_file):
-            cleaned_count += 1
-    
-    logger.info(f"Successfully cleaned {cleaned_count}/{len(swift_files)} files")
+        stat = swift_file.stat()
+        entry = previous_state.get(str(swift_file))
+        if _still_clean(swift_file, stat, entry, state_written_ns):
+            state[str(swift_file)] = [stat.st_size, stat.st_mtime_ns, entry[2]]
+            stats["skipped"] += 1
+        else:
+            pending.append(swift_file)
+    
+    logger.info(f"Found {len(swift_files)} Swift files, {len(pending)} to clean")
+    
+    workers = workers or int(os.getenv("SWIFT_CLEAN_WORKERS", "0")) or os.cpu_count() or 1
+    if profiler.active:
+        # Worker processes are invisible to the profiler
+        workers = 1
+    if workers > 1 and len(pending) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(clean_swift_file, pending, chunksize=max(1, len(pending) // (workers * 4))))
+    else:
+        # Process start-up costs more than cleaning a handful of files
+        results = [clean_swift_file(swift_file) for swift_file in pending]
+    
+    for result in results:
+        if result is None:
+            stats["errors"] += 1
+            continue
+        stats["rewritten" if result["changed"] else "unchanged"] += 1
+        state[result["path"]] = [result["size"], result["mtime_ns"], result["sha256"]]
+    
+    atomic_write_text(str(state_path), json.dumps(state))
+    logger.info(f"Cleaning done: {stats}")
+    for key, value in stats.items():
+        telemetry.incr(f"swift_clean_{key}", value)
+    return stats
 
 def main():
     """Main function to run the Swift file cleaner."""
     import sys
     
+    profiler.start_from_argv()
+    
     # Get directory from command line argument or use default
     directory = sys.argv[1] if len(sys.argv) > 1 else "./swift_output"
     
@@ -141,9 +170,11 @@ def main():
     print("=" * 30)
     print(f"Cleaning Swift files in: {directory}")
     
-    clean_swift_directory(directory)
+    with profiler.stage("clean"):
+        stats = clean_swift_directory(directory)
     
-    print("✅ Cleaning complete!")
+    print(f"✅ Cleaning complete! {stats['rewritten']} rewritten, {stats['unchanged']} already clean, "
+          f"{stats['skipped']} skipped unchanged since last run")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
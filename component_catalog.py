@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Component Catalog
+Read-only, cached view of the component vector database. The store is opened
+once, type filters run inside Chroma, listings are paginated and per-type
+counts are computed from metadata alone.
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from file_table import FileTable
+from unified_store import UnifiedStore, unified_layout, unified_store_path
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ComponentCatalog:
+    """
+    Lists components from `component_vector_db` (or the components namespace of the unified
+    store) without loading more than is asked for. Listing needs no embeddings, so none are
+    created unless `embedding_function` is given. Components are returned with their file's
+    attributes from the file table of the main store.
+    """
+
+    def __init__(self, db_path: str = "./component_vector_db", embedding_function: Any = None,
+                 page_size: int = 500, file_table: Optional[FileTable] = None):
+        self.db_path = db_path
+        self.file_table = file_table or FileTable.for_store(
+            unified_store_path() if unified_layout() else os.getenv("VECTOR_DB_PATH", "./vector_db"))
+        self.embedding_function = embedding_function
+        self.page_size = page_size
+        self._vectorstore: Optional[Any] = None
+        self._listings: Dict[Tuple[Optional[str], Optional[int], int], List[Document]] = {}
+        self._type_counts: Optional[Dict[str, int]] = None
+
+    @property
+    def vectorstore(self) -> Optional[Chroma]:
+        """The component store, opened on first use and reused afterwards."""
+        from langchain_chroma import Chroma
+
+        if self._vectorstore is None and unified_layout():
+            if not os.path.exists(unified_store_path()):
+                logger.error(f"Unified store not found at: {unified_store_path()}")
+                return None
+            self._vectorstore = UnifiedStore(embeddings=self.embedding_function).namespace("components")
+            logger.info(f"Opened the components namespace with {self._vectorstore.count()} documents")
+        if self._vectorstore is None:
+            if not os.path.exists(self.db_path):
+                logger.error(f"Component database not found at: {self.db_path}")
+                return None
+            try:
+                self._vectorstore = Chroma(persist_directory=self.db_path, embedding_function=self.embedding_function)
+                logger.info(f"Opened component database with {self._vectorstore._collection.count()} documents")
+            except Exception as e:
+                logger.error(f"Error loading component database: {e}")
+                return None
+        return self._vectorstore
+
+    def refresh(self):
+        """Forget cached listings and counts, e.g. after the database was rebuilt."""
+        self._listings.clear()
+        self._type_counts = None
+
+    @staticmethod
+    def _where(component_type: Optional[str]) -> Optional[Dict]:
+        return {"component_type": component_type} if component_type is not None else None
+
+    def list_components(self, component_type: Optional[str] = None, limit: Optional[int] = None,
+                        offset: int = 0) -> List[Document]:
+        """One page of components (all of them when `limit` is None), filtered by type in the store."""
+        key = (component_type, limit, offset)
+        if key in self._listings:
+            return self._listings[key]
+
+        # A cached full listing of all types answers any later type filter without touching the store
+        if limit is None and offset == 0 and component_type is not None and (None, None, 0) in self._listings:
+            components = [doc for doc in self._listings[(None, None, 0)]
+                          if doc.metadata.get("component_type") == component_type]
+            self._listings[key] = components
+            return components
+
+        if limit is None:
+            components = [doc for page in self.iter_pages(component_type, offset=offset) for doc in page]
+        else:
+            components = self._get_page(component_type, limit, offset)
+        self._listings[key] = components
+        logger.info(f"Found {len(components)} components (type filter: {component_type})")
+        return components
+
+    def iter_pages(self, component_type: Optional[str] = None, page_size: Optional[int] = None,
+                   offset: int = 0) -> Iterator[List[Document]]:
+        """Yield components page by page so callers never hold more than one page of text."""
+        page_size = page_size or self.page_size
+        while True:
+            page = self._get_page(component_type, page_size, offset)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def _get_page(self, component_type: Optional[str], limit: int, offset: int) -> List[Document]:
+        from langchain_core.documents import Document
+
+        vectorstore = self.vectorstore
+        if vectorstore is None:
+            return []
+        try:
+            docs = vectorstore.get(where=self._where(component_type), limit=limit, offset=offset,
+                                   include=["documents", "metadatas"])
+        except Exception as e:
+            logger.error(f"Error getting components: {e}")
+            return []
+        return [Document(page_content=text, metadata=self.file_table.hydrate(meta))
+                for text, meta in zip(docs["documents"], docs["metadatas"])]
+
+    def count_by_type(self) -> Dict[str, int]:
+        """Number of component chunks per type, read from metadata only."""
+        if self._type_counts is None:
+            vectorstore = self.vectorstore
+            if vectorstore is None:
+                return {}
+            counts = Counter()
+            offset = 0
+            while True:
+                metadatas = vectorstore.get(limit=self.page_size, offset=offset, include=["metadatas"])["metadatas"]
+                counts.update(meta.get("component_type", "Unknown") for meta in metadatas)
+                if len(metadatas) < self.page_size:
+                    break
+                offset += self.page_size
+            self._type_counts = dict(sorted(counts.items()))
+        return self._type_counts
+
+    def component_types(self) -> List[str]:
+        """Component types present in the database."""
+        return list(self.count_by_type())
@@ -5,15 +5,26 @@ Extracts and categorizes Android components from the main vector database
 and stores them in component_vector_db with proper metadata.
 """
 
+from __future__ import annotations
+
 import os
 import re
+import uuid
 import logging
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
+
+from file_table import FileTable
+from profiling import profiler
+from telemetry import telemetry
+from token_accounting import accountant
+from unified_store import UnifiedStore, chunk_counts, record_id, unified_layout, unified_store_path
+
+# LangChain and Chroma are imported where they are first used
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,11 +35,16 @@ class ComponentExtractor:
     Extracts and categorizes Android components from the main vector database.
     """
     
-    def __init__(self, main_db_path: str = "./vector_db", component_db_path: str = "./component_vector_db"):
+    def __init__(self, main_db_path: str = "./vector_db", component_db_path: str = "./component_vector_db",
+                 embeddings: Any = None):
         load_dotenv()
         
         self.main_db_path = main_db_path
+        self.component_embeddings: Optional[List[List[float]]] = None
+        self.component_vectorstore: Optional[Any] = None
         self.component_db_path = component_db_path
+        # With STORE_LAYOUT=unified both databases are namespaces of the unified store
+        self.unified = unified_layout()
         
         # Component detection patterns
         self.component_patterns = {
@@ -79,14 +95,33 @@ class ComponentExtractor:
             ]
         }
         
-        # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model="text-embedding-3-small"
+        # Initialize embeddings (any LangChain embeddings object can be passed instead)
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            embeddings = OpenAIEmbeddings(
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                model="text-embedding-3-small"
+            )
+        # Metered like every embedding call; only used when components have no precomputed vectors
+        self.embeddings = accountant.meter_embeddings(
+            embeddings, "extract", getattr(embeddings, "model", "text-embedding-3-small")
         )
     
+    @property
+    def file_table(self) -> FileTable:
+        """File attributes referenced by the stored chunks and components."""
+        return FileTable.for_store(unified_store_path() if self.unified else self.main_db_path)
+    
     def load_main_database(self) -> Optional[Chroma]:
         """Load the main vector database."""
+        from langchain_chroma import Chroma
+
+        if self.unified:
+            if not os.path.exists(unified_store_path()):
+                logger.error(f"Unified store not found at: {unified_store_path()}")
+                return None
+            return UnifiedStore(embeddings=self.embeddings).namespace("chunks")
+        
         if not os.path.exists(self.main_db_path):
             logger.error(f"Main database not found at: {self.main_db_path}")
             return None
@@ -184,61 +219,43 @@ class ComponentExtractor:
         
         return "Unknown"
     
-    def extract_components(self) -> List[Document]:
-        """Extract and categorize components from the main database."""
-        vectorstore = self.load_main_database()
-        if not vectorstore:
-            return []
+    def extract_components(self, documents: Optional[List[Document]] = None,
+                           embeddings: Optional[List[List[float]]] = None) -> List[Document]:
+        """
+        Extract and categorize components from the main database, or from `documents` already
+        in memory. When `embeddings` (aligned with `documents`) are given, the vectors of the
+        extracted components are kept in `self.component_embeddings` so they are not recomputed.
+        """
+        self.component_embeddings = None
+        if documents is None:
+            vectorstore = self.load_main_database()
+            if not vectorstore:
+                return []
         
         try:
-            # Get all documents from main database
-            docs = vectorstore.get()
-            documents = docs["documents"]
-            metadatas = docs["metadatas"]
+            if documents is None:
+                # Get all documents from main database
+                docs = vectorstore.get()
+                texts = docs["documents"]
+                metadatas = [self.file_table.hydrate(meta) for meta in docs["metadatas"]]
+            else:
+                texts = [doc.page_content for doc in documents]
+                metadatas = [doc.metadata for doc in documents]
             
             components = []
+            component_embeddings = []
             
-            for doc_text, meta in zip(documents, metadatas):
-                file_path = meta.get("file_path", "")
-                file_name = meta.get("file_name", "")
-                
-                # Skip non-Kotlin files
-                if not file_path.endswith('.kt'):
+            for index, (doc_text, meta) in enumerate(zip(texts, metadatas)):
+                component_doc = self.component_from_chunk(doc_text, meta)
+                if component_doc is None:
                     continue
                 
-                # Detect component type
-                component_type = self.detect_component_type(doc_text, file_path)
-                
-                # Extract component name
-                component_name = self.extract_component_name(doc_text, component_type)
-                
-                # Create component metadata
-                component_meta = {
-                    "component_type": component_type,
-                    "name": component_name,
-                    "original_file": file_path,
-                    "filename": file_name,
-                    "language": "Kotlin",
-                    "file_path": file_path,
-                    "file_name": file_name,
-                    "file_extension": ".kt",
-                    "project_type": "Android",
-                    "directory": meta.get("directory", ""),
-                    "file_size": meta.get("file_size", 0),
-                    "total_chunks": meta.get("total_chunks", 1),
-                    "chunk_index": meta.get("chunk_index", 0)
-                }
-                
-                # Create component document
-                component_doc = Document(
-                    page_content=doc_text,
-                    metadata=component_meta
-                )
-                
                 components.append(component_doc)
-                
-                logger.info(f"Extracted {component_type}: {component_name} from {file_path}")
+                if embeddings is not None:
+                    component_embeddings.append(embeddings[index])
             
+            if embeddings is not None:
+                self.component_embeddings = component_embeddings
             logger.info(f"Extracted {len(components)} components")
             return components
             
@@ -246,24 +263,83 @@ class ComponentExtractor:
             logger.error(f"Error extracting components: {e}")
             return []
     
-    def create_component_database(self, components: List[Document]) -> bool:
-        """Create the component vector database."""
+    def component_from_chunk(self, doc_text: str, meta: Dict[str, Any]) -> Optional[Document]:
+        """Classify one chunk of the main database. Returns None for non-Kotlin chunks."""
+        from langchain_core.documents import Document
+
+        file_path = meta.get("file_path", "")
+        
+        # Skip non-Kotlin files
+        if not file_path.endswith('.kt'):
+            return None
+        
+        # Detect component type
+        component_type = self.detect_component_type(doc_text, file_path)
+        
+        # Extract component name
+        component_name = self.extract_component_name(doc_text, component_type)
+        
+        # The chunk's metadata plus the component's own; file attributes are dropped again when stored
+        component_meta = {
+            **meta,
+            "component_type": component_type,
+            "name": component_name
+        }
+        
+        logger.info(f"Extracted {component_type}: {component_name} from {file_path}")
+        telemetry.incr("components_extracted", component_type=component_type)
+        
+        # Create component document
+        return Document(
+            page_content=doc_text,
+            metadata=component_meta
+        )
+    
+    def create_component_database(self, components: List[Document],
+                                  embeddings: Optional[List[List[float]]] = None) -> bool:
+        """Create the component vector database, reusing precomputed `embeddings` when given."""
+        from langchain_chroma import Chroma
+
         if not components:
             logger.error("No components to store")
             return False
         
         try:
-            # Create component database
-            component_vectorstore = Chroma(
-                persist_directory=self.component_db_path,
-                embedding_function=self.embeddings
-            )
+            if self.unified:
+                # Components are chunks of the chunks namespace: stored texts keep their vectors
+                if self.component_vectorstore is None:
+                    self.component_vectorstore = UnifiedStore(embeddings=self.embeddings).namespace("components")
+                with telemetry.timer("store_write_seconds", store="components"):
+                    self.component_vectorstore.add([record_id(doc.metadata) for doc in components],
+                                                   [doc.page_content for doc in components],
+                                                   [FileTable.compact(doc.metadata) for doc in components], embeddings)
+                    self.component_vectorstore.prune(chunk_counts(doc.metadata for doc in components))
+                logger.info(f"Stored {len(components)} components in the unified store")
+                return True
+            
+            # Opened once and reused, so streaming callers can add components file by file
+            if self.component_vectorstore is None:
+                self.component_vectorstore = Chroma(
+                    persist_directory=self.component_db_path,
+                    embedding_function=self.embeddings
+                )
+            component_vectorstore = self.component_vectorstore
             
             # Add components to database
             texts = [doc.page_content for doc in components]
-            metadatas = [doc.metadata for doc in components]
+            metadatas = [FileTable.compact(doc.metadata) for doc in components]
             
-            component_vectorstore.add_texts(texts=texts, metadatas=metadatas)
+            with telemetry.timer("store_write_seconds", store="components"):
+                if embeddings is not None:
+                    # Vectors were already computed for the main database, skip the embedding calls
+                    component_vectorstore._collection.add(
+                        ids=[str(uuid.uuid4()) for _ in components],
+                        embeddings=embeddings,
+                        documents=texts,
+                        metadatas=metadatas
+                    )
+                else:
+                    component_vectorstore.add_texts(texts=texts, metadatas=metadatas)
             
             logger.info(f"Created component database with {len(components)} components")
             return True
@@ -272,24 +348,25 @@ class ComponentExtractor:
             logger.error(f"Error creating component database: {e}")
             return False
     
-    def run_extraction(self):
-        """Run the complete component extraction process."""
+    def run_extraction(self, documents: Optional[List[Document]] = None,
+                       embeddings: Optional[List[List[float]]] = None) -> List[Document]:
+        """Run the complete component extraction process. Returns the stored components."""
         print("🔍 Extracting Android Components")
         print("=" * 40)
         
         # Check if main database exists
-        if not os.path.exists(self.main_db_path):
+        if documents is None and not os.path.exists(unified_store_path() if self.unified else self.main_db_path):
             print("❌ Main database not found!")
             print(f"Please run the RAG processor first to create the database at: {self.main_db_path}")
-            return
+            return []
         
         # Extract components
         print("📦 Extracting components from main database...")
-        components = self.extract_components()
+        components = self.extract_components(documents, embeddings)
         
         if not components:
             print("❌ No components found!")
-            return
+            return []
         
         # Group components by type for summary
         component_types = {}
@@ -309,13 +386,16 @@ class ComponentExtractor:
         
         # Create component database
         print("\n💾 Creating component database...")
-        success = self.create_component_database(components)
+        success = self.create_component_database(components, self.component_embeddings)
         
         if success:
-            print(f"✅ Successfully created component database at: {self.component_db_path}")
+            print(f"✅ Successfully created component database at: "
+                  f"{unified_store_path() if self.unified else self.component_db_path}")
             print(f"📁 Contains {len(components)} components")
+            return components
         else:
             print("❌ Failed to create component database!")
+            return []
 
 def main():
     """Main function to run the component extractor."""
@@ -323,8 +403,11 @@ def main():
         logger.error("OPENAI_API_KEY not found in environment variables!")
         return
     
+    profiler.start_from_argv()
     extractor = ComponentExtractor()
-    extractor.run_extraction()
+    with profiler.stage("extract"):
+        extractor.run_extraction()
+    telemetry.export()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
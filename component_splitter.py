@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Component Splitter
+Splits Kotlin sources that are too large for one translation request into
+token-budgeted parts at declaration boundaries.
+"""
+
+import re
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lines that may start a new declaration when they sit at nesting depth 0
+DECLARATION_START_PATTERN = re.compile(
+    r'^\s*(?:@|/\*\*|//|(?:(?:public|private|internal|protected|abstract|open|final|sealed|data|enum|'
+    r'inner|inline|suspend|override|const|lateinit|companion|operator|infix|tailrec|external|value|annotation)\s+)*'
+    r'(?:class|interface|object|fun|val|var|typealias|constructor|init)\b)'
+)
+# A class, interface or object declaration (the only declarations whose bodies are split into members)
+TYPE_DECLARATION_PATTERN = re.compile(
+    r'^\s*(?:(?:public|private|internal|protected|abstract|open|final|sealed|data|enum|inner|value|annotation|'
+    r'expect|actual)\s+)*(?:class|interface|object)\s+(\w+)', re.MULTILINE
+)
+LEADING_LINE_PATTERN = re.compile(r'^\s*(?:@|/\*\*|/\*|\*|//)')
+HEADER_LINE_PATTERN = re.compile(r'^\s*(?:package|import)\s')
+
+
+def _line_depths(lines: List[str]) -> List[int]:
+    """Bracket nesting depth at the start of each line, ignoring strings and comments."""
+    depths = []
+    depth = 0
+    in_block_comment = False
+    in_raw_string = False
+
+    for line in lines:
+        depths.append(depth)
+        i = 0
+        in_string = False
+        while i < len(line):
+            two = line[i:i + 2]
+            if in_block_comment:
+                if two == "*/":
+                    in_block_comment = False
+                    i += 1
+            elif in_raw_string:
+                if line[i:i + 3] == '"""':
+                    in_raw_string = False
+                    i += 2
+            elif in_string:
+                if line[i] == "\\":
+                    i += 1
+                elif line[i] == '"':
+                    in_string = False
+            elif two == "//":
+                break
+            elif two == "/*":
+                in_block_comment = True
+                i += 1
+            elif line[i:i + 3] == '"""':
+                in_raw_string = True
+                i += 2
+            elif line[i] == '"':
+                in_string = True
+            elif line[i] == "'":
+                # Character literal such as '{' or '\''
+                end = line.find("'", i + 2 if line[i + 1:i + 2] == "\\" else i + 1)
+                i = end if end != -1 else i
+            elif line[i] in "{([":
+                depth += 1
+            elif line[i] in "})]":
+                depth = max(0, depth - 1)
+            i += 1
+    return depths
+
+
+def _segment(lines: List[str], depths: List[int], base_depth: int) -> List[str]:
+    """
+    Split lines into declarations starting at `base_depth`. Annotations and comments
+    stay attached to the declaration that follows them.
+    """
+    segments: List[List[str]] = []
+    current: List[str] = []
+    only_leading_lines = True
+
+    for line, depth in zip(lines, depths):
+        starts_declaration = depth == base_depth and DECLARATION_START_PATTERN.match(line)
+        if starts_declaration and current and not only_leading_lines:
+            segments.append(current)
+            current = []
+            only_leading_lines = True
+
+        current.append(line)
+        if line.strip() and not (depth == base_depth and LEADING_LINE_PATTERN.match(line)):
+            only_leading_lines = False
+
+    if current:
+        segments.append(current)
+    return ["\n".join(segment).strip("\n") for segment in segments if "".join(segment).strip()]
+
+
+def split_header(source: str) -> Tuple[str, str]:
+    """Separate the package and import lines from the rest of the source."""
+    header_lines = []
+    body_lines = []
+    for line in source.splitlines():
+        (header_lines if HEADER_LINE_PATTERN.match(line) else body_lines).append(line)
+    return "\n".join(header_lines), "\n".join(body_lines)
+
+
+def declared_type_name(signature: str) -> Optional[str]:
+    """Name of the class, interface or object a declaration signature declares, or None for anything else."""
+    match = TYPE_DECLARATION_PATTERN.search(signature)
+    return match.group(1) if match else None
+
+
+def split_members(declaration: str) -> Tuple[str, List[str], str]:
+    """
+    Split a class-like declaration into its signature (up to and including the opening
+    brace), its member declarations and the closing brace.
+    """
+    lines = declaration.splitlines()
+    depths = _line_depths(lines)
+
+    # Signature ends at the first line after which the body brace is open
+    body_start = None
+    for index in range(len(lines)):
+        next_depth = depths[index + 1] if index + 1 < len(lines) else 0
+        if next_depth == 1 and lines[index].rstrip().endswith("{"):
+            body_start = index + 1
+            break
+
+    if body_start is None or len(lines) - body_start < 2:
+        return "", [declaration], ""
+
+    signature = "\n".join(lines[:body_start])
+    members = _segment(lines[body_start:-1], depths[body_start:-1], base_depth=1)
+    return signature, members, lines[-1]
+
+
+def split_component(source: str, max_tokens: int, model: str = "gpt-4",
+                    token_counter: Callable[[str, str], int] = count_tokens) -> Tuple[str, List[Dict]]:
+    """
+    Split a Kotlin source into parts of at most `max_tokens` tokens.
+    Returns the shared header (package and imports) and a list of parts, each a dict with
+    `text` and `container` (the enclosing declaration signature for member parts, else "").
+    """
+    header, body = split_header(source)
+    lines = body.splitlines()
+    declarations = _segment(lines, _line_depths(lines), base_depth=0)
+
+    units: List[Tuple[str, str]] = []
+    for declaration in declarations:
+        if token_counter(declaration, model) <= max_tokens:
+            units.append(("", declaration))
+            continue
+
+        # Only type bodies split cleanly: the statements of a function share locals and control flow
+        signature, members, _ = split_members(declaration)
+        if not signature or declared_type_name(signature) is None:
+            units.append(("", declaration))
+            continue
+        units.extend((signature, member) for member in members)
+
+    # Greedily pack consecutive units with the same container into parts
+    parts: List[Dict] = []
+    for container, text in units:
+        if parts and parts[-1]["container"] == container:
+            candidate = parts[-1]["text"] + "\n\n" + text
+            if token_counter(candidate, model) <= max_tokens:
+                parts[-1]["text"] = candidate
+                continue
+        parts.append({"container": container, "text": text})
+
+    for part in parts:
+        tokens = token_counter(part["text"], model)
+        if tokens > max_tokens:
+            logger.warning(f"A part of {tokens} tokens exceeds the {max_tokens} token budget and is sent whole")
+    return header, parts
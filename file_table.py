@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+File Table
+File-level attributes (path, name, extension, size, language, directory, chunk
+count) stored once per file and referenced by a small integer file id, so
+stored chunk metadata shrinks to the file id and the chunk's offsets. Chunks
+are compacted when written and hydrated back to the full metadata when read.
+The table lives next to the store as an append-only JSON lines file.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FILE_TABLE_NAME = "file_table.jsonl"
+
+# Attributes of the file rather than of the chunk: kept in the table, not in every chunk
+FILE_KEYS = ("file_path", "file_name", "file_extension", "file_size", "project_type", "language",
+             "directory", "total_chunks")
+
+_tables: Dict[str, "FileTable"] = {}
+_tables_lock = threading.Lock()
+
+
+class FileTable:
+    """File id -> file attributes, persisted by appending changed entries."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[int, Dict[str, Any]] = {}
+        self.ids: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str) -> "FileTable":
+        """The process-wide table stored at `path`, loaded on first use."""
+        path = os.path.abspath(path)
+        with _tables_lock:
+            if path not in _tables:
+                _tables[path] = cls(path).load()
+            return _tables[path]
+
+    @classmethod
+    def for_store(cls, store_path: str) -> "FileTable":
+        """The table of the store persisted at `store_path`."""
+        return cls.open(os.path.join(store_path, FILE_TABLE_NAME))
+
+    def load(self) -> "FileTable":
+        """Replay the table file; the last entry of each file id wins."""
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    file_id = entry.pop("file_id")
+                    self.files[file_id] = entry
+                    self.ids[entry["file_path"]] = file_id
+                    lines += 1
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read file table {self.path}: {e}")
+            return self
+        if lines > 2 * len(self.files):
+            # Mostly superseded entries: rewrite with one line per file
+            atomic_write_text(self.path, "".join(json.dumps({"file_id": file_id, **attributes}) + "\n"
+                                                 for file_id, attributes in self.files.items()))
+        return self
+
+    def register(self, attributes: Dict[str, Any]) -> int:
+        """Id of the file described by `attributes`, recording the attributes if they are new or changed."""
+        attributes = {key: attributes[key] for key in FILE_KEYS if key in attributes}
+        with self._lock:
+            file_id = self.ids.get(attributes["file_path"])
+            if file_id is None:
+                file_id = len(self.files)
+                self.ids[attributes["file_path"]] = file_id
+            if self.files.get(file_id) != attributes:
+                self.files[file_id] = attributes
+                self._pending.append({"file_id": file_id, **attributes})
+        return file_id
+
+    def flush(self):
+        """Persist the entries registered since the last flush. Call before writing chunks that refer to them."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in pending))
+
+    def ids_for(self, file_paths: Iterable[str]) -> List[int]:
+        """File ids of the known paths among `file_paths`."""
+        return [self.ids[file_path] for file_path in file_paths if file_path in self.ids]
+
+    @staticmethod
+    def compact(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata to store for a chunk: everything but the file attributes, which the file id stands for."""
+        if "file_id" not in metadata:
+            return metadata
+        return {key: value for key, value in metadata.items() if key not in FILE_KEYS}
+
+    def hydrate(self, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Stored chunk metadata with its file's attributes added back."""
+        metadata = metadata or {}
+        attributes = self.files.get(metadata.get("file_id"))
+        return {**attributes, **metadata} if attributes else metadata
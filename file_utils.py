@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+File Utilities
+Small helpers shared by the pipeline scripts for hashing and crash-safe writes.
+"""
+
+import os
+import hashlib
+import tempfile
+
+
+def sha256_text(text: str) -> str:
+    """SHA-256 hex digest of a string."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def atomic_write_text(path: str, content: str):
+    """
+    Write a text file atomically: write to a temp file in the same directory,
+    fsync it and rename it over the destination.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Index Snapshots
+Exports the chunk index to one versioned snapshot file and serves queries from
+it. The snapshot is a zip bundle holding:
+
+- a manifest with the embedding model, vector dimension and chunking config
+- the vectors and their norms as float32 .npy members, stored uncompressed so
+  they are memory-mapped in place
+- the chunk texts, compressed in blocks so a hit decompresses only its block
+- the ids, the columnar chunk metadata and the file table, compressed
+
+Opening a snapshot reads the manifest and maps the vectors, which takes
+milliseconds. A snapshot built with a different embedding model or dimension
+is refused.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import shutil
+import logging
+import tempfile
+import zipfile
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from file_table import FILE_KEYS
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from android_rag_processor import AndroidProjectRAGProcessor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "android-rag-snapshot"
+FORMAT_VERSION = 1
+# Chunk texts per compressed block
+TEXT_BLOCK_ROWS = 256
+# Records read from (or written to) the store per call
+PAGE_SIZE = 1000
+
+
+class SnapshotIncompatibleError(ValueError):
+    """The snapshot cannot be used with this configuration (format version, embedding model or dimension)."""
+
+
+def chunking_config(processor: AndroidProjectRAGProcessor) -> Dict[str, Any]:
+    """The chunking settings that produced (or would produce) the processor's chunks."""
+    return {"splitter": type(processor.text_splitter).__name__, "chunk_size": processor.chunk_size,
+            "chunk_overlap": processor.chunk_overlap}
+
+
+def _member_offset(f: Any, info: zipfile.ZipInfo) -> int:
+    """Offset in the archive file of a stored member's data (after its local header)."""
+    f.seek(info.header_offset)
+    header = f.read(30)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return info.header_offset + 30 + name_length + extra_length
+
+
+def _map_npy(path: str, archive: zipfile.ZipFile, name: str) -> np.ndarray:
+    """Memory-map an uncompressed .npy member of the archive at `path`."""
+    info = archive.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise SnapshotIncompatibleError(f"{name} is compressed and cannot be memory-mapped")
+    with open(path, 'rb') as f:
+        f.seek(_member_offset(f, info))
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+    if not shape[0]:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+
+def export_snapshot(processor: AndroidProjectRAGProcessor, snapshot_path: str) -> Dict[str, Any]:
+    """
+    Write the processor's chunk store (separate or unified layout) to `snapshot_path`.
+    Records are read page by page and the vectors go through a memory-mapped temp file,
+    so memory use stays flat however large the index is. Returns the manifest.
+    """
+    vector_store = processor.load_vector_store()
+    if vector_store is None:
+        raise FileNotFoundError("No vector store to export")
+    total = vector_store._collection.count() if hasattr(vector_store, "_collection") else vector_store.count()
+
+    work_dir = tempfile.mkdtemp(prefix="snapshot_", dir=os.path.dirname(os.path.abspath(snapshot_path)))
+    try:
+        vectors_path = os.path.join(work_dir, "vectors.npy")
+        texts_path = os.path.join(work_dir, "texts.bin")
+        vectors = None
+        ids: List[str] = []
+        columns: Dict[str, List[Any]] = {}
+        block_offsets = [0]
+        block: List[str] = []
+        with open(texts_path, 'wb') as texts_file:
+            def flush_block():
+                payload = zlib.compress(json.dumps(block).encode('utf-8'), 6)
+                texts_file.write(payload)
+                block_offsets.append(block_offsets[-1] + len(payload))
+                block.clear()
+
+            for offset in range(0, total, PAGE_SIZE):
+                page = vector_store.get(limit=PAGE_SIZE, offset=offset,
+                                        include=["documents", "metadatas", "embeddings"])
+                if vectors is None and len(page["ids"]):
+                    vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32,
+                                                        shape=(total, len(page["embeddings"][0])))
+                start = len(ids)
+                if len(page["ids"]):
+                    vectors[start:start + len(page["ids"])] = np.asarray(page["embeddings"], dtype=np.float32)
+                for record, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                    row = len(ids)
+                    ids.append(record)
+                    # Namespace flags only mean something inside the unified store
+                    for key, value in (meta or {}).items():
+                        if not key.startswith("ns_"):
+                            columns.setdefault(key, [None] * row).append(value)
+                    for column in columns.values():
+                        if len(column) == row:
+                            column.append(None)
+                    block.append(text)
+                    if len(block) == TEXT_BLOCK_ROWS:
+                        flush_block()
+            if block:
+                flush_block()
+
+        count = len(ids)
+        if vectors is None:
+            raise ValueError("The vector store is empty")
+        vectors.flush()
+        vectors = vectors[:count]
+        norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+        norms_path = os.path.join(work_dir, "norms.npy")
+        np.save(norms_path, norms)
+        offsets_path = os.path.join(work_dir, "text_offsets.npy")
+        np.save(offsets_path, np.asarray(block_offsets, dtype=np.int64))
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "format_version": FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "count": count,
+            "embedding": {"model": processor.embedding_model, "dimension": int(vectors.shape[1])},
+            "chunking": chunking_config(processor),
+            "metric": "l2",
+            "text_block_rows": TEXT_BLOCK_ROWS,
+            "columns": sorted(columns),
+        }
+
+        tmp_snapshot = os.path.join(work_dir, "snapshot.tmp")
+        with zipfile.ZipFile(tmp_snapshot, "w", allowZip64=True) as archive:
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+            # Stored, not deflated: these are memory-mapped straight out of the archive
+            archive.write(vectors_path, "vectors.npy", compress_type=zipfile.ZIP_STORED)
+            archive.write(norms_path, "norms.npy", compress_type=zipfile.ZIP_STORED)
+            archive.write(offsets_path, "text_offsets.npy", compress_type=zipfile.ZIP_STORED)
+            # Already compressed block by block
+            archive.write(texts_path, "texts.bin", compress_type=zipfile.ZIP_STORED)
+            archive.writestr("ids.json", json.dumps(ids), compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr("metadata.json", json.dumps({key: column + [None] * (count - len(column))
+                                                          for key, column in columns.items()}),
+                             compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr("files.json", json.dumps({str(file_id): attributes for file_id, attributes
+                                                       in processor.file_table.files.items()}),
+                             compress_type=zipfile.ZIP_DEFLATED)
+        del vectors
+        os.replace(tmp_snapshot, snapshot_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(f"Exported {count} chunks to {snapshot_path} ({os.path.getsize(snapshot_path) / 1024 / 1024:.1f} MB)")
+    return manifest
+
+
+def read_manifest(snapshot_path: str) -> Dict[str, Any]:
+    with zipfile.ZipFile(snapshot_path) as archive:
+        return json.loads(archive.read("manifest.json"))
+
+
+class IndexSnapshot:
+    """
+    A read-only chunk index served from a snapshot file, with the part of the LangChain Chroma
+    interface the processor uses (similarity_search, get, count). Vectors are memory-mapped;
+    ids, metadata and texts are decompressed on first use. Returned metadata is hydrated.
+    """
+
+    def __init__(self, snapshot_path: str, embeddings: Any = None, embedding_model: Optional[str] = None,
+                 chunking: Optional[Dict[str, Any]] = None):
+        self.path = snapshot_path
+        self.embeddings = embeddings
+        with zipfile.ZipFile(snapshot_path) as archive:
+            self.manifest = json.loads(archive.read("manifest.json"))
+            self._check(embedding_model, chunking)
+            self.vectors = _map_npy(snapshot_path, archive, "vectors.npy")
+            self.norms = _map_npy(snapshot_path, archive, "norms.npy")
+            self.text_offsets = np.asarray(_map_npy(snapshot_path, archive, "text_offsets.npy"))
+            texts_info = archive.getinfo("texts.bin")
+            with open(snapshot_path, 'rb') as f:
+                self._texts_offset = _member_offset(f, texts_info)
+        self.count_rows = self.manifest["count"]
+        self._ids: Optional[List[str]] = None
+        self._columns: Optional[Dict[str, List[Any]]] = None
+        self._files: Optional[Dict[int, Dict[str, Any]]] = None
+        self._rows_by_file: Optional[Dict[Any, List[int]]] = None
+        self._text_block = lru_cache(maxsize=64)(self._read_text_block)
+
+    def _check(self, embedding_model: Optional[str], chunking: Optional[Dict[str, Any]]):
+        manifest = self.manifest
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotIncompatibleError(f"{self.path} is not an index snapshot")
+        if manifest.get("format_version", 0) > FORMAT_VERSION:
+            raise SnapshotIncompatibleError(f"Snapshot format {manifest['format_version']} is newer than "
+                                            f"the supported version {FORMAT_VERSION}")
+        snapshot_model = manifest["embedding"]["model"]
+        if embedding_model and snapshot_model != embedding_model:
+            raise SnapshotIncompatibleError(f"Snapshot was embedded with {snapshot_model}, "
+                                            f"this node embeds queries with {embedding_model}")
+        if chunking and chunking != manifest.get("chunking"):
+            # Queries still work; only chunks added locally would be split differently
+            logger.warning(f"Snapshot chunking {manifest.get('chunking')} differs from the local {chunking}")
+
+    def _load_metadata(self):
+        if self._columns is not None:
+            return
+        with zipfile.ZipFile(self.path) as archive:
+            self._ids = json.loads(archive.read("ids.json"))
+            self._columns = json.loads(archive.read("metadata.json"))
+            self._files = {int(file_id): attributes
+                           for file_id, attributes in json.loads(archive.read("files.json")).items()}
+
+    def _read_text_block(self, block: int) -> List[str]:
+        start, end = int(self.text_offsets[block]), int(self.text_offsets[block + 1])
+        with open(self.path, 'rb') as f:
+            f.seek(self._texts_offset + start)
+            return json.loads(zlib.decompress(f.read(end - start)))
+
+    def text(self, row: int) -> str:
+        block_rows = self.manifest["text_block_rows"]
+        return self._text_block(row // block_rows)[row % block_rows]
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Hydrated metadata of one row."""
+        self._load_metadata()
+        meta = {key: column[row] for key, column in self._columns.items() if column[row] is not None}
+        attributes = self._files.get(meta.get("file_id"))
+        return {**attributes, **meta} if attributes else meta
+
+    def count(self) -> int:
+        return self.count_rows
+
+    def _rows_for(self, key: str, values: List[Any]) -> List[int]:
+        self._load_metadata()
+        if key in FILE_KEYS and key not in self._columns:
+            # A file attribute: find the files, then their rows
+            if self._rows_by_file is None:
+                self._rows_by_file = {}
+                for row, file_id in enumerate(self._columns.get("file_id", [])):
+                    self._rows_by_file.setdefault(file_id, []).append(row)
+            wanted = set(values)
+            file_ids = [file_id for file_id, attributes in self._files.items() if attributes.get(key) in wanted]
+            return sorted(row for file_id in file_ids for row in self._rows_by_file.get(file_id, []))
+        column = self._columns.get(key, [])
+        wanted = set(values)
+        return [row for row, value in enumerate(column) if value in wanted]
+
+    def _filter(self, where: Optional[Dict]) -> Optional[List[int]]:
+        """Rows matching a Chroma-style filter ($and, equality and $in); None means every row."""
+        if not where:
+            return None
+        rows: Optional[set] = None
+        clauses = where["$and"] if "$and" in where else [{key: value} for key, value in where.items()]
+        for clause in clauses:
+            (key, condition), = clause.items()
+            if key.startswith("$"):
+                matched = self._filter(clause)
+            elif isinstance(condition, dict):
+                if set(condition) != {"$in"}:
+                    raise ValueError(f"Unsupported filter on {key}: {condition}")
+                matched = self._rows_for(key, condition["$in"])
+            else:
+                matched = self._rows_for(key, [condition])
+            matched = set(range(self.count_rows)) if matched is None else set(matched)
+            rows = matched if rows is None else rows & matched
+        return sorted(rows)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Records matching `ids` and `where`, in the shape of Chroma's get()."""
+        self._load_metadata()
+        include = include or ["documents", "metadatas"]
+        rows = self._filter(where)
+        rows = list(range(self.count_rows)) if rows is None else rows
+        if ids is not None:
+            wanted = set(ids)
+            rows = [row for row in rows if self._ids[row] in wanted]
+        rows = rows[offset or 0:][:limit] if limit is not None else rows[offset or 0:]
+        result: Dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+        result["documents"] = [self.text(row) for row in rows] if "documents" in include else None
+        result["metadatas"] = [self.metadata(row) for row in rows] if "metadatas" in include else None
+        result["embeddings"] = np.asarray(self.vectors[rows]) if "embeddings" in include else None
+        return result
+
+    def similarity_search_by_vector(self, vector: List[float], k: int = 4,
+                                    filter: Optional[Dict] = None) -> List[Document]:
+        """The `k` rows nearest to `vector` by L2 distance (the metric of the stores it was exported from)."""
+        from langchain_core.documents import Document
+
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape[0] != self.vectors.shape[1]:
+            raise SnapshotIncompatibleError(f"Query vectors have {query.shape[0]} dimensions, "
+                                            f"the snapshot has {self.vectors.shape[1]}")
+        rows = self._filter(filter)
+        candidates = np.arange(self.count_rows) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(candidates):
+            return []
+        # |v - q|^2 without the constant |q|^2 term
+        if rows is None:
+            distances = self.norms - 2 * (self.vectors @ query)
+        else:
+            distances = self.norms[candidates] - 2 * (self.vectors[candidates] @ query)
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [Document(page_content=self.text(int(candidates[index])),
+                         metadata=self.metadata(int(candidates[index]))) for index in nearest]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+        if self.embeddings is None:
+            raise ValueError("Text queries need the embeddings the snapshot was built with")
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k, filter=filter)
+
+
+def import_snapshot(snapshot_path: str, processor: AndroidProjectRAGProcessor) -> int:
+    """
+    Load a snapshot into the processor's own store (separate or unified layout) without
+    embedding anything again. File ids are remapped into the local file table.
+    Returns the number of chunks imported.
+    """
+    from langchain_core.documents import Document
+
+    snapshot = IndexSnapshot(snapshot_path, embedding_model=processor.embedding_model,
+                             chunking=chunking_config(processor))
+    snapshot._load_metadata()
+    local_ids = {file_id: processor.file_table.register(attributes) for file_id, attributes in snapshot._files.items()}
+    for start in range(0, snapshot.count_rows, PAGE_SIZE):
+        rows = range(start, min(start + PAGE_SIZE, snapshot.count_rows))
+        documents = []
+        for row in rows:
+            metadata = snapshot.metadata(row)
+            if metadata.get("file_id") in local_ids:
+                metadata["file_id"] = local_ids[metadata["file_id"]]
+            documents.append(Document(page_content=snapshot.text(row), metadata=metadata))
+        processor.add_documents(documents, vectors=np.asarray(snapshot.vectors[start:rows.stop]).tolist())
+    logger.info(f"Imported {snapshot.count_rows} chunks from {snapshot_path}")
+    return snapshot.count_rows
+
+
+def main():
+    """Snapshot the index: export [snapshot] | import <snapshot> | info <snapshot>"""
+    args = sys.argv[1:]
+    command = args[0] if args else "export"
+    snapshot_path = args[1] if len(args) > 1 else os.getenv("INDEX_SNAPSHOT", "./index.ragsnap")
+
+    print("📦 Index Snapshot")
+    print("=" * 40)
+
+    if command == "info":
+        print(json.dumps(read_manifest(snapshot_path), indent=2))
+        return
+    if command not in ("export", "import"):
+        print(f"❌ Unknown command: {command} (expected export, import or info)")
+        return
+
+    from android_rag_processor import AndroidProjectRAGProcessor
+    # The snapshot itself must not be the store being exported or imported into
+    os.environ.pop("INDEX_SNAPSHOT", None)
+    processor = AndroidProjectRAGProcessor()
+
+    started = time.perf_counter()
+    if command == "export":
+        manifest = export_snapshot(processor, snapshot_path)
+        print(f"✅ Exported {manifest['count']} chunks ({manifest['embedding']['model']}, "
+              f"{manifest['embedding']['dimension']} dimensions) to {snapshot_path} "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        try:
+            count = import_snapshot(snapshot_path, processor)
+        except SnapshotIncompatibleError as e:
+            print(f"❌ {e}")
+            return
+        print(f"✅ Imported {count} chunks from {snapshot_path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Kotlin Dependency Graph
+Builds an import- and identifier-reference graph between the Kotlin files of an
+Android project, persists it next to the vector databases and keeps it up to
+date incrementally so queries can expand hits to related files cheaply.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Iterable, Optional, Set
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GRAPH_FORMAT_VERSION = 1
+
+PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.]+)', re.MULTILINE)
+IMPORT_PATTERN = re.compile(r'^\s*import\s+([\w.]+?)(\.\*)?(?:\s+as\s+(\w+))?\s*$', re.MULTILINE)
+TYPE_DECLARATION_PATTERN = re.compile(r'\b(?:class|interface|object|typealias)\s+([A-Za-z_]\w*)')
+TOP_LEVEL_FUNCTION_PATTERN = re.compile(r'^fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?([A-Za-z_]\w*)\s*\(', re.MULTILINE)
+TOP_LEVEL_PROPERTY_PATTERN = re.compile(r'^(?:const\s+)?va[lr]\s+([A-Za-z_]\w*)', re.MULTILINE)
+IDENTIFIER_PATTERN = re.compile(r'\b[A-Za-z_]\w*\b')
+# Comments and string literals are blanked out before scanning for identifiers
+NOISE_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/|"""(?:.|\n)*?"""|"(?:\\.|[^"\\\n])*"', re.DOTALL)
+
+KOTLIN_KEYWORDS = {
+    "as", "break", "class", "continue", "do", "else", "false", "for", "fun", "if", "in",
+    "interface", "is", "null", "object", "package", "return", "super", "this", "throw",
+    "true", "try", "typealias", "val", "var", "when", "while", "import", "private",
+    "public", "internal", "protected", "override", "data", "sealed", "enum", "open",
+    "abstract", "companion", "const", "lateinit", "suspend", "inline", "by", "get", "set",
+}
+
+
+class KotlinDependencyGraph:
+    """
+    File-level dependency graph for Kotlin sources.
+    Nodes are project-relative file paths (matching the `file_path` chunk metadata)
+    and an edge A -> B means A imports or references a symbol declared in B.
+    """
+
+    def __init__(self, graph_path: str = "./dependency_graph.json"):
+        self.graph_path = graph_path
+        self.files: Dict[str, Dict] = {}
+        self.edges: Dict[str, List[str]] = {}
+        self.reverse_edges: Dict[str, List[str]] = {}
+
+    def load(self) -> bool:
+        """Load a persisted graph. Returns False when none (or an incompatible one) exists."""
+        if not os.path.exists(self.graph_path):
+            return False
+
+        try:
+            with open(self.graph_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load dependency graph {self.graph_path}: {e}")
+            return False
+
+        if data.get("version") != GRAPH_FORMAT_VERSION:
+            logger.info("Dependency graph format changed, rebuilding from scratch")
+            return False
+
+        self.files = data.get("files", {})
+        self.edges = data.get("edges", {})
+        self._build_reverse_edges()
+        return True
+
+    def save(self):
+        """Persist the graph atomically."""
+        atomic_write_text(self.graph_path, json.dumps(
+            {"version": GRAPH_FORMAT_VERSION, "files": self.files, "edges": self.edges}
+        ))
+
+    def parse_source(self, content: str) -> Dict:
+        """Extract the package, imports, declarations and referenced identifiers of a Kotlin file."""
+        package_match = PACKAGE_PATTERN.search(content)
+
+        imports = []
+        wildcard_imports = []
+        aliases = {}
+        for match in IMPORT_PATTERN.finditer(content):
+            name, wildcard, alias = match.groups()
+            if wildcard:
+                wildcard_imports.append(name)
+            else:
+                imports.append(name)
+                if alias:
+                    aliases[alias] = name.rsplit(".", 1)[-1]
+
+        code = NOISE_PATTERN.sub(" ", content)
+        declarations = set(TYPE_DECLARATION_PATTERN.findall(code))
+        declarations.update(TOP_LEVEL_FUNCTION_PATTERN.findall(code))
+        declarations.update(TOP_LEVEL_PROPERTY_PATTERN.findall(code))
+
+        # Import lines are handled explicitly, so only scan the code body for references
+        body = IMPORT_PATTERN.sub(" ", PACKAGE_PATTERN.sub(" ", code))
+        references = set(IDENTIFIER_PATTERN.findall(body)) - KOTLIN_KEYWORDS - declarations
+        references.update(aliases.values())
+
+        return {
+            "package": package_match.group(1) if package_match else "",
+            "imports": sorted(imports),
+            "wildcard_imports": sorted(wildcard_imports),
+            "declarations": sorted(declarations),
+            "references": sorted(references),
+        }
+
+    def update(self, sources: Dict[str, str]) -> Dict[str, int]:
+        """
+        Incrementally update the graph from a mapping of relative path -> file content.
+        Only files whose content hash changed are re-parsed; files missing from
+        `sources` are dropped. Edges are recomputed from the stored symbol tables.
+        """
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+        for removed_path in set(self.files) - set(sources):
+            del self.files[removed_path]
+            stats["removed"] += 1
+
+        for rel_path, content in sources.items():
+            content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+            existing = self.files.get(rel_path)
+            if existing and existing.get("hash") == content_hash:
+                stats["unchanged"] += 1
+                continue
+
+            entry = self.parse_source(content)
+            entry["hash"] = content_hash
+            self.files[rel_path] = entry
+            stats["changed" if existing else "added"] += 1
+
+        self._rebuild_edges()
+        return stats
+
+    def update_from_project(self, project_path: Path, file_paths: Iterable[Path]) -> Dict[str, int]:
+        """Update the graph from the Kotlin files of a project and persist it."""
+        if not self.files:
+            self.load()
+
+        sources = {}
+        for file_path in file_paths:
+            if file_path.suffix.lower() != ".kt":
+                continue
+            try:
+                sources[str(file_path.relative_to(project_path))] = file_path.read_text(encoding='utf-8', errors='replace')
+            except Exception as e:
+                logger.warning(f"Could not read {file_path} for dependency graph: {e}")
+
+        stats = self.update(sources)
+        self.save()
+        logger.info(f"Dependency graph updated: {stats}, {sum(len(v) for v in self.edges.values())} edges")
+        return stats
+
+    def _rebuild_edges(self):
+        """Resolve imports and references against the declarations of every file."""
+        # Fully-qualified symbol -> declaring files
+        symbol_index: Dict[str, Set[str]] = {}
+        for rel_path, entry in self.files.items():
+            package = entry.get("package", "")
+            for declaration in entry.get("declarations", []):
+                fq_name = f"{package}.{declaration}" if package else declaration
+                symbol_index.setdefault(fq_name, set()).add(rel_path)
+
+        edges = {}
+        for rel_path, entry in self.files.items():
+            dependencies = set()
+
+            for imported in entry.get("imports", []):
+                dependencies.update(symbol_index.get(imported, ()))
+
+            visible_packages = [entry.get("package", "")] + entry.get("wildcard_imports", [])
+            for reference in entry.get("references", []):
+                for package in visible_packages:
+                    fq_name = f"{package}.{reference}" if package else reference
+                    dependencies.update(symbol_index.get(fq_name, ()))
+
+            dependencies.discard(rel_path)
+            edges[rel_path] = sorted(dependencies)
+
+        self.edges = edges
+        self._build_reverse_edges()
+
+    def _build_reverse_edges(self):
+        reverse: Dict[str, Set[str]] = {}
+        for source, targets in self.edges.items():
+            for target in targets:
+                reverse.setdefault(target, set()).add(source)
+        self.reverse_edges = {path: sorted(sources) for path, sources in reverse.items()}
+
+    def dependencies(self, file_path: str) -> List[str]:
+        """Files that `file_path` imports or references."""
+        return self.edges.get(file_path, [])
+
+    def dependents(self, file_path: str) -> List[str]:
+        """Files that import or reference `file_path`."""
+        return self.reverse_edges.get(file_path, [])
+
+    def neighbors(self, file_paths: Iterable[str], limit: Optional[int] = None) -> List[str]:
+        """
+        1-hop neighbours (both directions) of the given files, excluding the files themselves.
+        Neighbours shared by several of the given files are ranked first.
+        """
+        seeds = list(dict.fromkeys(file_paths))
+        seed_set = set(seeds)
+        scores: Dict[str, int] = {}
+
+        for path in seeds:
+            for neighbor in self.dependencies(path) + self.dependents(path):
+                if neighbor not in seed_set:
+                    scores[neighbor] = scores.get(neighbor, 0) + 1
+
+        ranked = sorted(scores, key=lambda p: (-scores[p], p))
+        return ranked[:limit] if limit is not None else ranked
+
+
+def main():
+    """Build the dependency graph for the Android project and print it."""
+    project_path = Path("ANDROID_APP")
+    graph = KotlinDependencyGraph(os.getenv("DEPENDENCY_GRAPH_PATH", "./dependency_graph.json"))
+
+    print("🕸️  Kotlin Dependency Graph")
+    print("=" * 40)
+
+    if not project_path.exists():
+        print(f"❌ Project path {project_path} does not exist!")
+        return
+
+    stats = graph.update_from_project(project_path, sorted(project_path.rglob("*.kt")))
+    print(f"📊 {len(graph.files)} files ({stats['added']} added, {stats['changed']} changed, "
+          f"{stats['removed']} removed, {stats['unchanged']} unchanged)")
+
+    for rel_path in sorted(graph.files):
+        dependencies = graph.dependencies(rel_path)
+        print(f"\n📄 {rel_path}")
+        for dependency in dependencies:
+            print(f"    -> {dependency}")
+
+
+if __name__ == "__main__":
+    main()
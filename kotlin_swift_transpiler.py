@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Offline Kotlin to Swift Transpiler
+Rewrites Kotlin to Swift in a single pass using a rule table compiled once at
+import. The scan recognises the same tokens as `tokenize`: string literals and
+comments are whole tokens, so rules never fire inside them and never see each
+other's output. Text no rule applies to is skipped inside the regex engine, so
+only a few tokens per line reach Python code.
+Used as a zero-cost fallback when the LLM is unavailable and as a bulk pre-pass.
+"""
+
+import re
+import sys
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Token grammar shared by the tokenizer and the transpiler's scan
+BLOCK_COMMENT = r'/\*.*?\*/'
+LINE_COMMENT = r'//[^\n]*'
+RAW_STRING = r'"""(?:.|\n)*?"""'
+STRING = r'"(?:\\.|[^"\\\n])*"'
+CHAR = r"'(?:\\.|[^'\\\n])'"
+ANNOTATION = r'@[A-Za-z_][\w.]*(?::[A-Za-z_]\w*)?'
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<block_comment>%s)
+  | (?P<line_comment>%s)
+  | (?P<raw_string>%s)
+  | (?P<string>%s)
+  | (?P<char>%s)
+  | (?P<number>\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?[fFLdDuU]?)
+  | (?P<annotation>%s)
+  | (?P<identifier>[A-Za-z_]\w*)
+  | (?P<newline>\n)
+  | (?P<whitespace>[ \t\r]+)
+  | (?P<operator>\?:|!!|\?\.|::|->|\.\.|[=!<>]=|&&|\|\||.)
+''' % (BLOCK_COMMENT, LINE_COMMENT, RAW_STRING, STRING, CHAR, ANNOTATION), re.DOTALL | re.VERBOSE)
+
+TEMPLATE_EXPRESSION_PATTERN = re.compile(r'\$\{([^}]*)\}')
+TEMPLATE_NAME_PATTERN = re.compile(r'\$([A-Za-z_]\w*)')
+
+# Identifier rewrites applied wherever the identifier appears as code
+IDENTIFIER_RULES = {
+    "fun": "func",
+    "val": "let",
+    "Boolean": "Bool",
+    "Long": "Int",
+    "Short": "Int16",
+    "Byte": "UInt8",
+    "Char": "Character",
+    "Unit": "Void",
+    "Any": "Any",
+    "null": "nil",
+    "this": "self",
+    "when": "switch",
+    "println": "print",
+    "emptyList": "Array",
+    "emptyMap": "Dictionary",
+}
+
+# Kotlin modifiers without a Swift counterpart
+DROPPED_IDENTIFIERS = {"internal", "open", "lateinit", "suspend", "inline", "const", "data"}
+
+# Annotation rewrites; annotations not listed are dropped
+ANNOTATION_RULES = {
+    "@JvmStatic": "static",
+    "@Volatile": "",
+    "@Preview": "// #Preview",
+}
+
+OPERATOR_RULES = {
+    "?:": "??",
+    "!!": "!",
+    "..": "...",
+    "::": ".",
+}
+
+# Generic collection types rewritten to Swift literal type syntax
+COLLECTION_TYPES = {"List", "MutableList", "ArrayList", "Array", "Map", "MutableMap", "HashMap"}
+MAP_TYPES = {"Map", "MutableMap", "HashMap"}
+
+# Collection factory calls rewritten to literals: name -> (opening, closing)
+COLLECTION_FACTORIES = {
+    "listOf": ("[", "]"),
+    "mutableListOf": ("[", "]"),
+    "arrayListOf": ("[", "]"),
+    "arrayOf": ("[", "]"),
+    "mapOf": ("[", "]"),
+    "mutableMapOf": ("[", "]"),
+    "hashMapOf": ("[", "]"),
+}
+# Factories whose `key to value` pairs become `key: value`
+MAP_FACTORIES = {"mapOf", "mutableMapOf", "hashMapOf"}
+
+SWIFT_PRELUDE = "import Foundation\nimport SwiftUI\n\n"
+
+# Every identifier some rule rewrites or inspects; all others are copied through untouched
+REWRITTEN_WORDS = (set(IDENTIFIER_RULES) | DROPPED_IDENTIFIERS | set(COLLECTION_FACTORIES) | COLLECTION_TYPES
+                   | {"to", "System", "package", "import"})
+
+Token = Tuple[str, str]
+
+
+def tokenize(code: str) -> List[Token]:
+    """
+    Split Kotlin source into (kind, text) tokens. Lossless: concatenating the texts gives
+    back the source. The transpiler uses it to split parameter and type argument lists.
+    """
+    return [(match.lastgroup, match.group()) for match in TOKEN_PATTERN.finditer(code)]
+
+
+def _translate_string(text: str) -> str:
+    """Convert Kotlin string templates to Swift interpolation."""
+    if "$" not in text:
+        return text
+    text = TEMPLATE_EXPRESSION_PATTERN.sub(r'\\(\1)', text)
+    return TEMPLATE_NAME_PATTERN.sub(r'\\(\1)', text)
+
+
+# One match per rewritable token, starting where the last one ended. The leading
+# repetition skips what no rule applies to (other identifiers, numbers, whitespace
+# and punctuation) without leaving the regex engine; the `token` group then holds a
+# comment, string, char, annotation, operator or rewritten word, a lone character
+# that does not open one, or nothing at the end of the input.
+SCAN_PATTERN = re.compile(r'''
+    (?:
+        [^A-Za-z_/"'@?!:.]+
+      | (?!(?:%(words)s)\b)[A-Za-z_]\w*
+      | /(?![/*]) | \?(?!:) | !(?!!) | :(?!:) | \.(?!\.)
+    )*
+    (?P<token>
+        %(block_comment)s | %(line_comment)s | %(raw_string)s | %(string)s | %(char)s | %(annotation)s
+      | \?: | !! | :: | \.\.
+      | (?:%(words)s)\b
+      | [/"'@]
+      | \Z
+    )
+''' % {
+    "words": "|".join(sorted(REWRITTEN_WORDS, key=len, reverse=True)),
+    "block_comment": BLOCK_COMMENT, "line_comment": LINE_COMMENT, "raw_string": RAW_STRING,
+    "string": STRING, "char": CHAR, "annotation": ANNOTATION,
+}, re.DOTALL | re.VERBOSE)
+
+# Parentheses outside strings and comments, for finding the end of an argument list
+PAREN_PATTERN = re.compile(r'%s|%s|%s|%s|%s|[()]' % (RAW_STRING, STRING, CHAR, BLOCK_COMMENT, LINE_COMMENT),
+                           re.DOTALL)
+ANGLE_PATTERN = re.compile(r'->|[<>]')
+
+NEXT_SIGNIFICANT_PATTERN = re.compile(r'\s*(\S?)')
+DATA_CLASS_PATTERN = re.compile(r'data\s+class\b')
+# Name, type parameters and receiver of a declaration, up to its parameter list
+DECLARATION_HEAD_PATTERN = re.compile(r'(?:[^(){}=:<\n]|<[^<>\n]*(?:<[^<>\n]*>[^<>\n]*)*>)*(?=\()')
+RETURN_TYPE_PATTERN = re.compile(r'(\s*):(\s*Unit\b)?')
+HEADER_LINES_PATTERN = re.compile(r'(?:package|import)[ \t]+[A-Za-z_][^\n]*\n?(?:[ \t]*(?:package|import)[ \t]+[A-Za-z_][^\n]*\n?)*')
+REST_OF_LINE_BLANK_PATTERN = re.compile(r'[ \t]*(?:\n|$)')
+
+OPENING_BRACKETS = {"(", "[", "{", "<"}
+CLOSING_BRACKETS = {")", "]", "}", ">"}
+
+
+def _closing_paren(code: str, index: int) -> int:
+    """Index of the parenthesis closing the one at `index`, or len(code) if it is never closed."""
+    depth = 0
+    for match in PAREN_PATTERN.finditer(code, index):
+        text = match.group()
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+            if depth == 0:
+                return match.start()
+    return len(code)
+
+
+def _closing_angle(code: str, index: int) -> int:
+    """Index of the '>' closing the type argument list opened at `index`, or len(code)."""
+    depth = 0
+    for match in ANGLE_PATTERN.finditer(code, index):
+        text = match.group()
+        if text == "<":
+            depth += 1
+        elif text == ">":
+            depth -= 1
+            if depth == 0:
+                return match.start()
+    return len(code)
+
+
+def _split_top_level(code: str) -> List[str]:
+    """Split a parameter or type argument list at the commas outside brackets, strings and comments."""
+    parts: List[str] = []
+    current: List[str] = []
+    depth = 0
+    for kind, text in tokenize(code):
+        if kind == "operator":
+            if text in OPENING_BRACKETS:
+                depth += 1
+            elif text in CLOSING_BRACKETS:
+                depth = max(0, depth - 1)
+            elif text == "," and depth == 0:
+                parts.append("".join(current))
+                current = []
+                continue
+        current.append(text)
+    parts.append("".join(current))
+    return parts
+
+
+class KotlinSwiftTranspiler:
+    """
+    Single-pass, rule-table driven Kotlin -> Swift rewriter. It does not aim for
+    compilable output; it produces a faithful Swift-flavoured draft without any network calls.
+    Declarations and collection expressions are rewritten as a unit, with their parameter
+    and argument lists rewritten recursively, so the pass keeps no bracket state.
+    """
+
+    def transpile(self, code: str, prelude: Optional[str] = SWIFT_PRELUDE) -> str:
+        """Translate Kotlin source to Swift in one pass over its rewritable tokens."""
+        return (prelude or "") + self._rewrite(code).lstrip("\n")
+
+    def _rewrite(self, code: str, map_literal: bool = False) -> str:
+        """Rewrite `code`; inside a map factory (`map_literal`) `key to value` becomes `key: value`."""
+        out: List[str] = []
+        position = 0
+        while True:
+            match = SCAN_PATTERN.match(code, position)
+            token = match.group("token")
+            if not token:
+                break
+            start = match.start("token")
+            out.append(code[position:start])
+            position = match.end()
+            first = token[0]
+
+            if first == '"':
+                out.append(_translate_string(token) if len(token) > 1 and not token.startswith('"""') else token)
+
+            elif first in "/'":
+                # Comments and chars are copied as they are
+                out.append(token)
+
+            elif first == "@" and len(token) > 1:
+                position = self._annotation(code, token, start, position, out)
+
+            elif token in OPERATOR_RULES:
+                out.append(OPERATOR_RULES[token])
+
+            elif token == "fun":
+                text, position = self._function(code, position)
+                out.append(text)
+
+            elif token == "data" and DATA_CLASS_PATTERN.match(code, start):
+                text, position = self._data_class(code, DATA_CLASS_PATTERN.match(code, start).end())
+                out.append(text)
+
+            elif token in IDENTIFIER_RULES:
+                out.append(IDENTIFIER_RULES[token])
+
+            elif token in COLLECTION_FACTORIES:
+                next_char = NEXT_SIGNIFICANT_PATTERN.match(code, position)
+                if next_char.group(1) == "(":
+                    opening, closing = COLLECTION_FACTORIES[token]
+                    end = _closing_paren(code, next_char.end() - 1)
+                    out.append(opening + self._rewrite(code[next_char.end():end], token in MAP_FACTORIES)
+                               + (closing if end < len(code) else ""))
+                    position = end + 1
+                else:
+                    out.append(token)
+
+            elif token in COLLECTION_TYPES and code.startswith("<", position):
+                end = _closing_angle(code, position)
+                arguments = code[position + 1:end]
+                if token in MAP_TYPES:
+                    # Only the key/value separator of a map type becomes ':'
+                    key, *value = _split_top_level(arguments)
+                    arguments = self._rewrite(key) + (":" + self._rewrite(",".join(value)) if value else "")
+                else:
+                    arguments = self._rewrite(arguments)
+                out.append("[" + arguments + ("]" if end < len(code) else ""))
+                position = end + 1
+
+            elif token in DROPPED_IDENTIFIERS:
+                next_char = NEXT_SIGNIFICANT_PATTERN.match(code, position)
+                if next_char.group(1).isalpha() or next_char.group(1) == "_":
+                    # Only in modifier position, so `val data = ...` keeps its name
+                    position = next_char.end() - 1
+                else:
+                    out.append(token)
+
+            elif token == "to":
+                out.append(":" if map_literal else token)
+
+            elif token == "System" and code.startswith(".out.println", position):
+                out.append("print")
+                position += len(".out.println")
+
+            elif token in ("package", "import"):
+                line_start = code.rfind("\n", 0, start) + 1
+                header = HEADER_LINES_PATTERN.match(code, start)
+                if header and not code[line_start:start].strip():
+                    # package and import lines have no Swift equivalent; the prelude adds imports
+                    self._drop_indentation(out, code[line_start:start])
+                    position = header.end()
+                else:
+                    out.append(token)
+
+            else:
+                out.append(token)
+
+        out.append(code[position:])
+        return "".join(out)
+
+    @staticmethod
+    def _drop_indentation(out: List[str], indentation: str):
+        """Remove the indentation of a line being dropped from the output."""
+        if indentation and out and out[-1].endswith(indentation):
+            out[-1] = out[-1][:-len(indentation)]
+
+    def _annotation(self, code: str, token: str, start: int, position: int, out: List[str]) -> int:
+        """Rewrite or drop an annotation; returns where scanning continues."""
+        replacement = ANNOTATION_RULES.get(token, "")
+        # Drop annotation arguments, e.g. @OptIn(ExperimentalMaterial3Api::class)
+        if code.startswith("(", position):
+            position = min(len(code), _closing_paren(code, position) + 1)
+        blank_rest = REST_OF_LINE_BLANK_PATTERN.match(code, position)
+        line_start = code.rfind("\n", 0, start) + 1
+        if not replacement and blank_rest and not code[line_start:start].strip():
+            # Annotation on its own line: remove the whole line
+            self._drop_indentation(out, code[line_start:start])
+            return blank_rest.end()
+        out.append(replacement)
+        return position
+
+    def _function(self, code: str, position: int) -> Tuple[str, int]:
+        """`fun` declaration from its keyword up to the return type, which becomes `-> Type`."""
+        head = DECLARATION_HEAD_PATTERN.match(code, position)
+        if not head:
+            return "func", position
+        end = _closing_paren(code, head.end())
+        if end == len(code):
+            return "func" + self._rewrite(code[position:]), end
+        text = f"func{self._rewrite(head.group())}({self._rewrite(code[head.end() + 1:end])})"
+        position = end + 1
+        return_type = RETURN_TYPE_PATTERN.match(code, position)
+        if return_type:
+            # Unit return types are dropped
+            text += return_type.group(1) + ("" if return_type.group(2) else " ->")
+            position = return_type.end()
+        return text, position
+
+    def _data_class(self, code: str, position: int) -> Tuple[str, int]:
+        """`data class` whose primary constructor becomes the stored properties of a struct."""
+        head = DECLARATION_HEAD_PATTERN.match(code, position)
+        if not head:
+            return "struct", position
+        end = _closing_paren(code, head.end())
+        parameters = _split_top_level(code[head.end() + 1:end])
+        multiline = REST_OF_LINE_BLANK_PATTERN.match(parameters[0]) is not None
+        text = "struct" + self._rewrite(head.group()) + (" {" if multiline else " {\n    ")
+        for index, parameter in enumerate(parameters):
+            if index:
+                # One stored property per line
+                text += "" if REST_OF_LINE_BLANK_PATTERN.match(parameter) else "\n   "
+            text += self._rewrite(parameter)
+        if not text.rstrip(" ").endswith("\n"):
+            text += "\n"
+        # Merge with an explicit class body instead of closing the struct here
+        next_char = NEXT_SIGNIFICANT_PATTERN.match(code, end + 1)
+        if next_char.group(1) == "{":
+            return text, next_char.end()
+        return text + "}", min(len(code), end + 1)
+
+
+_default_transpiler = KotlinSwiftTranspiler()
+
+
+def transpile(code: str, prelude: Optional[str] = SWIFT_PRELUDE) -> str:
+    """Translate Kotlin source to Swift with the shared transpiler instance."""
+    return _default_transpiler.transpile(code, prelude)
+
+
+def main():
+    """Transpile Kotlin files (or a directory of them) to Swift without an LLM."""
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("ANDROID_APP")
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("./swift_output_offline")
+
+    print("⚡ Offline Kotlin to Swift Transpiler")
+    print("=" * 40)
+
+    files = [source] if source.is_file() else sorted(source.rglob("*.kt"))
+    if not files:
+        print(f"❌ No Kotlin files found in {source}")
+        return
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for file_path in files:
+        swift_code = transpile(file_path.read_text(encoding='utf-8', errors='replace'))
+        target = output_dir / f"{file_path.stem}.swift"
+        target.write_text(swift_code, encoding='utf-8')
+        logger.info(f"Transpiled {file_path} -> {target}")
+
+    print(f"✅ Transpiled {len(files)} files to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
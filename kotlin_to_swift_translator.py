@@ -4,141 +4,335 @@ Kotlin to Swift Translator for Android Components
 Loads components from component_vector_db and translates them to Swift.
 """
 
+from __future__ import annotations
+
 import os
+import sys
+import time
+import asyncio
 import logging
-import re
-from typing import Dict, List, Optional, Tuple
+import json
+import queue
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI
+from translation_engine import AsyncTranslationEngine
+from translation_cache import TranslationCache
+from component_splitter import declared_type_name, split_component, split_header
+from token_utils import count_tokens
+from kotlin_swift_transpiler import transpile
+from swift_sanitizer import sanitize_swift
+from translation_journal import TranslationJournal
+from model_router import ModelRouter
+from prompt_compactor import PromptCompactor
+from component_catalog import ComponentCatalog
+from batch_jobs import batch_request, write_batch_file, read_batch_results
+from profiling import profiler
+from telemetry import telemetry
+from token_accounting import accountant, BudgetExceededError
+from file_utils import atomic_write_text, sha256_text
+
+# LangChain and Chroma are imported where they are first used
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+    from langchain_openai import ChatOpenAI
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bump whenever a prompt template changes so cached translations are invalidated
+PROMPT_TEMPLATE_VERSION = "1"
+
+# Chunks without stored offsets are joined on a text overlap only when it is at least this long;
+# shorter matches (a lone "}") are too likely to be coincidental
+MIN_CHUNK_OVERLAP = 16
+
 class KotlinToSwiftTranslator:
     """
     Translates Kotlin Android components to Swift iOS components.
     """
     
-    def __init__(self, component_db_path: str = "./component_vector_db"):
+    def __init__(self, component_db_path: str = "./component_vector_db", project_path: str = "ANDROID_APP"):
         load_dotenv()
         
         self.component_db_path = component_db_path
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.1,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+        # Original sources are read from here when available instead of stitching chunks
+        self.project_path = Path(project_path)
+        self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
+        self.model_name = os.getenv("TRANSLATION_MODEL", "gpt-4")
+        self.temperature = 0.1
+        # One client per model, created on first call; simple components are routed to a cheaper model first
+        self._llms: Dict[str, ChatOpenAI] = {}
+        self.router = ModelRouter.from_env(self.model_name)
+        
+        # Concurrent translation engine
+        self.engine = AsyncTranslationEngine(
+            concurrency=int(os.getenv("TRANSLATION_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("TRANSLATION_REQUESTS_PER_MINUTE", "60")),
+            max_retries=int(os.getenv("TRANSLATION_MAX_RETRIES", "5"))
         )
         
-        # Kotlin to Swift mapping patterns
-        self.kotlin_swift_patterns = {
-            # Data classes
-            r'data class (\w+)(\([^)]*\))?\s*\{': r'struct \1 {',
-            
-            # Function declarations
-            r'fun (\w+)(\([^)]*\))(\s*:\s*[^{]+)?\s*\{': r'func \1\2 {',
-            
-            # Variable declarations
-            r'val (\w+)\s*:\s*([^=]+?)(\s*=\s*[^;]+)?;?': r'let \1: \2',
-            r'var (\w+)\s*:\s*([^=]+?)(\s*=\s*[^;]+)?;?': r'var \1: \2',
-            
-            # Type conversions
-            r': String': ': String',
-            r': Int': ': Int',
-            r': Boolean': ': Bool',
-            r': Double': ': Double',
-            r': Float': ': Float',
-            r': List<([^>]+)>': r': [\1]',
-            r': Array<([^>]+)>': r': [\1]',
-            r': Map<([^,]+),\s*([^>]+)>': r': [\1: \2]',
-            
-            # Android specific to iOS
-            r'@Composable': r'struct',
-            r'@Preview': r'#Preview',
-            r'androidx\.compose\.': r'',
-            r'androidx\.': r'',
-            r'kotlinx\.': r'',
-            
-            # Common patterns
-            r'println\(': r'print(',
-            r'System\.out\.println\(': r'print(',
-        }
+        # Comments, blank lines and import blocks are stripped from the Kotlin before prompting
+        self.compactor = PromptCompactor.from_env(self.model_name)
+        
+        # Components whose prompt exceeds this are translated in parts (map-reduce)
+        self.max_prompt_tokens = int(os.getenv("TRANSLATION_MAX_PROMPT_TOKENS", "3000"))
+        
+        # Persistent cache so unchanged components are not re-translated
+        self.cache = TranslationCache(os.getenv("TRANSLATION_CACHE_DIR", "./translation_cache"))
         
-        # Component-specific translation templates
-        self.component_templates = {
-            "Model": self._translate_model,
-            "View": self._translate_view,
-            "ViewModel": self._translate_viewmodel,
-            "Repository": self._translate_repository,
-            "Unknown": self._translate_generic
+        # Opened once; listings are filtered in the store and cached
+        self.catalog = ComponentCatalog(component_db_path)
+        
+        # Components of the last run that failed or only got the fallback translation (name -> reason)
+        self.incomplete: Dict[str, str] = {}
+        
+        # Component-specific prompt templates
+        self.prompt_templates = {
+            "Model": self._model_prompt,
+            "View": self._view_prompt,
+            "ViewModel": self._viewmodel_prompt,
+            "Repository": self._repository_prompt,
+            "Unknown": self._generic_prompt
         }
     
     def load_component_database(self) -> Optional[Chroma]:
-        """Load the component vector database."""
-        if not os.path.exists(self.component_db_path):
-            logger.error(f"Component database not found at: {self.component_db_path}")
-            return None
-        
-        try:
-            vectorstore = Chroma(
-                persist_directory=self.component_db_path,
-                embedding_function=OpenAIEmbeddings()
+        """The component vector database, opened once through the catalog."""
+        return self.catalog.vectorstore
+    
+    def get_components_by_type(self, component_type: str = None, reload: bool = False) -> List[Document]:
+        """
+        Get components from the database, optionally filtered by type. The type filter runs
+        in the store, and loaded components are reused until `reload` is set.
+        """
+        if reload:
+            self.catalog.refresh()
+        return self.catalog.list_components(component_type)
+    
+    def _get_llm(self, model: str) -> ChatOpenAI:
+        """Chat client for `model`, created on first use."""
+        from langchain_openai import ChatOpenAI
+
+        if model not in self._llms:
+            # Retries are handled by the translation engine, not by the client
+            self._llms[model] = ChatOpenAI(
+                model=model,
+                temperature=self.temperature,
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0
             )
-            logger.info(f"Loaded component database with {vectorstore._collection.count()} documents")
-            return vectorstore
-        except Exception as e:
-            logger.error(f"Error loading component database: {e}")
+        return self._llms[model]
+    
+    def build_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Build the component-specific translation prompt."""
+        component_type = metadata.get("component_type", "Unknown")
+        prompt_func = self.prompt_templates.get(component_type, self._generic_prompt)
+        return prompt_func(kotlin_code, metadata)
+    
+    def _cache_key(self, component_doc: Document, model: Optional[str] = None) -> str:
+        """Cache key for a component under the current prompt settings and the given (default: strong) model."""
+        return self.cache.make_key(
+            f"{PROMPT_TEMPLATE_VERSION}/{self.compactor.signature}",
+            component_doc.metadata.get("component_type", "Unknown"),
+            component_doc.page_content,
+            model or self.model_name,
+            self.temperature
+        )
+    
+    def _store_translation(self, cache_key: str, component_doc: Document, raw: str, cleaned: str, model: str) -> Dict:
+        """Store a fresh LLM translation in the cache. Returns the entry with its cleaned output."""
+        entry = self.cache.put(
+            cache_key, raw,
+            model=model,
+            component_type=component_doc.metadata.get("component_type", "Unknown"),
+            name=component_doc.metadata.get("name", "Unknown")
+        )
+        return {**entry, "cleaned": cleaned}
+    
+    def _cached_translation(self, cache_key: str) -> Optional[Dict]:
+        """The cached translation with its raw output cleaned by the current sanitizer, or None."""
+        entry = self.cache.get(cache_key)
+        if entry is None:
             return None
+        return {**entry, "cleaned": self._clean_swift_code(entry["raw"])}
     
-    def get_components_by_type(self, component_type: str = None) -> List[Document]:
-        """Get components from the database, optionally filtered by type."""
-        vectorstore = self.load_component_database()
-        if not vectorstore:
-            return []
-        
-        try:
-            # Get all documents
-            docs = vectorstore.get()
-            documents = docs["documents"]
-            metadatas = docs["metadatas"]
-            
-            components = []
-            for doc_text, meta in zip(documents, metadatas):
-                if component_type is None or meta.get("component_type") == component_type:
-                    components.append(Document(
-                        page_content=doc_text,
-                        metadata=meta
-                    ))
-            
-            logger.info(f"Found {len(components)} components (type filter: {component_type})")
-            return components
-            
-        except Exception as e:
-            logger.error(f"Error getting components: {e}")
-            return []
+    def _translate_with_cache(self, component_doc: Document) -> Dict:
+        """Translate a component, consulting the cache first. Returns the raw and cleaned output."""
+        return self.engine.run_sync(self._translate_with_cache_async(component_doc))
     
-    def translate_component(self, component_doc: Document) -> str:
-        """Translate a single component from Kotlin to Swift."""
+    async def _translate_with_cache_async(self, component_doc: Document) -> Dict:
+        """Translate a component through the translation engine, consulting the cache first."""
+        metadata = component_doc.metadata
+        with telemetry.span("translate.component", component=metadata.get("name", "Unknown"),
+                            component_type=metadata.get("component_type", "Unknown"), cache_hit=False) as span:
+            result = await self._translate_component_async(component_doc)
+            span.set("fallback", bool(result.get("fallback")))
+        return result
+    
+    async def _translate_component_async(self, component_doc: Document) -> Dict:
         content = component_doc.page_content
         metadata = component_doc.metadata
         component_type = metadata.get("component_type", "Unknown")
         component_name = metadata.get("name", "Unknown")
         
-        logger.info(f"Translating {component_type}: {component_name}")
+        compacted, placeholders = self.compactor.compact(content)
+        prompt_tokens = count_tokens(self.build_prompt(compacted, metadata), self.model_name)
+        models = self.router.route(component_type, prompt_tokens, content)
         
-        # Use component-specific translation
-        translator_func = self.component_templates.get(component_type, self._translate_generic)
-        swift_code = translator_func(content, metadata)
+        for model in models:
+            cached = self._cached_translation(self._cache_key(component_doc, model))
+            if cached:
+                logger.info(f"Cache hit for {component_type}: {component_name} ({model})")
+                telemetry.incr("translation_cache_hits", model=model)
+                telemetry.current_span().set("cache_hit", True)
+                return cached
         
-        return swift_code
+        telemetry.incr("translation_cache_misses")
+        self.compactor.report(component_name, content, compacted)
+        for index, model in enumerate(models):
+            is_last = index == len(models) - 1
+            logger.info(f"Translating {component_type}: {component_name} with {model}")
+            try:
+                raw = self.compactor.restore(await self._invoke_translation_async(compacted, metadata, model), placeholders)
+            except BudgetExceededError:
+                # Out of budget: stop instead of escalating to a more expensive model
+                raise
+            except Exception as e:
+                logger.error(f"Error translating {component_type} {component_name} with {model}: {e}")
+                if is_last:
+                    break
+                continue
+            
+            cleaned = self._clean_swift_code(raw)
+            problems = self.router.check_output(cleaned)
+            if problems and not is_last:
+                # Only the strong model's output is accepted as-is
+                self.router.record_escalation(model)
+                telemetry.incr("translation_escalations", model=model)
+                logger.warning(f"{component_name} from {model} failed checks ({', '.join(problems)}), escalating")
+                continue
+            return self._store_translation(self._cache_key(component_doc, model), component_doc, raw, cleaned, model)
+        
+        # Fallback output is not cached so the component is retried on the next run
+        telemetry.incr("translation_fallbacks", component_type=component_type)
+        raw = self._basic_translation(content)
+        return {"raw": raw, "cleaned": self._clean_swift_code(raw), "fallback": True}
+    
+    async def _invoke_llm_async(self, prompt: str, model: str) -> str:
+        """
+        Send one prompt to `model` and record its latency and token usage on the router.
+        The call is refused with BudgetExceededError when its estimate does not fit the budgets.
+        """
+        prompt_tokens = count_tokens(prompt, model)
+        # Swift output is about as long as the prompt's Kotlin; the reservation uses that until usage is known
+        with accountant.metered("translate", model, prompt_tokens, prompt_tokens) as meter:
+            started = time.perf_counter()
+            message = await self.engine.invoke_message(self._get_llm(model), prompt)
+            latency = time.perf_counter() - started
+            
+            usage = getattr(message, "usage_metadata", None) or {}
+            input_tokens = usage.get("input_tokens") or prompt_tokens
+            output_tokens = usage.get("output_tokens") or count_tokens(message.content, model)
+            meter.record(input_tokens, output_tokens)
+        self.router.record(model, latency, input_tokens, output_tokens)
+        
+        telemetry.observe("llm_latency_seconds", latency, model=model)
+        telemetry.incr("llm_tokens_in", input_tokens, model=model)
+        telemetry.incr("llm_tokens_out", output_tokens, model=model)
+        span = telemetry.current_span()
+        if span is not None:
+            # Per-component token totals, summed over parts and escalations
+            span.add("tokens_in", input_tokens)
+            span.add("tokens_out", output_tokens)
+            span.set("model", model)
+        return message.content
+    
+    async def _invoke_translation_async(self, kotlin_code: str, metadata: Dict, model: Optional[str] = None) -> str:
+        """Send one prompt, or map-reduce over parts when the prompt exceeds the token budget."""
+        model = model or self.model_name
+        prompts = self._translation_prompts(kotlin_code, metadata, model)
+        outputs = await asyncio.gather(*(self._invoke_llm_async(prompt, model) for prompt in prompts))
+        return self._stitch_parts(outputs)
+    
+    def _part_prompt(self, header: str, part: Dict, index: int, total: int, metadata: Dict) -> str:
+        """Prompt for one part of a component that was split at declaration boundaries."""
+        context = f"""This is part {index + 1} of {total} of {metadata.get('file_name', 'a Kotlin file')}, which was split because it is too large for a single request.
+The file's package and imports are given for context only. Do not translate or repeat them:
+{header}
+"""
+        if part["container"]:
+            type_name = declared_type_name(part["container"])
+            if part.get("first_of_container"):
+                context += f"""The code below contains members of this declaration:
+{part["container"]}
+Output the full Swift type declaration for it, containing only these members.
+"""
+            else:
+                context += f"""The code below contains further members of this declaration:
+{part["container"]}
+Output only these members, wrapped in `extension {type_name} {{ ... }}`.
+"""
+        if index == 0:
+            context += "Include the Swift import statements this file needs.\n"
+        else:
+            context += "Do not output any import statements.\n"
+        return context + self.build_prompt(part["text"], metadata)
+    
+    def _translation_prompts(self, kotlin_code: str, metadata: Dict, model: Optional[str] = None) -> List[str]:
+        """One prompt for the component, or one per part when it exceeds the prompt token budget."""
+        model = model or self.model_name
+        prompt = self.build_prompt(kotlin_code, metadata)
+        prompt_tokens = count_tokens(prompt, model)
+        if prompt_tokens <= self.max_prompt_tokens:
+            return [prompt]
+        
+        logger.info(f"{metadata.get('name', 'Unknown')} needs {prompt_tokens} prompt tokens, translating in parts")
+        # Leave room for the template, the shared header and the part instructions
+        header_overhead = count_tokens(self.build_prompt("", metadata), model) + 200
+        header, _ = split_header(kotlin_code)
+        budget = max(256, self.max_prompt_tokens - header_overhead - count_tokens(header, model))
+        header, parts = split_component(kotlin_code, max_tokens=budget, model=model)
+        
+        seen_containers = set()
+        for part in parts:
+            part["first_of_container"] = part["container"] not in seen_containers
+            seen_containers.add(part["container"])
+        
+        return [self._part_prompt(header, part, index, len(parts), metadata) for index, part in enumerate(parts)]
+    
+    def _stitch_parts(self, outputs: List[str]) -> str:
+        """Join part translations in source order, hoisting and deduplicating their imports."""
+        if len(outputs) == 1:
+            return outputs[0]
+        
+        imports = []
+        bodies = []
+        for output in outputs:
+            body_lines = []
+            for line in self._clean_swift_code(output).splitlines():
+                if line.startswith("import "):
+                    if line not in imports:
+                        imports.append(line)
+                else:
+                    body_lines.append(line)
+            bodies.append("\n".join(body_lines).strip())
+        
+        return "\n".join(imports) + "\n\n" + "\n\n".join(bodies)
     
-    def _translate_model(self, kotlin_code: str, metadata: Dict) -> str:
-        """Translate a data model from Kotlin to Swift."""
-        prompt = f"""
+    def translate_component(self, component_doc: Document) -> str:
+        """Translate a single component from Kotlin to Swift."""
+        return self._translate_with_cache(component_doc)["raw"]
+    
+    async def translate_component_async(self, component_doc: Document) -> str:
+        """Translate a single component through the concurrent translation engine."""
+        return (await self._translate_with_cache_async(component_doc))["raw"]
+    
+    def _model_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Prompt for translating a data model from Kotlin to Swift."""
+        return f"""
 Translate this Kotlin data class to Swift struct:
 
 Kotlin code:
@@ -156,17 +350,10 @@ Requirements:
 
 Swift code:
 """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error translating model: {e}")
-            return self._basic_translation(kotlin_code)
-    
-    def _translate_view(self, kotlin_code: str, metadata: Dict) -> str:
-        """Translate a UI view from Kotlin/Compose to Swift/SwiftUI."""
-        prompt = f"""
+    
+    def _view_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Prompt for translating a UI view from Kotlin/Compose to Swift/SwiftUI."""
+        return f"""
 Translate this Kotlin/Android Compose view to Swift/SwiftUI:
 
 Kotlin code:
@@ -189,17 +376,10 @@ Requirements:
 
 Swift code:
 """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error translating view: {e}")
-            return self._basic_translation(kotlin_code)
-    
-    def _translate_viewmodel(self, kotlin_code: str, metadata: Dict) -> str:
-        """Translate a ViewModel from Kotlin to Swift."""
-        prompt = f"""
+    
+    def _viewmodel_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Prompt for translating a ViewModel from Kotlin to Swift."""
+        return f"""
 Translate this Kotlin ViewModel to Swift ObservableObject:
 
 Kotlin code:
@@ -218,17 +398,10 @@ Requirements:
 
 Swift code:
 """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error translating viewmodel: {e}")
-            return self._basic_translation(kotlin_code)
-    
-    def _translate_repository(self, kotlin_code: str, metadata: Dict) -> str:
-        """Translate a Repository from Kotlin to Swift."""
-        prompt = f"""
+    
+    def _repository_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Prompt for translating a Repository from Kotlin to Swift."""
+        return f"""
 Translate this Kotlin Repository to Swift:
 
 Kotlin code:
@@ -246,17 +419,10 @@ Requirements:
 
 Swift code:
 """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error translating repository: {e}")
-            return self._basic_translation(kotlin_code)
-    
-    def _translate_generic(self, kotlin_code: str, metadata: Dict) -> str:
-        """Generic translation for unknown component types."""
-        prompt = f"""
+    
+    def _generic_prompt(self, kotlin_code: str, metadata: Dict) -> str:
+        """Generic translation prompt for unknown component types."""
+        return f"""
 Translate this Kotlin code to Swift:
 
 Kotlin code:
@@ -273,188 +439,424 @@ Requirements:
 
 Swift code:
 """
-        
-        try:
-            response = self.llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            logger.error(f"Error translating generic component: {e}")
-            return self._basic_translation(kotlin_code)
     
     def _basic_translation(self, kotlin_code: str) -> str:
-        """Basic pattern-based translation as fallback."""
-        swift_code = kotlin_code
-        
-        # Apply pattern replacements
-        for kotlin_pattern, swift_pattern in self.kotlin_swift_patterns.items():
-            swift_code = re.sub(kotlin_pattern, swift_pattern, swift_code)
-        
-        # Add Swift imports
-        swift_code = "import Foundation\nimport SwiftUI\n\n" + swift_code
-        
-        return swift_code
+        """Offline single-pass translation used as fallback when the LLM call fails."""
+        return transpile(kotlin_code)
     
     def _clean_swift_code(self, code: str) -> str:
         """Extract only Swift code from LLM output, removing all markdown formatting."""
-        import re
+        return sanitize_swift(code)
+
+    def _swift_header(self, file_name: str, component_type: str, metadata: Dict) -> str:
+        """Header comment prepended to every generated Swift file."""
+        return f"""//
+//  {file_name}.swift
+//  Generated from Kotlin {component_type}
+//
+//  Original component: {metadata.get('file_name', 'Unknown')}
+//  Component type: {component_type}
+//  Language: {metadata.get('language', 'Unknown')}
+//
+
+"""
+    
+    def _find_overlap(self, previous: str, current: str) -> int:
+        """
+        Length of the splitter overlap between two consecutive chunks: the longest
+        prefix of `current`, at least MIN_CHUNK_OVERLAP long, that ends `previous` and
+        starts a line there (the splitter strips chunks, so only indentation may precede
+        it on that line).
+        """
+        max_overlap = min(len(previous), len(current), self.chunk_overlap)
+        for size in range(max_overlap, MIN_CHUNK_OVERLAP - 1, -1):
+            if not previous.endswith(current[:size]):
+                continue
+            overlap_start = len(previous) - size
+            line_start = previous.rfind("\n", 0, overlap_start) + 1
+            if not previous[line_start:overlap_start].strip():
+                return size
+        return 0
+    
+    def _reassemble_source(self, chunks: List[Document]) -> str:
+        """
+        Reconstruct a component's original source. Reads the file directly when it
+        is available, otherwise orders chunks by `chunk_index` and trims overlaps using
+        the `start`/`end` offsets stored with each chunk, or a text match for chunks
+        indexed without them.
+        """
+        file_path = chunks[0].metadata.get("file_path") or chunks[0].metadata.get("original_file")
+        if file_path:
+            source_path = self.project_path / file_path
+            if source_path.is_file():
+                try:
+                    return source_path.read_text(encoding='utf-8')
+                except Exception as e:
+                    logger.warning(f"Could not read {source_path}, reassembling from chunks: {e}")
         
-        # First, try to extract code blocks marked as swift
-        swift_blocks = re.findall(r"```swift(.*?)```", code, re.DOTALL)
-        if swift_blocks:
-            # Join all swift code blocks
-            cleaned = "\n".join(block.strip() for block in swift_blocks)
-        else:
-            # If no swift code blocks, remove markdown formatting
-            lines = code.splitlines()
-            cleaned_lines = []
-            in_code_block = False
+        # Duplicate chunks (e.g. from repeated extraction runs) are dropped
+        by_index = {}
+        for chunk in chunks:
+            by_index.setdefault(chunk.metadata.get("chunk_index", 0), chunk)
+        
+        source = ""
+        # Offset in the original file where `source` ends, None when the last chunk had no offsets
+        source_end: Optional[int] = None
+        for position, index in enumerate(sorted(by_index)):
+            piece = by_index[index].page_content
+            start = by_index[index].metadata.get("start", -1)
+            end = by_index[index].metadata.get("end", -1)
+            if position == 0:
+                source = piece
+            elif source_end is not None and start >= 0:
+                # Overlapping text is skipped; whitespace the splitter stripped between chunks becomes a newline
+                source += piece[source_end - start:] if start <= source_end else "\n" + piece
+            else:
+                overlap = self._find_overlap(source, piece)
+                source += piece[overlap:] if overlap else "\n" + piece
+            if start >= 0 and end >= 0:
+                source_end = end if source_end is None else max(source_end, end)
+            else:
+                source_end = None
+        return source
+    
+    def _group_components(self, components: List[Document], used_names: Optional[set] = None) -> List[Tuple[str, Document]]:
+        """
+        Group component chunks by source file into one reassembled document per output file.
+        Pass the same `used_names` set across calls to keep file names unique over several batches.
+        """
+        from langchain_core.documents import Document
+
+        grouped = defaultdict(list)
+        for component in components:
+            key = (component.metadata.get("file_path") or component.metadata.get("original_file")
+                   or component.metadata.get("name") or "Unknown")
+            grouped[key].append(component)
+        
+        jobs = []
+        used_names = used_names if used_names is not None else set()
+        # Sorted so file names and translation order are deterministic between runs
+        for idx, (key, chunks) in enumerate(sorted(grouped.items())):
+            chunks.sort(key=lambda c: c.metadata.get("chunk_index", 0))
+            # Use the first chunk's metadata for type, etc.
+            metadata = dict(chunks[0].metadata)
+            metadata.pop("chunk_index", None)
             
-            for line in lines:
-                # Skip markdown code fences
-                if line.strip().startswith("```"):
-                    in_code_block = not in_code_block
-                    continue
-                
-                # Skip language tags (swift, kotlin, etc.)
-                if line.strip().lower() in ["swift", "kotlin", "```"]:
-                    continue
-                
-                # Skip markdown headers
-                if line.strip().startswith("#"):
-                    continue
-                
-                # Skip empty lines at the beginning and end
-                if not cleaned_lines and not line.strip():
-                    continue
-                
-                cleaned_lines.append(line)
+            component_name = metadata.get("name") or "Unknown"
+            if component_name == "Unknown" and metadata.get("file_name"):
+                component_name = Path(metadata["file_name"]).stem
+            metadata["name"] = component_name
             
-            # Remove trailing empty lines
-            while cleaned_lines and not cleaned_lines[-1].strip():
-                cleaned_lines.pop()
+            # Ensure unique filenames
+            file_name = component_name
+            suffix = idx
+            while file_name in used_names:
+                file_name = f"{component_name}_{suffix}"
+                suffix += 1
+            used_names.add(file_name)
             
-            cleaned = "\n".join(cleaned_lines)
-        
-        # Additional cleanup: remove any remaining markdown artifacts
-        cleaned = re.sub(r'^```.*$', '', cleaned, flags=re.MULTILINE)
-        cleaned = re.sub(r'^#+\s*.*$', '', cleaned, flags=re.MULTILINE)
-        cleaned = re.sub(r'^\*\*.*\*\*$', '', cleaned, flags=re.MULTILINE)
+            jobs.append((file_name, Document(page_content=self._reassemble_source(chunks), metadata=metadata)))
+        return jobs
+    
+    def _swift_file_path(self, output_dir: str, file_name: str) -> str:
+        return os.path.join(output_dir, f"{file_name}.swift")
+    
+    def _write_swift_file(self, output_dir: str, file_name: str, metadata: Dict, swift_code: str) -> str:
+        """Prepend the header to translated code and save it atomically. Returns the saved code."""
+        component_type = metadata.get("component_type", "Unknown")
+        swift_code = self._swift_header(file_name, component_type, metadata) + swift_code
         
-        # Remove extra blank lines
-        cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)
+        filepath = self._swift_file_path(output_dir, file_name)
+        atomic_write_text(filepath, swift_code)
         
-        return cleaned.strip()
-
-    def translate_all_components(self, output_dir: str = "./swift_output") -> Dict[str, str]:
-        """Translate all components and save to files. Group by component name and concatenate content."""
-        components = self.get_components_by_type()
+        logger.info(f"Translated {file_name} -> {filepath}")
+        return swift_code
+    
+    def _journal(self, output_dir: str) -> TranslationJournal:
+        """Checkpoint journal for translations written to `output_dir`."""
+        return TranslationJournal(os.getenv("TRANSLATION_JOURNAL_PATH", os.path.join(output_dir, ".translation_journal.jsonl")))
+    
+    async def translate_all_components_async(self, output_dir: str = "./swift_output", resume: bool = True,
+                                             components: Optional[List[Document]] = None) -> Dict[str, str]:
+        """
+        Translate all components concurrently, writing each file as soon as its translation completes.
+        Completed components are checkpointed in a journal so an interrupted run can resume.
+        `components` already in memory are used instead of reading the component database.
+        """
+        if components is None:
+            components = self.get_components_by_type()
         if not components:
             logger.error("No components found to translate")
             return {}
-
+        
+        return await self._translate_jobs_async(self._group_components(components), output_dir, resume)
+    
+    async def _translate_jobs_async(self, jobs: List[Tuple[str, Document]], output_dir: str, resume: bool) -> Dict[str, str]:
+        """Translate grouped components concurrently, skipping those already checkpointed in the journal."""
         os.makedirs(output_dir, exist_ok=True)
+        journal = self._journal(output_dir)
+        if resume:
+            journal.load()
+        
         translations = {}
+        pending = []
+        self.incomplete = {}
+        for file_name, component_doc in jobs:
+            component_id = component_doc.metadata.get("file_path") or file_name
+            input_hash = self._cache_key(component_doc)
+            entry = journal.completed(component_id, input_hash)
+            if entry:
+                with open(entry["output_path"], 'r', encoding='utf-8') as f:
+                    translations[file_name] = f.read()
+                continue
+            pending.append((file_name, component_doc, component_id, input_hash))
+        
+        if translations:
+            logger.info(f"Resuming: {len(translations)} components already translated, {len(pending)} remaining")
+        
+        # Refuse to start when the estimate alone exceeds the translation budget
+        self.preflight_translation([component_doc for _, component_doc, _, _ in pending])
+        
+        def make_job(file_name: str, component_doc: Document, component_id: str, input_hash: str):
+            return lambda: self._translate_and_write_async(output_dir, file_name, component_doc, component_id, input_hash, journal)
+        
+        translations.update(await self.engine.run(
+            (file_name, make_job(file_name, component_doc, component_id, input_hash))
+            for file_name, component_doc, component_id, input_hash in pending
+        ))
+        for file_name, _, _, _ in pending:
+            if file_name not in translations:
+                self.incomplete[file_name] = "failed"
+        journal.compact()
+        
+        self._log_run_summary(translations, output_dir)
+        return translations
+    
+    async def _translate_and_write_async(self, output_dir: str, file_name: str, component_doc: Document,
+                                         component_id: str, input_hash: str, journal: TranslationJournal) -> str:
+        """Translate one grouped component, write its Swift file and checkpoint it."""
+        result = await self._translate_with_cache_async(component_doc)
+        swift_code = self._write_swift_file(output_dir, file_name, component_doc.metadata, result["cleaned"])
+        # Fallback output is not checkpointed so the next run retries the LLM
+        if result.get("fallback"):
+            self.incomplete[file_name] = "fallback translation"
+        else:
+            journal.record(component_id, input_hash, self._swift_file_path(output_dir, file_name), sha256_text(swift_code))
+        return swift_code
+    
+    async def translate_stream_async(self, source: queue.Queue, output_dir: str = "./swift_output",
+                                     resume: bool = True) -> Dict[str, str]:
+        """
+        Translate components as they arrive on `source`: one list of component chunks per Kotlin
+        file, ended by None. At most `engine.concurrency` files are taken off the queue at a time,
+        so a bounded queue holds back the stages that feed it.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        journal = self._journal(output_dir)
+        if resume:
+            journal.load()
+        
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.engine.concurrency)
         used_names = set()
-
-        from collections import defaultdict
-        grouped = defaultdict(list)
-        for component in components:
-            name = component.metadata.get("name") or "Unknown"
-            grouped[name].append(component.page_content)
-
-        for idx, (component_name, chunks) in enumerate(grouped.items()):
+        translations = {}
+        tasks = []
+        self.incomplete = {}
+        
+        async def translate_file(chunks: List[Document]):
             try:
-                full_content = "\n".join(chunks)
-                # Use the first component's metadata for type, etc.
-                first_component = next(c for c in components if (c.metadata.get("name") or "Unknown") == component_name)
-                component_type = first_component.metadata.get("component_type", "Unknown")
-
-                swift_code = self.translate_component(
-                    Document(page_content=full_content, metadata=first_component.metadata)
-                )
-                swift_code = self._clean_swift_code(swift_code)
-
-                # Ensure unique filenames
-                base_name = component_name or f"Component_{idx}"
-                file_name = base_name
-                if file_name in used_names:
-                    file_name = f"{base_name}_{idx}"
-                used_names.add(file_name)
-
-                filename = f"{file_name}.swift"
-                filepath = os.path.join(output_dir, filename)
-
-                header = f"""//
-//  {file_name}.swift
-//  Generated from Kotlin {component_type}
-//
-//  Original component: {first_component.metadata.get('filename', 'Unknown')}
-//  Component type: {component_type}
-//  Language: {first_component.metadata.get('language', 'Unknown')}
-//
-
-"""
-                swift_code = header + swift_code
-
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(swift_code)
-
-                translations[file_name] = swift_code
-                logger.info(f"Translated {file_name} -> {filepath}")
-
+                for file_name, component_doc in self._group_components(chunks, used_names):
+                    component_id = component_doc.metadata.get("file_path") or file_name
+                    input_hash = self._cache_key(component_doc)
+                    entry = journal.completed(component_id, input_hash)
+                    if entry:
+                        with open(entry["output_path"], 'r', encoding='utf-8') as f:
+                            translations[file_name] = f.read()
+                        continue
+                    translations[file_name] = await self._translate_and_write_async(
+                        output_dir, file_name, component_doc, component_id, input_hash, journal
+                    )
             except Exception as e:
-                logger.error(f"Error translating component {component_name}: {e}")
-
-        logger.info(f"Translated {len(translations)} components to {output_dir}")
+                file_path = chunks[0].metadata.get('file_path', 'Unknown')
+                logger.error(f"Streaming translation of {file_path} failed: {e}")
+                self.incomplete[file_path] = f"failed: {e}"
+            finally:
+                slots.release()
+        
+        while True:
+            await slots.acquire()
+            chunks = await loop.run_in_executor(None, source.get)
+            if chunks is None:
+                slots.release()
+                break
+            if not chunks:
+                slots.release()
+                continue
+            tasks.append(asyncio.ensure_future(translate_file(chunks)))
+        
+        await asyncio.gather(*tasks)
+        journal.compact()
+        self._log_run_summary(translations, output_dir)
         return translations
     
-    def translate_by_type(self, component_type: str, output_dir: str = "./swift_output") -> Dict[str, str]:
-        """Translate components of a specific type."""
+    def estimate_translation(self, components: List[Document]) -> Dict[str, Tuple[int, int]]:
+        """
+        Dry-run usage estimate {model: (input_tokens, output_tokens)} of translating grouped `components`.
+        Cached components are free; the rest are priced on the first model they are routed to,
+        with about as many output tokens as their compacted Kotlin.
+        """
+        usage: Dict[str, Tuple[int, int]] = {}
+        for component_doc in components:
+            metadata = component_doc.metadata
+            compacted, _ = self.compactor.compact(component_doc.page_content)
+            prompt_tokens = count_tokens(self.build_prompt(compacted, metadata), self.model_name)
+            models = self.router.route(metadata.get("component_type", "Unknown"), prompt_tokens, component_doc.page_content)
+            if any(self.cache.contains(self._cache_key(component_doc, model)) for model in models):
+                continue
+            
+            model = models[0]
+            input_tokens = sum(count_tokens(prompt, model) for prompt in self._translation_prompts(compacted, metadata, model))
+            previous = usage.get(model, (0, 0))
+            usage[model] = (previous[0] + input_tokens, previous[1] + count_tokens(compacted, model))
+        return usage
+    
+    def preflight_translation(self, components: Optional[List[Document]] = None) -> Dict:
+        """
+        Check the dry-run estimate for `components` (default: every grouped component) against the
+        budgets. Raises BudgetExceededError before any call is made when it does not fit.
+        """
+        if components is None:
+            components = [component_doc for _, component_doc in self._group_components(self.get_components_by_type())]
+        return accountant.preflight("translate", self.estimate_translation(components))
+    
+    def _log_run_summary(self, translations: Dict[str, str], output_dir: str):
+        """Log cache, compaction and per-route totals of a translation run."""
+        logger.info(f"Translated {len(translations)} components to {output_dir} "
+                    f"(cache: {self.cache.hits} hits, {self.cache.misses} misses)")
+        compaction = self.compactor.summary()
+        if compaction["components"]:
+            logger.info(f"Prompt compaction saved {compaction['saved_tokens']} of {compaction['original_tokens']} "
+                        f"source tokens across {compaction['components']} components")
+        for model, stats in self.router.summary().items():
+            logger.info(f"Route {model}: {stats['calls']} calls, {stats['escalations']} escalations, "
+                        f"avg {stats['avg_latency_seconds']}s, ${stats['cost_usd']} total")
+        accountant.log_summary()
+    
+    def translate_all_components(self, output_dir: str = "./swift_output", resume: bool = True,
+                                 components: Optional[List[Document]] = None) -> Dict[str, str]:
+        """Translate all components and save to files, one file per original Kotlin source."""
+        return self.engine.run_sync(self.translate_all_components_async(output_dir, resume=resume, components=components))
+    
+    def write_batch_jobs(self, jobs_path: str = "./translation_batch.jsonl", manifest_path: Optional[str] = None) -> Dict:
+        """
+        Write every uncached component's prompts to a JSONL batch job file and a manifest
+        describing how to turn the results back into Swift files. Batch jobs always use the
+        strong model, since there is no chance to escalate within a batch.
+        """
+        manifest_path = manifest_path or os.path.splitext(jobs_path)[0] + ".manifest.json"
+        components = self.get_components_by_type()
+        
+        requests = []
+        entries = []
+        for file_name, component_doc in self._group_components(components):
+            metadata = component_doc.metadata
+            component_id = metadata.get("file_path") or file_name
+            entry = {
+                "file_name": file_name,
+                "component_id": component_id,
+                "cache_key": self._cache_key(component_doc),
+                "request_ids": [],
+                "placeholders": {},
+            }
+            
+            if self.cache.get(entry["cache_key"]) is None:
+                compacted, entry["placeholders"] = self.compactor.compact(component_doc.page_content)
+                self.compactor.report(metadata.get("name", file_name), component_doc.page_content, compacted)
+                for index, prompt in enumerate(self._translation_prompts(compacted, metadata)):
+                    request_id = f"{component_id}#{index}"
+                    requests.append(batch_request(request_id, prompt, self.model_name, self.temperature))
+                    entry["request_ids"].append(request_id)
+            entries.append(entry)
+        
+        write_batch_file(jobs_path, requests)
+        manifest = {
+            "jobs_path": jobs_path,
+            "model": self.model_name,
+            "request_count": len(requests),
+            "components": entries,
+        }
+        atomic_write_text(manifest_path, json.dumps(manifest, indent=2))
+        
+        logger.info(f"Wrote {len(requests)} batch requests for {len(entries)} components to {jobs_path} "
+                    f"({len(entries) - sum(1 for e in entries if e['request_ids'])} cached)")
+        return manifest
+    
+    def ingest_batch_results(self, results_path: str, manifest_path: str = "./translation_batch.manifest.json",
+                             output_dir: str = "./swift_output") -> Dict[str, str]:
+        """
+        Write Swift files from a batch results JSONL produced by any executor. Components whose
+        source changed since the job was written are skipped; failed requests fall back to the
+        offline transpiler and are neither cached nor checkpointed.
+        """
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        results = read_batch_results(results_path)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        journal = self._journal(output_dir)
+        journal.load()
+        current = {}
+        for file_name, component_doc in self._group_components(self.get_components_by_type()):
+            current[component_doc.metadata.get("file_path") or file_name] = component_doc
+        
+        translations = {}
+        stale = failed = 0
+        for entry in manifest["components"]:
+            file_name = entry["file_name"]
+            component_doc = current.get(entry["component_id"])
+            if component_doc is None or self._cache_key(component_doc) != entry["cache_key"]:
+                stale += 1
+                continue
+            
+            result = self._cached_translation(entry["cache_key"])
+            if result is None:
+                outputs = [results.get(request_id) for request_id in entry["request_ids"]]
+                if entry["request_ids"] and all(output and output["content"] is not None for output in outputs):
+                    for output in outputs:
+                        usage = output["usage"]
+                        self.router.record(manifest["model"], 0.0, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+                    raw = self.compactor.restore(self._stitch_parts([output["content"] for output in outputs]), entry["placeholders"])
+                    result = self._store_translation(entry["cache_key"], component_doc, raw, self._clean_swift_code(raw), manifest["model"])
+                else:
+                    failed += 1
+                    logger.error(f"Batch results incomplete for {entry['component_id']}, using offline translation")
+                    raw = self._basic_translation(component_doc.page_content)
+                    result = {"raw": raw, "cleaned": self._clean_swift_code(raw), "fallback": True}
+            
+            swift_code = self._write_swift_file(output_dir, file_name, component_doc.metadata, result["cleaned"])
+            if not result.get("fallback"):
+                journal.record(entry["component_id"], entry["cache_key"], self._swift_file_path(output_dir, file_name), sha256_text(swift_code))
+            translations[file_name] = swift_code
+        
+        journal.compact()
+        logger.info(f"Ingested batch results: {len(translations)} written, {failed} fell back, {stale} stale components skipped")
+        return translations
+    
+    async def translate_by_type_async(self, component_type: str, output_dir: str = "./swift_output",
+                                      resume: bool = True) -> Dict[str, str]:
+        """Translate the components of one type into a type-specific directory, one file per Kotlin source."""
         components = self.get_components_by_type(component_type)
         
         if not components:
             logger.error(f"No {component_type} components found")
             return {}
         
-        # Create type-specific output directory
         type_output_dir = os.path.join(output_dir, component_type.lower())
-        os.makedirs(type_output_dir, exist_ok=True)
-        
-        translations = {}
-        
-        for component in components:
-            try:
-                swift_code = self.translate_component(component)
-                component_name = component.metadata.get("name", "Unknown")
-                
-                filename = f"{component_name}.swift"
-                filepath = os.path.join(type_output_dir, filename)
-                
-                # Add header comment
-                header = f"""//
-//  {component_name}.swift
-//  Generated from Kotlin {component_type}
-//
-//  Original component: {component.metadata.get('filename', 'Unknown')}
-//  Component type: {component_type}
-//  Language: {component.metadata.get('language', 'Unknown')}
-//
-
-"""
-                swift_code = header + swift_code
-                
-                # Save to file
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(swift_code)
-                
-                translations[component_name] = swift_code
-                logger.info(f"Translated {component_type}: {component_name} -> {filepath}")
-                
-            except Exception as e:
-                logger.error(f"Error translating {component_type} {component.metadata.get('name', 'Unknown')}: {e}")
-        
-        logger.info(f"Translated {len(translations)} {component_type} components to {type_output_dir}")
-        return translations
+        return await self._translate_jobs_async(self._group_components(components), type_output_dir, resume)
+    
+    def translate_by_type(self, component_type: str, output_dir: str = "./swift_output", resume: bool = True) -> Dict[str, str]:
+        """Translate components of a specific type."""
+        return self.engine.run_sync(self.translate_by_type_async(component_type, output_dir, resume=resume))
 
 def main():
     """Main function to run the translator."""
@@ -462,30 +864,41 @@ def main():
         logger.error("OPENAI_API_KEY not found in environment variables!")
         return
     
+    profiler.start_from_argv()
     translator = KotlinToSwiftTranslator()
     
     print("🔄 Kotlin to Swift Translator")
     print("=" * 40)
     
     # Check if component database exists
-    if not os.path.exists("./component_vector_db"):
+    if translator.load_component_database() is None:
         print("❌ Component database not found!")
         print("Please run the RAG processor first to create the component database.")
         return
     
-    # Get available component types
-    vectorstore = translator.load_component_database()
-    if vectorstore:
-        docs = vectorstore.get()
-        component_types = set()
-        for meta in docs["metadatas"]:
-            component_types.add(meta.get("component_type", "Unknown"))
+    # Get available component types (metadata only, no document text)
+    type_counts = translator.catalog.count_by_type()
+    if type_counts:
+        print(f"📦 Available component types: {', '.join(f'{t} ({n})' for t, n in type_counts.items())}")
         
-        print(f"📦 Available component types: {', '.join(component_types)}")
+        if "--dry-run" in sys.argv[1:]:
+            # Estimate only: no LLM calls are made
+            try:
+                estimate = translator.preflight_translation()
+                print(f"🧮 Estimated {estimate['tokens']} tokens, ${estimate['cost_usd']}: within budget")
+            except BudgetExceededError as e:
+                print(f"❌ {e}")
+            return
         
         # Translate all components
         print("\n🔄 Translating all components...")
-        translations = translator.translate_all_components()
+        try:
+            with profiler.stage("translate"):
+                translations = translator.translate_all_components()
+        except BudgetExceededError as e:
+            print(f"❌ {e}")
+            translations = {}
+        telemetry.export()
         
         if translations:
             print(f"✅ Successfully translated {len(translations)} components!")
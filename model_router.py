@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Model Router
+Chooses the translation model per component from its type, size and symbol
+complexity, validates the output and records per-route latency and cost.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, List, Optional
+
+from kotlin_dependency_graph import KotlinDependencyGraph
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# USD per 1K (input, output) tokens; override with MODEL_PRICES="model=in/out,..."
+DEFAULT_MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "text-embedding-3-small": (0.00002, 0.0),
+    "text-embedding-3-large": (0.00013, 0.0),
+}
+
+SWIFT_DECLARATION_PATTERN = re.compile(r'\b(?:struct|class|enum|protocol|extension|func|actor)\b')
+KOTLIN_LEFTOVER_PATTERN = re.compile(r'^\s*(?:fun |val |data class |companion object|@Composable)', re.MULTILINE)
+
+
+def parse_model_prices(spec: str) -> Dict[str, tuple]:
+    """Parse "model=input/output,..." price overrides."""
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            model, costs = item.split("=", 1)
+            input_cost, output_cost = costs.split("/", 1)
+            prices[model.strip()] = (float(input_cost), float(output_cost))
+        except ValueError:
+            logger.warning(f"Ignoring malformed model price '{item}'")
+    return prices
+
+
+def model_prices() -> Dict[str, tuple]:
+    """The default prices with the MODEL_PRICES overrides applied."""
+    return {**DEFAULT_MODEL_PRICES, **parse_model_prices(os.getenv("MODEL_PRICES", ""))}
+
+
+def call_cost(prices: Dict[str, tuple], model: str, input_tokens: float, output_tokens: float = 0) -> float:
+    """Estimated USD cost of `input_tokens` in and `output_tokens` out of `model` under `prices`."""
+    input_price, output_price = prices.get(model, (0.0, 0.0))
+    return input_tokens / 1000 * input_price + output_tokens / 1000 * output_price
+
+
+class ModelRouter:
+    """
+    Routes simple components to a cheaper, faster model and escalates to the
+    strong model only when the fast model's output fails the checks.
+    """
+
+    def __init__(self, fast_model: str = "gpt-4o-mini", strong_model: str = "gpt-4",
+                 simple_types: Optional[List[str]] = None, max_fast_tokens: int = 1500,
+                 max_fast_symbols: int = 25, enabled: bool = True):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.simple_types = set(simple_types if simple_types is not None else ["Model"])
+        self.max_fast_tokens = max_fast_tokens
+        self.max_fast_symbols = max_fast_symbols
+        self.enabled = enabled and fast_model != strong_model
+        self.prices = model_prices()
+        self.route_stats: Dict[str, Dict] = {}
+        self._symbol_parser = KotlinDependencyGraph()
+
+    @classmethod
+    def from_env(cls, strong_model: str) -> "ModelRouter":
+        """Build a router from TRANSLATION_* environment variables."""
+        return cls(
+            fast_model=os.getenv("TRANSLATION_FAST_MODEL", "gpt-4o-mini"),
+            strong_model=strong_model,
+            simple_types=[t.strip() for t in os.getenv("TRANSLATION_FAST_TYPES", "Model").split(",") if t.strip()],
+            max_fast_tokens=int(os.getenv("TRANSLATION_FAST_MAX_TOKENS", "1500")),
+            max_fast_symbols=int(os.getenv("TRANSLATION_FAST_MAX_SYMBOLS", "25")),
+            enabled=os.getenv("TRANSLATION_ROUTING", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def symbol_complexity(self, kotlin_code: str) -> int:
+        """Declarations plus distinct referenced type names: a cheap proxy for how much context a translation needs."""
+        symbols = self._symbol_parser.parse_source(kotlin_code)
+        referenced_types = [name for name in symbols["references"] if name[:1].isupper()]
+        return len(symbols["declarations"]) + len(referenced_types)
+
+    def route(self, component_type: str, prompt_tokens: int, kotlin_code: str) -> List[str]:
+        """Models to try in order: the fast model first for simple components, else only the strong one."""
+        if not self.enabled:
+            return [self.strong_model]
+
+        if (component_type in self.simple_types
+                and prompt_tokens <= self.max_fast_tokens
+                and self.symbol_complexity(kotlin_code) <= self.max_fast_symbols):
+            return [self.fast_model, self.strong_model]
+        return [self.strong_model]
+
+    def check_output(self, swift_code: str) -> List[str]:
+        """Problems with a translation that justify escalating to the strong model."""
+        problems = []
+        if not swift_code.strip():
+            return ["empty output"]
+        if not SWIFT_DECLARATION_PATTERN.search(swift_code):
+            problems.append("no Swift declarations")
+        for opening, closing in ("{}", "()", "[]"):
+            if swift_code.count(opening) != swift_code.count(closing):
+                problems.append(f"unbalanced {opening}{closing}")
+        if KOTLIN_LEFTOVER_PATTERN.search(swift_code):
+            problems.append("untranslated Kotlin syntax")
+        return problems
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        """Estimated USD cost of a call."""
+        return call_cost(self.prices, model, input_tokens, output_tokens)
+
+    def record(self, model: str, latency: float, input_tokens: int, output_tokens: int):
+        """Record one call on the route for `model`."""
+        stats = self.route_stats.setdefault(model, {
+            "calls": 0, "escalations": 0, "latency_seconds": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+        stats["calls"] += 1
+        stats["latency_seconds"] += latency
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        stats["cost_usd"] += self.cost(model, input_tokens, output_tokens)
+
+    def record_escalation(self, model: str):
+        """Count an output of `model` that failed the checks."""
+        if model in self.route_stats:
+            self.route_stats[model]["escalations"] += 1
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-route totals with average latency and cost per call."""
+        summary = {}
+        for model, stats in self.route_stats.items():
+            calls = max(1, stats["calls"])
+            summary[model] = {
+                **stats,
+                "latency_seconds": round(stats["latency_seconds"], 3),
+                "cost_usd": round(stats["cost_usd"], 5),
+                "avg_latency_seconds": round(stats["latency_seconds"] / calls, 3),
+                "avg_cost_usd": round(stats["cost_usd"] / calls, 5),
+            }
+        return summary
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+In-Process Pipeline
+Runs RAG processing -> component extraction -> translation -> cleaning in one
+interpreter. Each stage is imported once, on first use, and hands its documents,
+vectors and components to the next stage in memory instead of re-opening the
+stores it just wrote. Stage output streams live and every stage is timed.
+Stages whose inputs did not change since their last run are skipped. With
+--stream the stages overlap instead: files are classified and translated while
+later files are still being embedded.
+"""
+
+import os
+import sys
+import time
+import queue
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from profiling import profiler
+from telemetry import telemetry
+from token_accounting import accountant, BudgetExceededError
+from workflow_state import StepSpec, WorkflowState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PipelineContext:
+    """State handed from one stage to the next."""
+
+    def __init__(self, project_path: str = "ANDROID_APP", output_dir: str = "./swift_output"):
+        self.project_path = project_path
+        self.output_dir = output_dir
+        self.documents: Optional[List[Any]] = None
+        self.embeddings: Optional[List[List[float]]] = None
+        self.components: Optional[List[Any]] = None
+        self.translations: Dict[str, str] = {}
+        self.clean_stats: Dict[str, int] = {}
+        # Step name -> problems that keep a step that otherwise succeeded from being recorded as up to date
+        self.incomplete: Dict[str, List[str]] = {}
+
+
+def run_rag_stage(context: PipelineContext) -> bool:
+    """Chunk and embed the Android project into the main vector database."""
+    from android_rag_processor import AndroidProjectRAGProcessor
+    from langchain_core.documents import Document
+
+    processor = AndroidProjectRAGProcessor(context.project_path)
+    vector_store = processor.run_full_processing()
+    if not vector_store:
+        return False
+
+    # Read the vectors back from the open store so extraction does not embed the same chunks again
+    stored = vector_store.get(include=["documents", "metadatas", "embeddings"])
+    context.documents = [Document(page_content=text, metadata=processor.file_table.hydrate(meta))
+                         for text, meta in zip(stored["documents"], stored["metadatas"])]
+    context.embeddings = [list(vector) for vector in stored["embeddings"]]
+    return True
+
+
+def run_extraction_stage(context: PipelineContext) -> bool:
+    """Categorize Kotlin chunks into components and store them with their existing vectors."""
+    from component_extractor import ComponentExtractor
+
+    extractor = ComponentExtractor()
+    context.components = extractor.run_extraction(context.documents, context.embeddings)
+    return bool(context.components)
+
+
+def run_translation_stage(context: PipelineContext) -> bool:
+    """Translate the extracted components to Swift."""
+    from kotlin_to_swift_translator import KotlinToSwiftTranslator
+
+    translator = KotlinToSwiftTranslator(project_path=context.project_path)
+    context.translations = translator.translate_all_components(context.output_dir, components=context.components)
+    # Failed and fallback components must be retried by the next run
+    context.incomplete["translate"] = [f"{name}: {reason}" for name, reason in translator.incomplete.items()]
+    return bool(context.translations)
+
+
+def run_cleaning_stage(context: PipelineContext) -> bool:
+    """Strip leftover markdown from the generated Swift files."""
+    from clean_swift_files import clean_swift_directory
+
+    context.clean_stats = clean_swift_directory(context.output_dir)
+    return context.clean_stats.get("errors", 0) == 0
+
+
+def build_stages(project_path: str, output_dir: str) -> List[Tuple[StepSpec, str, Callable[[PipelineContext], bool]]]:
+    """The workflow step graph: each step with its inputs, config, upstream steps and outputs."""
+    from unified_store import unified_layout, unified_store_path
+
+    vector_db_path = os.getenv("VECTOR_DB_PATH", "./vector_db")
+    component_db_path = "./component_vector_db"
+    if unified_layout():
+        vector_db_path = component_db_path = unified_store_path()
+    return [
+        (StepSpec("rag",
+                  inputs=[project_path, "android_rag_processor.py", "unified_store.py"],
+                  config=["VECTOR_DB_PATH", "STORE_LAYOUT", "UNIFIED_STORE_PATH", "CHUNK_SIZE", "CHUNK_OVERLAP",
+                          "MAX_TOKENS", "INCLUDE_EXTENSIONS", "EXCLUDE_PATTERNS"],
+                  outputs=[vector_db_path]),
+         "Processing Android project with RAG", run_rag_stage),
+        (StepSpec("extract",
+                  inputs=["component_extractor.py", "unified_store.py"],
+                  upstream=["rag"],
+                  outputs=[component_db_path]),
+         "Extracting Android components", run_extraction_stage),
+        (StepSpec("translate",
+                  inputs=["kotlin_to_swift_translator.py", "prompt_compactor.py", "model_router.py",
+                          "component_splitter.py", "swift_sanitizer.py", "translation_engine.py",
+                          "translation_cache.py", "kotlin_swift_transpiler.py", "token_utils.py",
+                          "translation_journal.py", "batch_jobs.py"],
+                  config=["TRANSLATION_MODEL", "TRANSLATION_FAST_MODEL", "TRANSLATION_FAST_TYPES",
+                          "TRANSLATION_FAST_MAX_TOKENS", "TRANSLATION_FAST_MAX_SYMBOLS", "TRANSLATION_ROUTING",
+                          "TRANSLATION_MAX_PROMPT_TOKENS", "PROMPT_COMPACTION", "PROMPT_COMPACTION_STRINGS",
+                          "PROMPT_COMPACTION_MIN_STRING_LENGTH"],
+                  upstream=["extract"],
+                  outputs=[output_dir]),
+         "Translating to Swift", run_translation_stage),
+        (StepSpec("clean",
+                  inputs=["clean_swift_files.py", "swift_sanitizer.py"],
+                  upstream=["translate"],
+                  outputs=[output_dir]),
+         "Cleaning Swift files", run_cleaning_stage),
+    ]
+
+
+def parse_force_argument(args: List[str]) -> List[str]:
+    """Steps named by `--force step[,step]` (or `--force all`) on the command line."""
+    force = []
+    for index, arg in enumerate(args):
+        if arg == "--force" and index + 1 < len(args):
+            force.extend(name.strip() for name in args[index + 1].split(",") if name.strip())
+        elif arg.startswith("--force="):
+            force.extend(name.strip() for name in arg.split("=", 1)[1].split(",") if name.strip())
+    return force
+
+
+class WorkflowPipeline:
+    """
+    Runs the workflow stages in order within the current process, stopping at the first failure.
+    """
+
+    def __init__(self, project_path: str = "ANDROID_APP", output_dir: str = "./swift_output",
+                 state_path: Optional[str] = None):
+        self.context = PipelineContext(project_path, output_dir)
+        self.stages = build_stages(project_path, output_dir)
+        self.state = WorkflowState(state_path or os.getenv("WORKFLOW_STATE_PATH", "./.workflow_state.json")).load()
+        self.timings: Dict[str, float] = {}
+        self.skipped: List[str] = []
+
+    def run(self, stages: Optional[List[str]] = None, force: Optional[List[str]] = None) -> bool:
+        """
+        Run all stages (or the named ones), skipping those that are up to date.
+        Stages named in `force` (or all, with ["all"]) run regardless. Returns True when every stage succeeded.
+        """
+        selected = [stage for stage in self.stages if stages is None or stage[0].name in stages]
+        force = set(force or [])
+        started = time.perf_counter()
+
+        for number, (spec, description, stage) in enumerate(selected, 1):
+            name = spec.name
+            input_hash = self.state.input_hash(spec)
+            if name not in force and "all" not in force and self.state.is_current(spec, input_hash):
+                self.skipped.append(name)
+                telemetry.incr("stages_skipped", stage=name)
+                print(f"\n⏭️  Step {number}/{len(selected)}: {description} is up to date", flush=True)
+                continue
+
+            print(f"\n🔄 Step {number}/{len(selected)}: {description}", flush=True)
+            print("=" * 50, flush=True)
+
+            stage_started = time.perf_counter()
+            with telemetry.span(f"stage.{name}") as span, profiler.stage(name):
+                try:
+                    ok = stage(self.context)
+                except Exception as e:
+                    logger.exception(f"Stage {name} raised: {e}")
+                    ok = False
+                span.status = "ok" if ok else "error"
+            self.timings[name] = time.perf_counter() - stage_started
+
+            status = "✅" if ok else "❌"
+            print(f"{status} {description} finished in {self.timings[name]:.1f}s", flush=True)
+            if not ok:
+                telemetry.export()
+                return False
+            if self.context.incomplete.get(name):
+                self._report_incomplete(name)
+                continue
+            self.state.record(spec, input_hash)
+
+        self.timings["total"] = time.perf_counter() - started
+        telemetry.export()
+        return True
+
+    def run_streaming(self, queue_size: Optional[int] = None) -> bool:
+        """
+        Run all stages concurrently as a producer/consumer pipeline. Ingestion embeds and stores
+        the project file by file. Each file's Kotlin chunks are classified into components and
+        queued for translation right away. Bounded queues hold back a stage that gets too far ahead.
+        Wall time approaches that of the slowest stage instead of the sum of all stages.
+        """
+        from android_rag_processor import AndroidProjectRAGProcessor
+        from component_extractor import ComponentExtractor
+        from kotlin_to_swift_translator import KotlinToSwiftTranslator
+        from clean_swift_files import clean_swift_directory
+
+        queue_size = queue_size or int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+        context = self.context
+        processor = AndroidProjectRAGProcessor(context.project_path)
+        extractor = ComponentExtractor()
+        translator = KotlinToSwiftTranslator(project_path=context.project_path)
+
+        # Only the embedding workload is known up front; translation calls are checked one by one
+        try:
+            processor.preflight_embedding()
+        except BudgetExceededError as e:
+            print(f"❌ {e}", flush=True)
+            return False
+
+        ingested: queue.Queue = queue.Queue(maxsize=queue_size)
+        classified: queue.Queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        failures: List[str] = []
+        started = time.perf_counter()
+
+        def put(target: queue.Queue, item: Any):
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            # A stage failed: drop queued work, but the end-of-stream marker must still arrive
+            if item is None:
+                while True:
+                    try:
+                        target.get_nowait()
+                    except queue.Empty:
+                        break
+                target.put_nowait(None)
+
+        def ingest():
+            try:
+                with telemetry.span("stage.rag", streaming=True), profiler.stage("rag"):
+                    relevant_files = processor.get_relevant_files()
+                    for _, documents in processor.iter_project(relevant_files):
+                        if stop.is_set():
+                            break
+                        put(ingested, (documents, processor.add_documents(documents)))
+
+                    # Whole-project artifacts once every file is in
+                    processor.remove_deleted_files(relevant_files)
+                    processor.dependency_graph.update_from_project(processor.project_path, relevant_files)
+                    file_structure_doc = processor.create_file_structure_document()
+                    processor.add_documents([file_structure_doc])
+                    processor.create_file_structure_vector_store(file_structure_doc)
+            except Exception as e:
+                logger.exception(f"Ingestion failed: {e}")
+                failures.append("rag")
+            finally:
+                self.timings["rag"] = time.perf_counter() - started
+                put(ingested, None)
+
+        def classify():
+            try:
+                with telemetry.span("stage.extract", streaming=True), profiler.stage("extract"):
+                    while True:
+                        item = ingested.get()
+                        if item is None:
+                            break
+                        documents, vectors = item
+                        components, component_vectors = [], []
+                        for document, vector in zip(documents, vectors):
+                            component = extractor.component_from_chunk(document.page_content, document.metadata)
+                            if component is not None:
+                                components.append(component)
+                                component_vectors.append(vector)
+                        if components:
+                            extractor.create_component_database(components, component_vectors)
+                            put(classified, components)
+            except Exception as e:
+                logger.exception(f"Component extraction failed: {e}")
+                failures.append("extract")
+                stop.set()
+            finally:
+                self.timings["extract"] = time.perf_counter() - started
+                put(classified, None)
+
+        threads = [threading.Thread(target=ingest, name="ingest", daemon=True),
+                   threading.Thread(target=classify, name="classify", daemon=True)]
+        print(f"\n🔄 Streaming ingestion -> extraction -> translation (queue size {queue_size})", flush=True)
+        for thread in threads:
+            thread.start()
+
+        try:
+            with telemetry.span("stage.translate", streaming=True), profiler.stage("translate"):
+                context.translations = asyncio.run(translator.translate_stream_async(classified, context.output_dir))
+        except Exception as e:
+            logger.exception(f"Translation failed: {e}")
+            failures.append("translate")
+            stop.set()
+        self.timings["translate"] = time.perf_counter() - started
+        for thread in threads:
+            thread.join()
+
+        if failures:
+            print(f"❌ Streaming pipeline failed in: {', '.join(failures)}", flush=True)
+            telemetry.export()
+            return False
+
+        clean_started = time.perf_counter()
+        with telemetry.span("stage.clean"), profiler.stage("clean"):
+            context.clean_stats = clean_swift_directory(context.output_dir)
+        self.timings["clean"] = time.perf_counter() - clean_started
+        self.timings["total"] = time.perf_counter() - started
+
+        context.incomplete["translate"] = [f"{name}: {reason}" for name, reason in translator.incomplete.items()]
+        if context.clean_stats.get("errors", 0):
+            context.incomplete["clean"] = [f"{context.clean_stats['errors']} files could not be cleaned"]
+
+        # Steps that fully succeeded are now up to date for the staged runner as well
+        for spec, _, _ in self.stages:
+            if context.incomplete.get(spec.name):
+                self._report_incomplete(spec.name)
+            else:
+                self.state.record(spec, self.state.input_hash(spec))
+        telemetry.export()
+        print(f"✅ Streaming pipeline finished in {self.timings['total']:.1f}s", flush=True)
+        return True
+
+    def _report_incomplete(self, name: str):
+        """Print why step `name` is left stale so the next run repeats it."""
+        problems = self.context.incomplete[name]
+        print(f"⚠️  {name} is not recorded as up to date, {len(problems)} problems will be retried next run:", flush=True)
+        for problem in problems[:10]:
+            print(f"   - {problem}", flush=True)
+        if len(problems) > 10:
+            print(f"   ... and {len(problems) - 10} more", flush=True)
+
+    def timing_report(self) -> str:
+        """One line per stage with its wall time (time since start, for streaming runs)."""
+        return "\n".join(f"  {name:<10} {seconds:8.1f}s" for name, seconds in self.timings.items())
+
+
+def main():
+    """Run the complete workflow in-process."""
+    print("🚀 In-Process Android to Swift Pipeline")
+    print("=" * 60)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY not found in environment variables!")
+        return
+
+    # --profile (or --profile=sample, which also covers the --stream threads) profiles every stage
+    profiler.start_from_argv()
+    pipeline = WorkflowPipeline()
+    if "--stream" in sys.argv[1:]:
+        ok = pipeline.run_streaming()
+    else:
+        ok = pipeline.run(force=parse_force_argument(sys.argv[1:]))
+    print("\n⏱️  Stage timings:")
+    print(pipeline.timing_report())
+    usage = accountant.summary()["total"]
+    print(f"\n💰 Token usage: {usage['tokens']} tokens in {usage['calls']} calls, ${usage['cost_usd']}")
+    print("\n✅ Pipeline complete!" if ok else "\n❌ Pipeline stopped after a failed stage")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Profiling
+Built-in profiling for every entry point: pass --profile (cProfile) or
+--profile=sample (a low-overhead stack sampler that also sees worker threads)
+and each stage is profiled separately, with tracemalloc's top allocations next
+to it. Results go to a per-run directory: a pstats dump and a readable report
+per stage, plus a summary of the hottest functions and of the functions we
+watch most closely (the regex-heavy classification and cleaning paths).
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import json
+import atexit
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from file_utils import atomic_write_text
+from telemetry import telemetry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODES = ("cpu", "sample")
+
+# Always reported in the summary, whether or not they make the top list
+WATCHED_FUNCTIONS = ["detect_component_type", "extract_component_name", "component_from_chunk",
+                     "_clean_swift_code", "sanitize_swift", "extract_swift_code", "clean_swift_file"]
+
+FunctionKey = Tuple[str, int, str]
+
+
+def _function_label(key: FunctionKey) -> str:
+    file_name, line, name = key
+    return f"{os.path.basename(file_name)}:{line}({name})" if line else name
+
+
+def hot_functions(stats: pstats.Stats, top: int) -> List[Dict]:
+    """The `top` functions by self time of a pstats profile."""
+    rows = [{"function": _function_label(key), "calls": nc, "self_seconds": round(tt, 6),
+             "cumulative_seconds": round(ct, 6)}
+            for key, (_, nc, tt, ct, _) in stats.stats.items()]
+    return sorted(rows, key=lambda row: row["self_seconds"], reverse=True)[:top]
+
+
+def watched_functions(stats: pstats.Stats, names: List[str]) -> List[Dict]:
+    """Calls and time of every watched function that ran, summed over same-named functions."""
+    totals: Dict[str, Dict] = {}
+    for (_, _, name), (_, nc, tt, ct, _) in stats.stats.items():
+        if name in names:
+            row = totals.setdefault(name, {"function": name, "calls": 0, "self_seconds": 0.0,
+                                           "cumulative_seconds": 0.0})
+            row["calls"] += nc
+            row["self_seconds"] = round(row["self_seconds"] + tt, 6)
+            row["cumulative_seconds"] = round(row["cumulative_seconds"] + ct, 6)
+    return sorted(totals.values(), key=lambda row: row["cumulative_seconds"], reverse=True)
+
+
+class StackSampler:
+    """
+    Samples the stacks of all threads every `interval` seconds. Costs almost nothing
+    per call, so it suits long runs and the threads of the streaming pipeline.
+    """
+
+    def __init__(self, interval: float, stage_of: Any):
+        self.interval = interval
+        self.stage_of = stage_of
+        # stage -> function -> samples with the function on top of the stack (self) / anywhere (total)
+        self.self_samples: Dict[str, Counter] = {}
+        self.total_samples: Dict[str, Counter] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stage = self.stage_of(thread_id)
+                if stage is None:
+                    continue
+                code = frame.f_code
+                self.self_samples.setdefault(stage, Counter())[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+                on_stack = set()
+                while frame is not None:
+                    code = frame.f_code
+                    on_stack.add((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.total_samples.setdefault(stage, Counter()).update(on_stack)
+
+    def rows(self, stage: str, top: int) -> List[Dict]:
+        """The `top` functions by self samples of a stage, with the samples converted to seconds."""
+        totals = self.total_samples.get(stage, Counter())
+        return [{"function": _function_label(key), "self_samples": count,
+                 "self_seconds": round(count * self.interval, 3),
+                 "cumulative_seconds": round(totals[key] * self.interval, 3)}
+                for key, count in self.self_samples.get(stage, Counter()).most_common(top)]
+
+    def watched(self, names: List[str]) -> List[Dict]:
+        """Sampled time of every watched function that ran, over all stages."""
+        totals: Dict[str, Dict] = {}
+        for stage, counter in self.total_samples.items():
+            self_counter = self.self_samples.get(stage, Counter())
+            for key, count in counter.items():
+                if key[2] in names:
+                    row = totals.setdefault(key[2], {"function": key[2], "self_seconds": 0.0, "cumulative_seconds": 0.0})
+                    row["self_seconds"] += self_counter[key] * self.interval
+                    row["cumulative_seconds"] += count * self.interval
+        for row in totals.values():
+            row["self_seconds"] = round(row["self_seconds"], 3)
+            row["cumulative_seconds"] = round(row["cumulative_seconds"], 3)
+        return sorted(totals.values(), key=lambda row: row["cumulative_seconds"], reverse=True)
+
+
+class _StageRecord:
+    """Everything collected for one stage name, over all the times it ran."""
+
+    def __init__(self):
+        self.runs = 0
+        self.seconds = 0.0
+        self.profiles: List[cProfile.Profile] = []
+        self.allocations: List[Dict] = []
+        self.peak_bytes = 0
+
+
+class Profiler:
+    """
+    Process-wide profiler. Inactive until started, and `stage()` is free while inactive,
+    so stages can be marked unconditionally.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.output_dir: Optional[str] = None
+        self.top = int(os.getenv("PROFILE_TOP", "25"))
+        self.trace_memory = os.getenv("PROFILE_MEMORY", "true").lower() == "true"
+        self.sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+        self.stages: Dict[str, _StageRecord] = {}
+        self.sampler: Optional[StackSampler] = None
+        self._stacks: Dict[int, List[Tuple[str, Optional[cProfile.Profile]]]] = {}
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._finished = False
+
+    @property
+    def active(self) -> bool:
+        return self.mode is not None
+
+    def start(self, mode: str = "cpu", output_dir: Optional[str] = None) -> str:
+        """Start profiling in `mode` ("cpu" or "sample"). Returns the run directory."""
+        if self.active:
+            return self.output_dir
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.output_dir = output_dir or os.path.join(os.getenv("PROFILE_DIR", "./profiles"),
+                                                     f"{time.strftime('%Y%m%d-%H%M%S')}-{telemetry.run_id}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if mode == "sample":
+            self.sampler = StackSampler(self.sample_interval, self._stage_of)
+            self.sampler.start()
+        self._started = time.perf_counter()
+        # Scripts have several exits; the report is written on whichever one is taken
+        atexit.register(self.finish)
+        logger.info(f"Profiling ({mode}) into {self.output_dir}")
+        return self.output_dir
+
+    def start_from_argv(self, argv: Optional[List[str]] = None) -> bool:
+        """
+        Start profiling if the command line has --profile or --profile=<mode>, and remove
+        the option so the entry point's own argument handling never sees it.
+        """
+        argv = sys.argv if argv is None else argv
+        mode = None
+        for arg in list(argv[1:]):
+            if arg == "--profile" or arg.startswith("--profile="):
+                mode = arg.partition("=")[2] or "cpu"
+                argv.remove(arg)
+        if mode is None:
+            return False
+        self.start(mode)
+        return True
+
+    def _stage_of(self, thread_id: int) -> Optional[str]:
+        stack = self._stacks.get(thread_id)
+        return stack[-1][0] if stack else None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block as stage `name`. Nested stages pause the enclosing one."""
+        if not self.active:
+            yield
+            return
+
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        if stack and stack[-1][1] is not None:
+            stack[-1][1].disable()
+        profile = None
+        if self.mode == "cpu":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time across threads; sample mode covers those stages
+                logger.warning(f"Stage {name} overlaps another profiled stage; use --profile=sample for concurrent stages")
+                profile = None
+        stack.append((name, profile))
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if snapshot is not None:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            stack.pop()
+            allocations, peak = [], 0
+            if snapshot is not None:
+                allocations = self._allocation_diff(snapshot, tracemalloc.take_snapshot())
+                peak = tracemalloc.get_traced_memory()[1]
+            with self._lock:
+                record = self.stages.setdefault(name, _StageRecord())
+                record.runs += 1
+                record.seconds += seconds
+                if profile is not None:
+                    record.profiles.append(profile)
+                # The largest growth of any run of the stage is the one worth reading
+                if sum(row["size_kb"] for row in allocations) > sum(row["size_kb"] for row in record.allocations):
+                    record.allocations = allocations
+                record.peak_bytes = max(record.peak_bytes, peak)
+            if stack and stack[-1][1] is not None:
+                stack[-1][1].enable()
+
+    def _allocation_diff(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[Dict]:
+        """Source lines that allocated the most memory still held at the end of the stage."""
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        return [{"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+                for stat in diff if stat.size_diff > 0][:self.top]
+
+    def _write_stage(self, name: str, record: _StageRecord, stats: Optional[pstats.Stats]) -> Dict:
+        summary = {"runs": record.runs, "seconds": round(record.seconds, 3),
+                   "peak_memory_mb": round(record.peak_bytes / 1024 / 1024, 1),
+                   "top_allocations": record.allocations[:10]}
+        base = os.path.join(self.output_dir, re.sub(r'[^\w.-]', '_', name))
+        if stats is not None:
+            # The .prof file opens in snakeviz or `python -m pstats`
+            stats.dump_stats(f"{base}.prof")
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(self.top)
+            atomic_write_text(f"{base}.txt", report.getvalue())
+            summary["hot_functions"] = hot_functions(stats, self.top)
+        elif self.sampler is not None:
+            summary["hot_functions"] = self.sampler.rows(name, self.top)
+            lines = [f"{row['self_samples']:>8} samples  {row['self_seconds']:>8.3f}s self  "
+                     f"{row['cumulative_seconds']:>8.3f}s cum  {row['function']}" for row in summary["hot_functions"]]
+            atomic_write_text(f"{base}.txt", "\n".join(lines) + "\n")
+        if record.allocations:
+            lines = [f"{row['size_kb']:>10.1f} KiB  {row['count']:>8}  {row['location']}" for row in record.allocations]
+            atomic_write_text(f"{base}.alloc.txt", "\n".join(lines) + "\n")
+        return summary
+
+    def finish(self) -> Optional[str]:
+        """Write the per-stage reports and the run summary. Returns the summary path."""
+        if not self.active or self._finished:
+            return None
+        self._finished = True
+        if self.sampler is not None:
+            self.sampler.stop()
+
+        with self._lock:
+            records = dict(self.stages)
+        stages = {}
+        profiles = []
+        for name, record in records.items():
+            stats = pstats.Stats(*record.profiles) if record.profiles else None
+            stages[name] = self._write_stage(name, record, stats)
+            profiles.extend(record.profiles)
+        # Every stage together: the hottest functions of the whole run
+        combined = pstats.Stats(*profiles) if profiles else None
+
+        summary = {"mode": self.mode, "run_id": telemetry.run_id,
+                   "seconds": round(time.perf_counter() - self._started, 3), "stages": stages}
+        if combined is not None:
+            summary["hot_functions"] = hot_functions(combined, self.top)
+            summary["watched_functions"] = watched_functions(combined, WATCHED_FUNCTIONS)
+        elif self.sampler is not None:
+            summary["watched_functions"] = self.sampler.watched(WATCHED_FUNCTIONS)
+
+        summary_path = os.path.join(self.output_dir, "summary.json")
+        atomic_write_text(summary_path, json.dumps(summary, indent=2))
+        atomic_write_text(os.path.join(self.output_dir, "summary.txt"), self.summary_text(summary))
+        print(f"\n🔬 Profile written to {self.output_dir}")
+        print(self.summary_text(summary, top=10))
+        return summary_path
+
+    @staticmethod
+    def summary_text(summary: Dict, top: Optional[int] = None) -> str:
+        """The run summary as a readable report: stages, hottest functions, watched functions."""
+        lines = [f"Profile ({summary['mode']}) of run {summary['run_id']}, {summary['seconds']}s", "", "Stages:"]
+        for name, stage in summary["stages"].items():
+            lines.append(f"  {name:<16} {stage['seconds']:>9.3f}s  {stage['runs']:>4} runs  "
+                         f"peak {stage['peak_memory_mb']} MiB")
+
+        def table(title: str, rows: List[Dict]):
+            lines.extend(["", title])
+            for row in rows[:top]:
+                lines.append(f"  {row['self_seconds']:>9.3f}s self  {row['cumulative_seconds']:>9.3f}s cum  "
+                             f"{row.get('calls', ''):>8}  {row['function']}")
+
+        hot = summary.get("hot_functions")
+        if hot is None:
+            # Sample mode: the hottest functions are only known per stage
+            hot = sorted((row for stage in summary["stages"].values() for row in stage.get("hot_functions", [])),
+                         key=lambda row: row["self_seconds"], reverse=True)
+        table("Hot functions (self time):", hot)
+        table("Watched functions:", summary.get("watched_functions", []))
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide profiler every entry point and stage reports to
+profiler = Profiler()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Prompt Compactor
+Shrinks Kotlin source before it is embedded in a translation prompt: strips
+comments and redundant whitespace, collapses the import block into a
+deduplicated per-package summary and optionally swaps long string literals for
+placeholders that are restored in the translated output.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, List, Tuple
+
+from token_utils import count_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Comments are dropped; string and char literals are matched only so comment markers inside them are left alone
+COMPACT_PATTERN = re.compile(r'''
+    (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<raw_string>"""(?:.|\n)*?""")
+  | (?P<string>"(?:\\.|[^"\\\n])*")
+  | (?P<char>'(?:\\.|[^'\\\n])')
+''', re.DOTALL | re.VERBOSE)
+
+IMPORT_LINE_PATTERN = re.compile(r'^\s*import\s+([\w.]+?)(\.\*)?(?:\s+as\s+(\w+))?\s*;?\s*$')
+PLACEHOLDER_PATTERN = re.compile(r'__STR_(\d+)__')
+
+# Raw strings are parked behind this marker during the line pass so their blank lines and spacing survive
+RAW_STRING_MARKER_PATTERN = re.compile(r'\x00(\d+)\x00')
+
+
+class PromptCompactor:
+    """
+    Token-saving rewrite of Kotlin source for prompts. `compact` returns the compacted
+    code and the string placeholders it introduced; `restore` puts the literals back.
+    """
+
+    def __init__(self, strip_comments: bool = True, summarize_imports: bool = True,
+                 placeholder_strings: bool = False, min_placeholder_length: int = 40,
+                 model: str = "gpt-4"):
+        self.strip_comments = strip_comments
+        self.summarize_imports = summarize_imports
+        self.placeholder_strings = placeholder_strings
+        self.min_placeholder_length = min_placeholder_length
+        self.model = model
+        self.totals = {"components": 0, "original_tokens": 0, "compacted_tokens": 0}
+
+    @classmethod
+    def from_env(cls, model: str = "gpt-4") -> "PromptCompactor":
+        """Build a compactor from PROMPT_COMPACTION* environment variables."""
+        enabled = os.getenv("PROMPT_COMPACTION", "true").lower() in ("1", "true", "yes")
+        return cls(
+            strip_comments=enabled,
+            summarize_imports=enabled,
+            placeholder_strings=enabled and os.getenv("PROMPT_COMPACTION_STRINGS", "false").lower() in ("1", "true", "yes"),
+            min_placeholder_length=int(os.getenv("PROMPT_COMPACTION_MIN_STRING_LENGTH", "40")),
+            model=model,
+        )
+
+    @property
+    def signature(self) -> str:
+        """Short description of the settings, folded into translation cache keys."""
+        return (f"c{int(self.strip_comments)}i{int(self.summarize_imports)}"
+                f"s{int(self.placeholder_strings)}:{self.min_placeholder_length}")
+
+    def compact(self, kotlin_code: str) -> Tuple[str, Dict[str, str]]:
+        """Compacted source and a mapping of placeholder -> original string literal."""
+        placeholders: Dict[str, str] = {}
+        raw_strings: List[str] = []
+
+        def replace(match: re.Match) -> str:
+            kind = match.lastgroup
+            text = match.group()
+            if kind == "comment":
+                return "" if self.strip_comments else text
+            if kind == "raw_string":
+                raw_strings.append(text)
+                return f"\x00{len(raw_strings) - 1}\x00"
+            # Templates reference code and raw strings span lines, so only plain one-line literals are swapped out
+            if (self.placeholder_strings and kind == "string"
+                    and len(text) >= self.min_placeholder_length and "$" not in text):
+                placeholder = f"__STR_{len(placeholders)}__"
+                placeholders[placeholder] = text
+                return f'"{placeholder}"'
+            return text
+
+        code = COMPACT_PATTERN.sub(replace, kotlin_code)
+
+        package_lines = []
+        imports: List[Tuple[str, str]] = []
+        body_lines = []
+        for line in code.splitlines():
+            line = line.rstrip()
+            if not line.strip():
+                continue
+            match = IMPORT_LINE_PATTERN.match(line) if self.summarize_imports else None
+            if match:
+                imports.append(self._import_entry(*match.groups()))
+            elif self.summarize_imports and line.startswith("package "):
+                package_lines.append(line)
+            else:
+                body_lines.append(line)
+
+        compacted = "\n".join(package_lines + self._import_summary(imports) + body_lines)
+        if raw_strings:
+            compacted = RAW_STRING_MARKER_PATTERN.sub(lambda match: raw_strings[int(match.group(1))], compacted)
+        return compacted, placeholders
+
+    @staticmethod
+    def _import_entry(name: str, wildcard: str, alias: str) -> Tuple[str, str]:
+        """(package, imported symbol) of one import line."""
+        if wildcard:
+            return name, "*"
+        package, _, symbol = name.rpartition(".")
+        return package, f"{symbol} as {alias}" if alias else symbol
+
+    @staticmethod
+    def _import_summary(imports: List[Tuple[str, str]]) -> List[str]:
+        """One deduplicated import line per package, in first-seen order."""
+        by_package: Dict[str, List[str]] = {}
+        for package, symbol in imports:
+            symbols = by_package.setdefault(package, [])
+            if symbol not in symbols:
+                symbols.append(symbol)
+
+        lines = []
+        for package, symbols in by_package.items():
+            if len(symbols) == 1:
+                lines.append(f"import {package}.{symbols[0]}" if package else f"import {symbols[0]}")
+            else:
+                lines.append(f"import {package}.{{{', '.join(symbols)}}}")
+        return lines
+
+    def restore(self, code: str, placeholders: Dict[str, str]) -> str:
+        """Put placeholder string literals back into translated code."""
+        if not placeholders:
+            return code
+
+        def replace(match: re.Match) -> str:
+            literal = placeholders.get(match.group())
+            if literal is None:
+                return match.group()
+            # The placeholder is emitted inside quotes, so only the literal's content is needed
+            return literal[1:-1]
+
+        return PLACEHOLDER_PATTERN.sub(replace, code)
+
+    def report(self, name: str, original: str, compacted: str) -> Dict[str, int]:
+        """Log and accumulate the token saving for one component."""
+        original_tokens = count_tokens(original, self.model)
+        compacted_tokens = count_tokens(compacted, self.model)
+        saved = original_tokens - compacted_tokens
+        percent = 100 * saved / original_tokens if original_tokens else 0
+
+        self.totals["components"] += 1
+        self.totals["original_tokens"] += original_tokens
+        self.totals["compacted_tokens"] += compacted_tokens
+        logger.info(f"Compacted {name}: {original_tokens} -> {compacted_tokens} tokens (-{saved}, {percent:.0f}%)")
+        return {"original_tokens": original_tokens, "compacted_tokens": compacted_tokens, "saved_tokens": saved}
+
+    def summary(self) -> Dict[str, int]:
+        """Token totals across every component compacted so far."""
+        saved = self.totals["original_tokens"] - self.totals["compacted_tokens"]
+        return {**self.totals, "saved_tokens": saved}
@@ -1,10 +1,18 @@
+from __future__ import annotations
+
 import os
 import logging
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.schema import Document
-from android_rag_processor import AndroidProjectRAGProcessor
+
+from profiling import profiler
+from token_accounting import accountant
+from token_utils import count_tokens
+
+if TYPE_CHECKING:
+    # LangChain and the processor are imported when the interface is created
+    from langchain.schema import Document
+    from android_rag_processor import AndroidProjectRAGProcessor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,20 +23,32 @@ class AndroidProjectQueryInterface:
     Interface for querying the Android project knowledge base.
     """
     
-    def __init__(self):
+    def __init__(self, rag_processor: Optional[AndroidProjectRAGProcessor] = None, llm: Any = None):
         load_dotenv()
         
-        # Initialize the RAG processor
-        self.rag_processor = AndroidProjectRAGProcessor()
+        # Initialize the RAG processor (pass one to query another store or embedding backend)
+        if rag_processor is None:
+            from android_rag_processor import AndroidProjectRAGProcessor
+            rag_processor = AndroidProjectRAGProcessor()
+        self.rag_processor = rag_processor
         
-        # Initialize OpenAI chat model
-        self.llm = ChatOpenAI(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model="gpt-3.5-turbo",
-            temperature=0.1
-        )
+        # OpenAI chat model, created on the first LLM answer so retrieval-only use needs no API key
+        self.chat_model = "gpt-3.5-turbo"
+        self._llm = llm
+    
+    @property
+    def llm(self) -> Any:
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                model=self.chat_model,
+                temperature=0.1
+            )
+        return self._llm
     
-    def query_project(self, query: str, k: int = 5, use_llm: bool = True) -> Dict[str, Any]:
+    def query_project(self, query: str, k: int = 5, use_llm: bool = True,
+                      expand_neighbors: bool = False, max_neighbors: int = 3) -> Dict[str, Any]:
         """
         Query the Android project knowledge base.
         
@@ -36,6 +56,8 @@ class AndroidProjectQueryInterface:
             query: Natural language query about the project
             k: Number of relevant documents to retrieve
             use_llm: Whether to use LLM to generate a response
+            expand_neighbors: Whether to add 1-hop dependency graph neighbours of the hits
+            max_neighbors: Maximum number of neighbouring files to add
             
         Returns:
             Dictionary containing query results and response
@@ -51,12 +73,20 @@ class AndroidProjectQueryInterface:
                     "documents": []
                 }
             
+            # Expand hits to related files through the dependency graph (metadata lookups only)
+            related_docs = []
+            if expand_neighbors:
+                hit_files = [doc.metadata.get("file_path", "") for doc in relevant_docs]
+                related_files = self.rag_processor.get_related_files(hit_files, limit=max_neighbors)
+                related_docs = self.rag_processor.get_file_documents(related_files)
+            
             # Prepare context from relevant documents
-            context = self._prepare_context(relevant_docs)
+            context = self._prepare_context(relevant_docs + related_docs)
             
             result = {
                 "query": query,
                 "documents": relevant_docs,
+                "related_documents": related_docs,
                 "context": context,
                 "document_count": len(relevant_docs)
             }
@@ -112,7 +142,12 @@ User Question: {query}
 Please provide a comprehensive answer based on the context provided. If the context doesn't contain enough information to answer the question, please say so. Focus on providing accurate information about the Android project structure, code, and functionality.
 """
             
-            response = self.llm.invoke(prompt)
+            prompt_tokens = count_tokens(prompt, self.chat_model)
+            with accountant.metered("query", self.chat_model, prompt_tokens, self.rag_processor.max_tokens) as meter:
+                response = self.llm.invoke(prompt)
+                usage = getattr(response, "usage_metadata", None) or {}
+                meter.record(usage.get("input_tokens"),
+                             usage.get("output_tokens") or count_tokens(response.content, self.chat_model))
             return response.content
             
         except Exception as e:
@@ -222,7 +257,8 @@ def interactive_query():
             print("-" * 50)
             
             # Query the knowledge base
-            result = query_interface.query_project(query, k=5, use_llm=True)
+            with profiler.stage("query"):
+                result = query_interface.query_project(query, k=5, use_llm=True, expand_neighbors=True)
             
             if "error" in result:
                 print(f"❌ Error: {result['error']}")
@@ -240,6 +276,13 @@ def interactive_query():
                 print(f"   📝 Content preview: {doc.page_content[:100]}...")
                 print()
             
+            related_files = list(dict.fromkeys(doc.metadata.get('file_path', 'Unknown') for doc in result['related_documents']))
+            if related_files:
+                print("🕸️  Related files (dependency graph):")
+                for file_path in related_files:
+                    print(f"   - {file_path}")
+                print()
+            
             # Display LLM response
             if "llm_response" in result:
                 print("🤖 AI Response:")
@@ -266,6 +309,8 @@ def main():
         print("Please set your OpenAI API key in the .env file")
         return
     
+    profiler.start_from_argv()
+    
     # Run interactive query interface
     interactive_query()
 
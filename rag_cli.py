@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unified Command Line
+One entry point for every tool: `python -m rag_cli <command> [args...]`.
+Commands are looked up in a table of module names and only the chosen
+command's module is imported, so `--help` and typos cost no LangChain,
+Chroma or OpenAI imports.
+"""
+
+import sys
+import importlib
+from typing import Dict, List, Tuple
+
+# command -> (module, function, description); the function reads its arguments from sys.argv
+COMMANDS: Dict[str, Tuple[str, str, str]] = {
+    "process": ("android_rag_processor", "main", "Chunk and embed the Android project into the vector database"),
+    "query": ("query_interface", "main", "Ask questions about the project interactively"),
+    "extract": ("component_extractor", "main", "Extract Android components into the component database"),
+    "translate": ("kotlin_to_swift_translator", "main", "Translate the extracted components to Swift"),
+    "clean": ("clean_swift_files", "main", "Strip markdown from generated Swift files [directory]"),
+    "workflow": ("run_complete_workflow", "main", "Run the complete workflow [--stream] [--force steps]"),
+    "pipeline": ("pipeline", "main", "Run the in-process pipeline without the requirement checks"),
+    "transpile": ("kotlin_swift_transpiler", "main", "Offline rule-based translation [source] [output_dir]"),
+    "batch": ("batch_jobs", "main", "Write, run locally or ingest a batch translation job"),
+    "graph": ("kotlin_dependency_graph", "main", "Build and inspect the Kotlin dependency graph"),
+    "snapshot": ("index_snapshot", "main", "Export, import or inspect a single-file index snapshot [file]"),
+    "eval": ("retrieval_eval", "main", "Recall@k, MRR and latency on the golden queries [configs.json]"),
+    "budget": ("token_accounting", "main", "Dry-run token and cost estimate against the budgets [project_path]"),
+    "startup": ("benchmark_startup", "main", "Measure the import time of every entry point"),
+    "generate": ("synthetic_project", "main", "Generate a synthetic Android project [output_dir] [file_count]"),
+    "scaling": ("benchmark_scaling", "main", "Benchmark every stage on synthetic projects [size ...]"),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["Usage: python -m rag_cli <command> [args...]", "", "Commands:"]
+    lines.extend(f"  {name:<{width}}  {description}" for name, (_, _, description) in COMMANDS.items())
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    """Dispatch to the named command. Returns the process exit code."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"❌ Unknown command: {command}\n")
+        print(usage())
+        return 2
+
+    module_name, function_name, _ = COMMANDS[command]
+    # The command sees its own arguments as if it had been run as a script
+    sys.argv = [f"rag_cli {command}"] + argv[1:]
+    getattr(importlib.import_module(module_name), function_name)()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
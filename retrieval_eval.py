@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Retrieval Evaluation
+Runs the versioned golden query set (golden_queries.json) through
+AndroidProjectQueryInterface and reports recall@k, MRR and query latency
+percentiles for each configuration: embedding backend, chunker, chunk size
+and overlap, and retrieval mode. Configurations are compared side by side, so
+a performance change that costs relevance shows up before it ships.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmark_scaling import percentiles
+from file_utils import atomic_write_text, sha256_text
+from profiling import profiler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RECALL_CUTOFFS = [1, 3, 5, 10]
+FAKE_EMBEDDING_SIZE = 1536
+
+# Evaluated when no configuration file is given: the existing store, with and without graph expansion
+DEFAULT_CONFIGURATIONS = [
+    {"name": "vector", "backend": "openai", "vector_db_path": "./vector_db", "mode": "vector", "k": 10},
+    {"name": "graph", "backend": "openai", "vector_db_path": "./vector_db", "mode": "graph", "k": 10},
+]
+
+CONFIG_DEFAULTS = {"backend": "openai", "chunker": "recursive", "chunk_size": 1000, "chunk_overlap": 200,
+                   "mode": "vector", "k": 10, "max_neighbors": 3, "repeats": 1}
+
+
+def load_golden_set(path: str = "./golden_queries.json") -> Dict:
+    """The golden query set, with a content hash so results can tell which revision they ran against."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    golden = json.loads(text)
+    golden["sha256"] = sha256_text(text)
+    return golden
+
+
+def ranked_files(result: Dict[str, Any]) -> List[str]:
+    """Distinct file paths in rank order: vector hits first, then graph neighbours."""
+    files = []
+    for doc in result.get("documents", []) + result.get("related_documents", []):
+        file_path = doc.metadata.get("file_path", "")
+        if file_path and file_path not in files:
+            files.append(file_path)
+    return files
+
+
+def score_query(files: List[str], expected: List[str]) -> Dict[str, float]:
+    """recall@k for every cutoff and the reciprocal rank of the first relevant file."""
+    expected_set = set(expected)
+    scores = {f"recall@{k}": len(expected_set.intersection(files[:k])) / len(expected_set) for k in RECALL_CUTOFFS}
+    scores["reciprocal_rank"] = next((1 / rank for rank, file_path in enumerate(files, 1) if file_path in expected_set), 0.0)
+    return scores
+
+
+def make_embeddings(backend: str) -> Any:
+    """Embeddings for a backend name; None means the processor's default (OpenAI)."""
+    if backend == "openai":
+        return None
+    if backend == "fake":
+        # Latency only: fake vectors carry no meaning, so relevance scores are noise
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def make_splitter(chunker: str, chunk_size: int, chunk_overlap: int) -> Any:
+    """Text splitter for a chunker name."""
+    from langchain.text_splitter import Language, RecursiveCharacterTextSplitter
+
+    if chunker == "recursive":
+        # The processor's own splitter
+        return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                              length_function=len, separators=["\n\n", "\n", " ", ""])
+    if chunker == "kotlin":
+        # Splits at class, function and control-flow boundaries before falling back to lines
+        return RecursiveCharacterTextSplitter.from_language(Language.KOTLIN, chunk_size=chunk_size,
+                                                            chunk_overlap=chunk_overlap)
+    raise ValueError(f"Unknown chunker: {chunker}")
+
+
+class RetrievalEvaluator:
+    """Builds (or opens) one index per distinct index configuration and evaluates queries against it."""
+
+    def __init__(self, golden: Dict, project_path: Optional[str] = None, work_dir: Optional[str] = None):
+        self.golden = golden
+        self.project_path = project_path or golden.get("project", "ANDROID_APP")
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="retrieval_eval_")
+        self._interfaces: Dict[Tuple, Any] = {}
+
+    @staticmethod
+    def _index_key(config: Dict) -> Tuple:
+        return (config["backend"], config.get("vector_db_path"), config["chunker"],
+                config["chunk_size"], config["chunk_overlap"])
+
+    def interface_for(self, config: Dict) -> Any:
+        """Query interface over the index `config` describes, built on first use and shared between modes."""
+        from android_rag_processor import AndroidProjectRAGProcessor
+        from kotlin_dependency_graph import KotlinDependencyGraph
+        from query_interface import AndroidProjectQueryInterface
+
+        key = self._index_key(config)
+        if key in self._interfaces:
+            return self._interfaces[key]
+
+        processor = AndroidProjectRAGProcessor(self.project_path, embeddings=make_embeddings(config["backend"]))
+        if config.get("vector_db_path"):
+            # Evaluate an existing store as it is
+            processor.vector_db_path = processor.store_path = config["vector_db_path"]
+        else:
+            index_dir = os.path.join(self.work_dir, f"index_{len(self._interfaces)}")
+            processor.vector_db_path = processor.store_path = os.path.join(index_dir, "vector_db")
+            processor.chunk_size, processor.chunk_overlap = config["chunk_size"], config["chunk_overlap"]
+            processor.text_splitter = make_splitter(config["chunker"], config["chunk_size"], config["chunk_overlap"])
+            processor.dependency_graph = KotlinDependencyGraph(os.path.join(index_dir, "dependency_graph.json"))
+
+            started = time.perf_counter()
+            relevant_files = processor.get_relevant_files()
+            chunks = 0
+            for _, documents in processor.iter_project(relevant_files):
+                processor.add_documents(documents)
+                chunks += len(documents)
+            processor.dependency_graph.update_from_project(processor.project_path, relevant_files)
+            logger.info(f"Built index {key} with {chunks} chunks in {time.perf_counter() - started:.1f}s")
+
+        interface = AndroidProjectQueryInterface(rag_processor=processor)
+        self._interfaces[key] = interface
+        return interface
+
+    def evaluate(self, config: Dict) -> Dict:
+        """Run every golden query under `config`; returns aggregate metrics and per-query results."""
+        config = {**CONFIG_DEFAULTS, **config}
+        config.setdefault("name", f"{config['backend']}/{config['chunker']}-{config['chunk_size']}/"
+                                  f"{config['chunk_overlap']}/{config['mode']}")
+        interface = self.interface_for(config)
+        expand_neighbors = config["mode"] == "graph"
+
+        per_query = []
+        latencies = []
+        for item in self.golden["queries"]:
+            result = {}
+            for _ in range(config["repeats"]):
+                started = time.perf_counter()
+                result = interface.query_project(item["query"], k=config["k"], use_llm=False,
+                                                 expand_neighbors=expand_neighbors,
+                                                 max_neighbors=config["max_neighbors"])
+                latencies.append(time.perf_counter() - started)
+            files = ranked_files(result)
+            per_query.append({"id": item["id"], "retrieved_files": files[:max(RECALL_CUTOFFS)],
+                              **score_query(files, item["expected_files"])})
+
+        count = max(1, len(per_query))
+        metrics = {key: round(sum(query[key] for query in per_query) / count, 4)
+                   for key in [f"recall@{k}" for k in RECALL_CUTOFFS]}
+        metrics["mrr"] = round(sum(query["reciprocal_rank"] for query in per_query) / count, 4)
+        metrics["latency_ms"] = percentiles(latencies)
+        return {"config": config, "metrics": metrics, "queries": per_query}
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def comparison_table(results: List[Dict]) -> str:
+    """Side-by-side metrics of every configuration."""
+    columns = [f"recall@{k}" for k in RECALL_CUTOFFS] + ["mrr", "p50 ms", "p95 ms", "p99 ms"]
+    width = max([len(result["config"]["name"]) for result in results] + [13])
+    lines = [f"{'configuration':<{width}}  " + "  ".join(f"{column:>9}" for column in columns)]
+    for result in results:
+        metrics = result["metrics"]
+        latency = metrics["latency_ms"] or {}
+        values = [metrics[f"recall@{k}"] for k in RECALL_CUTOFFS] + [metrics["mrr"]]
+        values += [latency.get("p50", 0), latency.get("p95", 0), latency.get("p99", 0)]
+        lines.append(f"{result['config']['name']:<{width}}  " + "  ".join(f"{value:>9.3f}" for value in values))
+    return "\n".join(lines)
+
+
+def main():
+    """Evaluate retrieval: [configs.json] [--golden golden_queries.json] [--output results.json] [--project path]"""
+    profiler.start_from_argv()
+    args = sys.argv[1:]
+    options = {"--golden": "./golden_queries.json", "--output": "./retrieval_eval.json", "--project": None}
+    config_path = None
+    index = 0
+    while index < len(args):
+        if args[index] in options and index + 1 < len(args):
+            options[args[index]] = args[index + 1]
+            index += 2
+        else:
+            config_path = args[index]
+            index += 1
+
+    configurations = DEFAULT_CONFIGURATIONS
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            configurations = json.load(f)
+
+    golden = load_golden_set(options["--golden"])
+    print("🎯 Retrieval Evaluation")
+    print("=" * 40)
+    print(f"📋 Golden set v{golden.get('version')} with {len(golden['queries'])} queries, "
+          f"{len(configurations)} configurations")
+
+    evaluator = RetrievalEvaluator(golden, options["--project"])
+    try:
+        results = []
+        for config in configurations:
+            with profiler.stage(f"eval.{config.get('name', len(results))}"):
+                results.append(evaluator.evaluate(config))
+    finally:
+        evaluator.cleanup()
+
+    print()
+    print(comparison_table(results))
+    atomic_write_text(options["--output"], json.dumps({
+        "golden_version": golden.get("version"),
+        "golden_sha256": golden["sha256"],
+        "results": results,
+    }, indent=2))
+    print(f"\n📄 Results written to {options['--output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,19 @@
 """
 Complete Workflow Script
 Runs the entire pipeline: RAG processing -> Component extraction -> Translation -> Cleaning
+All stages run in this process (see pipeline.py) and pass their results in memory.
 """
 
 import os
 import sys
-import subprocess
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 
+from pipeline import WorkflowPipeline, parse_force_argument
+from profiling import profiler
+from token_accounting import accountant
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -18,37 +22,6 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_command(command: str, description: str) -> bool:
-    """
-    Run a command and return success status.
-    
-    Args:
-        command: The command to run
-        description: Description of what the command does
-        
-    Returns:
-        True if command succeeded, False otherwise
-    """
-    print(f"\n🔄 {description}")
-    print("=" * 50)
-    
-    try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print("✅ Success!")
-        if result.stdout:
-            print("Output:")
-            print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error: {e}")
-        if e.stdout:
-            print("Stdout:")
-            print(e.stdout)
-        if e.stderr:
-            print("Stderr:")
-            print(e.stderr)
-        return False
-
 def check_requirements():
     """Check if all required files and dependencies are available."""
     print("🔍 Checking Requirements")
@@ -94,28 +67,18 @@ def main():
         print("\n❌ Requirements not met. Please fix the issues above.")
         return
     
-    # Step 1: Run RAG processor
-    print("\n📦 Step 1: Processing Android project with RAG")
-    if not run_command("python3 android_rag_processor.py", "Running RAG processor"):
-        print("❌ RAG processing failed!")
-        return
-    
-    # Step 2: Extract components
-    print("\n🔍 Step 2: Extracting Android components")
-    if not run_command("python3 component_extractor.py", "Running component extractor"):
-        print("❌ Component extraction failed!")
-        return
-    
-    # Step 3: Translate to Swift
-    print("\n🔄 Step 3: Translating to Swift")
-    if not run_command("python3 kotlin_to_swift_translator.py", "Running Kotlin to Swift translator"):
-        print("❌ Translation failed!")
-        return
-    
-    # Step 4: Clean Swift files
-    print("\n🧹 Step 4: Cleaning Swift files")
-    if not run_command("python3 clean_swift_files.py", "Cleaning Swift files"):
-        print("❌ Swift file cleaning failed!")
+    # Unchanged steps are skipped; `--force translate,clean` or `--force all` reruns them.
+    # `--stream` overlaps ingestion, extraction and translation instead.
+    # `--profile` (or `--profile=sample`) writes a per-stage profile to ./profiles.
+    profiler.start_from_argv()
+    pipeline = WorkflowPipeline()
+    if "--stream" in sys.argv[1:]:
+        ok = pipeline.run_streaming()
+    else:
+        ok = pipeline.run(force=parse_force_argument(sys.argv[1:]))
+    if not ok:
+        print("\n⏱️  Stage timings:")
+        print(pipeline.timing_report())
         return
     
     # Final summary
@@ -135,6 +98,10 @@ def main():
     else:
         print("❌ No Swift output directory found!")
     
+    print("\n⏱️  Stage timings:")
+    print(pipeline.timing_report())
+    usage = accountant.summary()["total"]
+    print(f"💰 Token usage: {usage['tokens']} tokens in {usage['calls']} calls, ${usage['cost_usd']}")
     print("\n✅ All steps completed successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Swift Sanitizer
+Single-pass, line-by-line extraction of Swift code from LLM output: keeps the
+contents of ```swift fences (or, without any, everything that is not markdown),
+drops headers, bold-only lines and language tags, and collapses blank-line runs.
+Swift compiler directives such as `#if` and `#Preview` are kept.
+"""
+
+from typing import Iterable, List, Optional
+
+# Bare language tags some models put on their own line
+LANGUAGE_TAGS = {"swift", "kotlin"}
+
+
+def is_markdown_header(stripped: str) -> bool:
+    """`# Title` style headers; `#if`, `#Preview` and other Swift directives are not headers."""
+    if not stripped.startswith("#"):
+        return False
+    rest = stripped.lstrip("#")
+    return not rest or rest[0].isspace()
+
+
+def is_bold_line(stripped: str) -> bool:
+    """A line that is only **bold** markdown text."""
+    return len(stripped) >= 4 and stripped.startswith("**") and stripped.endswith("**")
+
+
+class _LineEmitter:
+    """Collects lines, dropping leading and trailing blanks and collapsing blank runs into one."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        # None while no blank line may be emitted (at the start of the output or of a block)
+        self.pending_blank: Optional[bool] = None
+
+    def add(self, line: str):
+        if not line.strip():
+            if self.pending_blank is not None:
+                self.pending_blank = True
+            return
+        if self.pending_blank:
+            self.lines.append("")
+        self.lines.append(line.rstrip())
+        self.pending_blank = False
+
+    def cut(self):
+        """Start a new block: blank lines are not carried over it."""
+        self.pending_blank = None
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+class SwiftSanitizer:
+    """
+    Streaming sanitizer: `feed` lines one at a time, then call `result`.
+    Both the fenced and the unfenced interpretation are built in the same pass, and
+    the fenced one wins as soon as the output contained a ```swift block.
+    """
+
+    def __init__(self):
+        self._fenced = _LineEmitter()
+        self._plain = _LineEmitter()
+        self._in_swift_block = False
+        self._saw_swift_block = False
+
+    def feed(self, line: str):
+        stripped = line.strip()
+
+        if stripped.startswith("```"):
+            if self._in_swift_block:
+                self._in_swift_block = False
+            elif stripped[3:].strip().lower().startswith("swift"):
+                self._in_swift_block = True
+                self._saw_swift_block = True
+                self._fenced.cut()
+            return
+
+        if is_markdown_header(stripped) or is_bold_line(stripped):
+            line = stripped = ""
+
+        if self._in_swift_block:
+            self._fenced.add(line)
+        if stripped.lower() not in LANGUAGE_TAGS:
+            self._plain.add(line)
+
+    def feed_lines(self, lines: Iterable[str]) -> "SwiftSanitizer":
+        for line in lines:
+            self.feed(line.rstrip("\r\n"))
+        return self
+
+    def result(self) -> str:
+        """The sanitized Swift code."""
+        return (self._fenced if self._saw_swift_block else self._plain).text()
+
+
+def sanitize_swift(text: str) -> str:
+    """Extract only Swift code from LLM output, removing all markdown formatting."""
+    return SwiftSanitizer().feed_lines(text.splitlines()).result()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Synthetic Android Project Generator
+Writes a deterministic Android source tree of a given size for benchmarks:
+Kotlin activities, view models, models and composables, XML layouts and
+resources, and large quiz JSON assets in the same shape as the real app's.
+"""
+
+import os
+import sys
+import json
+import random
+import logging
+from pathlib import Path
+from typing import Dict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PACKAGE = "com.example.synthetic"
+
+# Share of the generated files per kind; the rest are XML resources
+KIND_WEIGHTS = [
+    ("activity", 0.12),
+    ("viewmodel", 0.12),
+    ("model", 0.16),
+    ("composable", 0.15),
+    ("layout", 0.20),
+    ("values", 0.20),
+    ("asset", 0.05),
+]
+
+SPORTS = ["football", "basketball", "tennis", "golf", "hockey", "cricket", "rugby", "baseball"]
+WORDS = ["score", "level", "player", "team", "match", "season", "league", "round", "answer", "question",
+         "result", "progress", "streak", "bonus", "timer", "record"]
+
+ACTIVITY_TEMPLATE = """package {package}.ui.{group}
+
+import android.os.Bundle
+import androidx.activity.ComponentActivity
+import androidx.activity.compose.setContent
+import androidx.compose.material3.MaterialTheme
+import {package}.viewmodel.{name}ViewModel
+
+class {name}Activity : ComponentActivity() {{
+
+    private lateinit var viewModel: {name}ViewModel
+
+    override fun onCreate(savedInstanceState: Bundle?) {{
+        super.onCreate(savedInstanceState)
+        viewModel = {name}ViewModel()
+        setContent {{
+            MaterialTheme {{
+                {name}Screen(viewModel = viewModel, onBack = {{ finish() }})
+            }}
+        }}
+    }}
+{methods}
+}}
+"""
+
+ACTIVITY_METHOD = """
+    private fun handle{word}(value: Int) {{
+        if (value > {limit}) {{
+            viewModel.update{word}(value - {limit})
+        }} else {{
+            viewModel.reset{word}()
+        }}
+    }}
+"""
+
+VIEWMODEL_TEMPLATE = """package {package}.viewmodel
+
+import androidx.lifecycle.ViewModel
+import androidx.lifecycle.viewModelScope
+import kotlinx.coroutines.flow.MutableStateFlow
+import kotlinx.coroutines.flow.StateFlow
+import kotlinx.coroutines.launch
+
+class {name}ViewModel : ViewModel() {{
+{fields}
+{methods}
+}}
+"""
+
+VIEWMODEL_FIELD = """
+    private val _{field} = MutableStateFlow(0)
+    val {field}: StateFlow<Int> = _{field}
+"""
+
+VIEWMODEL_METHOD = """
+    fun update{word}(delta: Int) {{
+        viewModelScope.launch {{
+            _{field}.value = _{field}.value + delta
+        }}
+    }}
+
+    fun reset{word}() {{
+        _{field}.value = 0
+    }}
+"""
+
+MODEL_TEMPLATE = """package {package}.model
+
+import kotlinx.serialization.Serializable
+
+@Serializable
+data class {name}(
+{properties}
+) {{
+    fun isValid(): Boolean = id > 0 && title.isNotBlank()
+}}
+"""
+
+COMPOSABLE_TEMPLATE = """package {package}.ui.components
+
+import androidx.compose.foundation.layout.Column
+import androidx.compose.foundation.layout.padding
+import androidx.compose.material3.Button
+import androidx.compose.material3.Text
+import androidx.compose.runtime.Composable
+import androidx.compose.ui.Modifier
+import androidx.compose.ui.unit.dp
+
+@Composable
+fun {name}Card(title: String, {word}: Int, onClick: () -> Unit) {{
+    Column(modifier = Modifier.padding({padding}.dp)) {{
+        Text(text = title)
+        Text(text = "{word}: ${word}")
+        Button(onClick = onClick) {{
+            Text(text = "{label}")
+        }}
+    }}
+}}
+"""
+
+LAYOUT_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"
+    android:layout_width="match_parent"
+    android:layout_height="match_parent"
+    android:orientation="vertical">
+{views}
+</LinearLayout>
+"""
+
+LAYOUT_VIEW = """    <TextView
+        android:id="@+id/{word}_{index}"
+        android:layout_width="wrap_content"
+        android:layout_height="wrap_content"
+        android:text="@string/{word}" />
+"""
+
+# Identical across the generated tree, as resource boilerplate tends to be
+VALUES_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<resources>
+    <color name="purple_200">#FFBB86FC</color>
+    <color name="purple_500">#FF6200EE</color>
+    <color name="teal_200">#FF03DAC5</color>
+    <color name="black">#FF000000</color>
+    <color name="white">#FFFFFFFF</color>
+</resources>
+"""
+
+
+def _class_name(rng: random.Random, index: int) -> str:
+    return f"{rng.choice(WORDS).capitalize()}{rng.choice(SPORTS).capitalize()}{index}"
+
+
+def _quiz_asset(rng: random.Random, levels: int, questions_per_level: int) -> list:
+    """Quiz levels in the format of the app's assets/*.json files."""
+    question_id = 1
+    data = []
+    for level in range(levels):
+        questions = []
+        for _ in range(questions_per_level):
+            year = rng.randint(1950, 2024)
+            questions.append({
+                "id": question_id,
+                "text": f"Which {rng.choice(WORDS)} won the {rng.choice(SPORTS)} {rng.choice(WORDS)} in {year}?",
+                "correctAnswer": f"{rng.choice(WORDS).capitalize()} {rng.choice(SPORTS).capitalize()}",
+                "wrongAnswers": [f"{rng.choice(WORDS).capitalize()} {rng.choice(SPORTS).capitalize()}" for _ in range(3)],
+                "year": year,
+            })
+            question_id += 1
+        data.append({"id": level + 1, "title": f"{rng.choice(SPORTS).capitalize()} level {level + 1}",
+                     "difficulty": rng.choice(["amateur", "pro", "legend"]), "questions": questions})
+    return data
+
+
+def _render(kind: str, rng: random.Random, index: int, asset_questions: int) -> str:
+    name = _class_name(rng, index)
+    if kind == "activity":
+        methods = "".join(ACTIVITY_METHOD.format(word=rng.choice(WORDS).capitalize(), limit=rng.randint(1, 99))
+                          for _ in range(rng.randint(1, 6)))
+        return ACTIVITY_TEMPLATE.format(package=PACKAGE, group=rng.choice(SPORTS), name=name, methods=methods)
+    if kind == "viewmodel":
+        fields = sorted({rng.choice(WORDS) for _ in range(rng.randint(1, 6))})
+        return VIEWMODEL_TEMPLATE.format(
+            package=PACKAGE, name=name,
+            fields="".join(VIEWMODEL_FIELD.format(field=field) for field in fields),
+            methods="".join(VIEWMODEL_METHOD.format(word=field.capitalize(), field=field) for field in fields),
+        )
+    if kind == "model":
+        properties = ["    val id: Int", "    val title: String"]
+        properties += [f"    val {rng.choice(WORDS)}{i}: {rng.choice(['Int', 'String', 'Boolean', 'List<String>'])}"
+                       for i in range(rng.randint(1, 10))]
+        return MODEL_TEMPLATE.format(package=PACKAGE, name=name, properties=",\n".join(properties))
+    if kind == "composable":
+        return COMPOSABLE_TEMPLATE.format(package=PACKAGE, name=name, word=rng.choice(WORDS),
+                                          padding=rng.choice([4, 8, 16]), label=rng.choice(WORDS).capitalize())
+    if kind == "layout":
+        views = "".join(LAYOUT_VIEW.format(word=rng.choice(WORDS), index=i) for i in range(rng.randint(1, 12)))
+        return LAYOUT_TEMPLATE.format(views=views)
+    if kind == "values":
+        return VALUES_TEMPLATE
+    levels = max(1, asset_questions // 20)
+    return json.dumps(_quiz_asset(rng, levels, max(1, asset_questions // levels)), indent=4)
+
+
+def _file_path(root: Path, kind: str, index: int) -> Path:
+    # Spread files over subdirectories so no directory gets too large
+    bucket = f"g{index // 500}"
+    if kind == "activity":
+        return root / "java" / "com" / "example" / "synthetic" / "ui" / bucket / f"Screen{index}Activity.kt"
+    if kind == "viewmodel":
+        return root / "java" / "com" / "example" / "synthetic" / "viewmodel" / bucket / f"Screen{index}ViewModel.kt"
+    if kind == "model":
+        return root / "java" / "com" / "example" / "synthetic" / "model" / bucket / f"Model{index}.kt"
+    if kind == "composable":
+        return root / "java" / "com" / "example" / "synthetic" / "ui" / "components" / bucket / f"Card{index}.kt"
+    if kind == "layout":
+        return root / "res" / f"layout-{bucket}" / f"screen_{index}.xml"
+    if kind == "values":
+        return root / "res" / f"values-{bucket}" / f"colors_{index}.xml"
+    return root / "assets" / bucket / f"quiz_{index}.json"
+
+
+def generate_project(root: str, file_count: int, seed: int = 0, asset_questions: int = 400) -> Dict[str, int]:
+    """
+    Write `file_count` files under `root`. The same arguments always produce the same tree.
+    `asset_questions` sets the size of each quiz asset (about 250 bytes per question).
+    Returns the number of files and bytes written per kind.
+    """
+    rng = random.Random(seed)
+    root_path = Path(root)
+    kinds = [kind for kind, _ in KIND_WEIGHTS]
+    weights = [weight for _, weight in KIND_WEIGHTS]
+    stats: Dict[str, int] = {"files": 0, "bytes": 0}
+
+    manifest = root_path / "AndroidManifest.xml"
+    manifest.parent.mkdir(parents=True, exist_ok=True)
+    manifest.write_text(f'<manifest package="{PACKAGE}">\n    <application android:label="Synthetic" />\n</manifest>\n',
+                        encoding='utf-8')
+
+    for index in range(1, file_count):
+        kind = rng.choices(kinds, weights)[0]
+        path = _file_path(root_path, kind, index)
+        content = _render(kind, rng, index, asset_questions)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+        stats[kind] = stats.get(kind, 0) + 1
+        stats["bytes"] += len(content)
+
+    stats["files"] = file_count
+    logger.info(f"Generated {file_count} files ({stats['bytes'] / 1e6:.1f} MB) in {root}")
+    return stats
+
+
+def main():
+    """Generate a synthetic project: [output_dir] [file_count] [seed]"""
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else "./synthetic_android_app"
+    file_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    if os.path.exists(output_dir) and os.listdir(output_dir):
+        print(f"❌ {output_dir} already exists and is not empty")
+        return
+
+    print("🏗️  Synthetic Android Project Generator")
+    print("=" * 40)
+    stats = generate_project(output_dir, file_count, seed)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
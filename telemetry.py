@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Telemetry
+Spans, counters, gauges and latency observations for every pipeline stage,
+exported as a JSON run report and a Prometheus textfile. An OpenTelemetry
+hook mirrors everything to an OpenTelemetry SDK when one is installed.
+"""
+
+import os
+import re
+import time
+import json
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "android_rag_"
+# Finished spans and latency samples kept for the report; aggregates keep counting past these
+MAX_SPANS = 10000
+MAX_SAMPLES = 10000
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _metric_name(name: str) -> str:
+    return METRIC_PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _prometheus_labels(labels: Labels, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+
+class Span:
+    """One timed operation. Attributes can be set or accumulated while it is open."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_seconds": round(self.duration or 0.0, 6),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _Observations:
+    """Count, sum and max of a latency (or size) series, with a bounded sample for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "sum": round(self.total, 6), "max": round(self.max, 6),
+                "p50": round(self.quantile(0.5), 6), "p95": round(self.quantile(0.95), 6),
+                "p99": round(self.quantile(0.99), 6)}
+
+
+class Telemetry:
+    """
+    Process-wide metrics registry. Safe to use from threads and asyncio tasks; the current
+    span follows the context, so spans opened inside a task nest under the span that created it.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.observations: Dict[Tuple[str, Labels], _Observations] = {}
+        self.span_durations: Dict[str, _Observations] = {}
+        self.spans: List[Span] = []
+        self.hooks: List[Any] = []
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar = contextvars.ContextVar("telemetry_span", default=None)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a span named `name`."""
+        span = Span(name, self._current.get(), attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            self._current.reset(token)
+            with self._lock:
+                self.span_durations.setdefault(name, _Observations()).add(span.duration)
+                if len(self.spans) < MAX_SPANS:
+                    self.spans.append(span)
+            for hook in self.hooks:
+                hook.on_span(span)
+
+    def current_span(self) -> Optional[Span]:
+        """The innermost open span of the calling context, if any."""
+        return self._current.get()
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Add `value` to a counter."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        for hook in self.hooks:
+            hook.on_counter(name, value, labels)
+
+    def gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its latest value."""
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (a latency in seconds, a size) of a series."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self.observations.setdefault(key, _Observations()).add(value)
+        for hook in self.hooks:
+            hook.on_observation(name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the wall time of the enclosed block under `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_hook(self, hook: Any):
+        """Register an exporter with on_span, on_counter and on_observation methods."""
+        self.hooks.append(hook)
+
+    def enable_opentelemetry(self) -> bool:
+        """Mirror spans and metrics to OpenTelemetry. Returns False when it is not installed."""
+        try:
+            hook = OpenTelemetryHook()
+        except ImportError:
+            logger.warning("opentelemetry is not installed, OpenTelemetry export disabled")
+            return False
+        self.add_hook(hook)
+        return True
+
+    def reset(self):
+        """Start a new run with empty metrics (hooks are kept)."""
+        with self._lock:
+            self.run_id = uuid.uuid4().hex[:12]
+            self.started_at = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.observations.clear()
+            self.span_durations.clear()
+            self.spans.clear()
+
+    @staticmethod
+    def _series(items: Dict[Tuple[str, Labels], Any], convert=lambda value: value) -> List[Dict]:
+        return [{"name": name, "labels": dict(labels), "value": convert(value)}
+                for (name, labels), value in sorted(items.items())]
+
+    def report(self) -> Dict:
+        """Everything recorded in this run as one JSON-serializable dict."""
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "counters": self._series(self.counters),
+                "gauges": self._series(self.gauges),
+                "observations": self._series(self.observations, lambda value: value.to_dict()),
+                "span_durations": {name: value.to_dict() for name, value in sorted(self.span_durations.items())},
+                "spans": [span.to_dict() for span in self.spans],
+            }
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format (for the node_exporter textfile collector)."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = _metric_name(name) + "_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                metric = _metric_name(name)
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+            series = list(sorted(self.observations.items()))
+            series += [(("span_duration_seconds", (("span", name),)), value)
+                       for name, value in sorted(self.span_durations.items())]
+            for (name, labels), value in series:
+                metric = _metric_name(name)
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} summary")
+                for quantile in ("0.5", "0.95", "0.99"):
+                    lines.append(f"{metric}{_prometheus_labels(labels, {'quantile': quantile})} "
+                                 f"{value.quantile(float(quantile))}")
+                lines.append(f"{metric}_sum{_prometheus_labels(labels)} {value.total}")
+                lines.append(f"{metric}_count{_prometheus_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, report_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> Dict[str, str]:
+        """
+        Write the JSON run report and the Prometheus textfile (TELEMETRY_REPORT_PATH and
+        TELEMETRY_PROMETHEUS_PATH by default). Nothing is written with TELEMETRY=false.
+        """
+        if os.getenv("TELEMETRY", "true").lower() == "false":
+            return {}
+        report_path = report_path or os.getenv("TELEMETRY_REPORT_PATH", "./telemetry/run_report.json")
+        prometheus_path = prometheus_path or os.getenv("TELEMETRY_PROMETHEUS_PATH", "./telemetry/android_rag.prom")
+        try:
+            for path in (report_path, prometheus_path):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            atomic_write_text(report_path, json.dumps(self.report(), indent=2, default=str))
+            atomic_write_text(prometheus_path, self.prometheus_text())
+        except OSError as e:
+            logger.warning(f"Could not export telemetry: {e}")
+            return {}
+        logger.info(f"Telemetry written to {report_path} and {prometheus_path}")
+        return {"report": report_path, "prometheus": prometheus_path}
+
+
+class OpenTelemetryHook:
+    """Forwards spans, counters and observations to the globally configured OpenTelemetry providers."""
+
+    def __init__(self, instrumentation_name: str = "android_rag"):
+        from opentelemetry import metrics, trace
+
+        self.tracer = trace.get_tracer(instrumentation_name)
+        self.meter = metrics.get_meter(instrumentation_name)
+        self._instruments: Dict[str, Any] = {}
+
+    def _instrument(self, name: str, factory: str) -> Any:
+        if name not in self._instruments:
+            self._instruments[name] = getattr(self.meter, factory)(_metric_name(name))
+        return self._instruments[name]
+
+    def on_span(self, span: Span):
+        start_ns = int(span.start_time * 1e9)
+        otel_span = self.tracer.start_span(span.name, start_time=start_ns, attributes={
+            key: value for key, value in span.attributes.items() if isinstance(value, (str, bool, int, float))
+        })
+        otel_span.end(end_time=start_ns + int((span.duration or 0.0) * 1e9))
+
+    def on_counter(self, name: str, value: float, labels: Dict[str, Any]):
+        self._instrument(name, "create_counter").add(value, {key: str(val) for key, val in labels.items()})
+
+    def on_observation(self, name: str, value: float, labels: Dict[str, Any]):
+        self._instrument(name, "create_histogram").record(value, {key: str(val) for key, val in labels.items()})
+
+
+# The process-wide registry every module records into
+telemetry = Telemetry()
+if os.getenv("TELEMETRY_OTEL", "false").lower() == "true":
+    telemetry.enable_opentelemetry()
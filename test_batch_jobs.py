@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Offline round trip of the batch translation path: a JSONL job file is written
+from in-memory components, answered with a canned results file and ingested
+back into Swift files. No API key or network access is needed.
+Run with pytest or as a script.
+"""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from langchain_core.documents import Document
+
+from batch_jobs import (LocalBatchExecutor, batch_request, batch_result, read_batch_requests,
+                        read_batch_results, write_batch_file)
+
+KOTLIN_SOURCE = """package com.example.quiz
+
+data class Question(val id: Int, val text: String)
+"""
+
+SWIFT_RESPONSE = """Here is the translation:
+
+```swift
+import Foundation
+
+struct Question {
+    let id: Int
+    let text: String
+}
+```"""
+
+
+@contextmanager
+def translator_env(work_dir: str):
+    """Point the translation cache into `work_dir` and the journal into the output dir; restored on exit."""
+    with mock.patch.dict(os.environ, {"TRANSLATION_CACHE_DIR": os.path.join(work_dir, "cache")}):
+        os.environ.pop("TRANSLATION_JOURNAL_PATH", None)
+        yield
+
+
+def make_translator(work_dir: str):
+    """A translator over in-memory components whose store lives in `work_dir` (use inside translator_env)."""
+    from kotlin_to_swift_translator import KotlinToSwiftTranslator
+
+    translator = KotlinToSwiftTranslator(component_db_path=os.path.join(work_dir, "components"),
+                                         project_path=os.path.join(work_dir, "missing_project"))
+    components = [Document(page_content=KOTLIN_SOURCE, metadata={
+        "file_path": "app/Question.kt", "file_name": "Question.kt", "component_type": "Model",
+        "name": "Question", "chunk_index": 0,
+    })]
+    translator.get_components_by_type = lambda component_type=None, reload=False: components
+    return translator
+
+
+def test_batch_files_round_trip():
+    """Requests survive the JSONL round trip; results of every kind are parsed."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        jobs_path = os.path.join(work_dir, "jobs.jsonl")
+        requests = [batch_request("a#0", "Translate A", "gpt-4", 0.1), batch_request("b#0", "Translate B", "gpt-4", 0.1)]
+        assert write_batch_file(jobs_path, requests) == 2
+        assert read_batch_requests(jobs_path) == requests
+
+        results_path = os.path.join(work_dir, "results.jsonl")
+        stats = LocalBatchExecutor(responses=[SWIFT_RESPONSE]).run(jobs_path, results_path)
+        assert stats == {"requests": 2, "succeeded": 2, "failed": 0}
+        assert read_batch_results(results_path)["b#0"]["content"] == SWIFT_RESPONSE
+
+        canned_path = os.path.join(work_dir, "canned.jsonl")
+        with open(canned_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(batch_result("ok#0", "struct A {}", "gpt-4", {"prompt_tokens": 3})) + "\n")
+            f.write(json.dumps(batch_result("bad#0", error="rate limited")) + "\n")
+            f.write("not json\n")
+        results = read_batch_results(canned_path)
+        assert set(results) == {"ok#0", "bad#0"}
+        assert results["ok#0"]["content"] == "struct A {}" and results["ok#0"]["usage"] == {"prompt_tokens": 3}
+        assert results["bad#0"]["content"] is None and results["bad#0"]["error"]["message"] == "rate limited"
+
+
+def test_translator_batch_round_trip():
+    """write_batch_jobs -> canned results -> ingest_batch_results writes clean Swift and caches it."""
+    with tempfile.TemporaryDirectory() as work_dir, translator_env(work_dir):
+        translator = make_translator(work_dir)
+        jobs_path = os.path.join(work_dir, "translation_batch.jsonl")
+        manifest_path = os.path.join(work_dir, "translation_batch.manifest.json")
+        output_dir = os.path.join(work_dir, "swift_output")
+
+        manifest = translator.write_batch_jobs(jobs_path, manifest_path)
+        requests = read_batch_requests(jobs_path)
+        assert manifest["request_count"] == len(requests) == 1
+        assert "data class Question" in requests[0]["body"]["messages"][0]["content"]
+
+        results_path = os.path.join(work_dir, "results.jsonl")
+        write_batch_file(results_path, [batch_result(request["custom_id"], SWIFT_RESPONSE, request["body"]["model"])
+                                        for request in requests])
+        translations = translator.ingest_batch_results(results_path, manifest_path, output_dir)
+        swift_code = translations["Question"]
+        assert "struct Question" in swift_code and "```" not in swift_code and "Here is" not in swift_code
+        with open(os.path.join(output_dir, "Question.swift"), 'r', encoding='utf-8') as f:
+            assert f.read() == swift_code
+
+        # The ingested translation is cached, so a new job has nothing left to request
+        assert translator.write_batch_jobs(jobs_path, manifest_path)["request_count"] == 0
+
+
+def test_failed_batch_results_fall_back_offline():
+    """A failed request gets the offline translation, which is neither cached nor checkpointed."""
+    with tempfile.TemporaryDirectory() as work_dir, translator_env(work_dir):
+        translator = make_translator(work_dir)
+        jobs_path = os.path.join(work_dir, "translation_batch.jsonl")
+        manifest_path = os.path.join(work_dir, "translation_batch.manifest.json")
+        output_dir = os.path.join(work_dir, "swift_output")
+
+        translator.write_batch_jobs(jobs_path, manifest_path)
+        results_path = os.path.join(work_dir, "results.jsonl")
+        write_batch_file(results_path, [batch_result(request["custom_id"], error="server error")
+                                        for request in read_batch_requests(jobs_path)])
+        translations = translator.ingest_batch_results(results_path, manifest_path, output_dir)
+        assert "struct Question" in translations["Question"]
+        assert translator.write_batch_jobs(jobs_path, manifest_path)["request_count"] == 1
+
+
+def main():
+    for test in (test_batch_files_round_trip, test_translator_batch_round_trip, test_failed_batch_results_fall_back_offline):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Token Accounting
+Meters the tokens and cost of every embedding and chat call and enforces
+per-run and per-stage budgets. Calls are checked before they are sent, and
+stages can check a dry-run estimate of their whole workload before the first
+call so a misconfigured run fails fast instead of spending.
+"""
+
+import os
+import sys
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from model_router import DEFAULT_MODEL_PRICES, call_cost, model_prices
+from telemetry import telemetry
+from token_utils import count_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised before a call (or a stage) that would take the run over a token or cost budget."""
+
+
+def parse_budgets(spec: str) -> Dict[str, float]:
+    """Parse "stage=limit,..." budget settings."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            stage, limit = item.split("=", 1)
+            budgets[stage.strip()] = float(limit)
+        except ValueError:
+            logger.warning(f"Ignoring malformed budget '{item}'")
+    return budgets
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+class _Usage:
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int, cost: float):
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += cost
+
+    def to_dict(self) -> Dict:
+        return {"calls": self.calls, "input_tokens": self.input_tokens, "output_tokens": self.output_tokens,
+                "tokens": self.tokens, "cost_usd": round(self.cost_usd, 5)}
+
+
+class _Meter:
+    """Handle for one reserved call; `record` books what the provider actually reported."""
+
+    def __init__(self, accountant: "TokenAccountant", stage: str, model: str, input_tokens: int, output_tokens: int):
+        self.accountant = accountant
+        self.stage = stage
+        self.model = model
+        self.estimate = (input_tokens, output_tokens)
+
+    def record(self, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None):
+        """Book the call, falling back to the estimate for counts the provider did not report."""
+        self.accountant.record(self.stage, self.model,
+                               input_tokens if input_tokens else self.estimate[0],
+                               output_tokens if output_tokens else self.estimate[1])
+
+
+class TokenAccountant:
+    """
+    Process-wide ledger of tokens and cost per stage and model. Budgets left at None are not enforced.
+    In-flight calls hold a reservation of their estimated usage, so concurrent calls cannot
+    all pass the check together and overshoot the budget.
+    """
+
+    def __init__(self, token_budget: Optional[float] = None, cost_budget: Optional[float] = None,
+                 stage_token_budgets: Optional[Dict[str, float]] = None,
+                 stage_cost_budgets: Optional[Dict[str, float]] = None,
+                 prices: Optional[Dict[str, tuple]] = None):
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.stage_token_budgets = stage_token_budgets or {}
+        self.stage_cost_budgets = stage_cost_budgets or {}
+        self.prices = prices if prices is not None else dict(DEFAULT_MODEL_PRICES)
+        self.stages: Dict[str, _Usage] = {}
+        self.models: Dict[str, _Usage] = {}
+        self.total = _Usage()
+        self._reserved: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TokenAccountant":
+        """Budgets from TOKEN_BUDGET, COST_BUDGET_USD, STAGE_TOKEN_BUDGETS and STAGE_COST_BUDGETS."""
+        return cls(
+            token_budget=_optional_float(os.getenv("TOKEN_BUDGET")),
+            cost_budget=_optional_float(os.getenv("COST_BUDGET_USD")),
+            stage_token_budgets=parse_budgets(os.getenv("STAGE_TOKEN_BUDGETS", "")),
+            stage_cost_budgets=parse_budgets(os.getenv("STAGE_COST_BUDGETS", "")),
+            prices=model_prices(),
+        )
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int = 0) -> float:
+        """Estimated USD cost of `input_tokens` in and `output_tokens` out of `model`."""
+        return call_cost(self.prices, model, input_tokens, output_tokens)
+
+    def _violations(self, stage: str, tokens: float, cost: float) -> List[str]:
+        """Budgets that `tokens` and `cost` more (on top of used and reserved) would exceed."""
+        reserved_tokens = sum(reservation[0] for reservation in self._reserved.values())
+        reserved_cost = sum(reservation[1] for reservation in self._reserved.values())
+        stage_usage = self.stages.get(stage) or _Usage()
+        stage_reserved = self._reserved.get(stage, (0, 0.0))
+        checks = [
+            ("run token", self.token_budget, self.total.tokens + reserved_tokens + tokens),
+            ("run cost", self.cost_budget, self.total.cost_usd + reserved_cost + cost),
+            (f"{stage} token", self.stage_token_budgets.get(stage), stage_usage.tokens + stage_reserved[0] + tokens),
+            (f"{stage} cost", self.stage_cost_budgets.get(stage), stage_usage.cost_usd + stage_reserved[1] + cost),
+        ]
+        return [f"{name} budget {limit:g} (would reach {value:.6g})"
+                for name, limit, value in checks if limit is not None and value > limit]
+
+    @contextmanager
+    def metered(self, stage: str, model: str, input_tokens: int, output_tokens: int = 0) -> Iterator[_Meter]:
+        """
+        Reserve the estimated usage of one call for its duration, raising BudgetExceededError
+        when it does not fit. Call `record` on the yielded meter with the actual usage.
+        """
+        tokens = input_tokens + output_tokens
+        cost = self.cost(model, input_tokens, output_tokens)
+        with self._lock:
+            violations = self._violations(stage, tokens, cost)
+            if violations:
+                raise BudgetExceededError(f"{stage} call to {model} refused: {'; '.join(violations)}")
+            reserved = self._reserved.get(stage, (0, 0.0))
+            self._reserved[stage] = (reserved[0] + tokens, reserved[1] + cost)
+
+        meter = _Meter(self, stage, model, input_tokens, output_tokens)
+        try:
+            yield meter
+        finally:
+            with self._lock:
+                reserved = self._reserved[stage]
+                self._reserved[stage] = (reserved[0] - tokens, reserved[1] - cost)
+
+    def record(self, stage: str, model: str, input_tokens: int, output_tokens: int = 0):
+        """Book one completed call."""
+        cost = self.cost(model, input_tokens, output_tokens)
+        with self._lock:
+            for usage in (self.total, self.stages.setdefault(stage, _Usage()), self.models.setdefault(model, _Usage())):
+                usage.add(input_tokens, output_tokens, cost)
+        telemetry.incr("metered_tokens", input_tokens, stage=stage, model=model, direction="in")
+        if output_tokens:
+            telemetry.incr("metered_tokens", output_tokens, stage=stage, model=model, direction="out")
+        telemetry.incr("metered_cost_usd", cost, stage=stage, model=model)
+
+    def preflight(self, stage: str, usage: Dict[str, Tuple[int, int]]) -> Dict:
+        """
+        Check a dry-run estimate of a stage's whole workload ({model: (input_tokens, output_tokens)})
+        against the budgets before its first call. Raises BudgetExceededError when it does not fit.
+        """
+        tokens = sum(input_tokens + output_tokens for input_tokens, output_tokens in usage.values())
+        cost = sum(self.cost(model, *counts) for model, counts in usage.items())
+        estimate = {"stage": stage, "tokens": tokens, "cost_usd": round(cost, 5),
+                    "models": {model: {"input_tokens": counts[0], "output_tokens": counts[1]}
+                               for model, counts in usage.items()}}
+        with self._lock:
+            violations = self._violations(stage, tokens, cost)
+        logger.info(f"Estimated {stage} usage: {tokens} tokens, ${estimate['cost_usd']}")
+        if violations:
+            raise BudgetExceededError(f"Estimated {stage} usage exceeds the {'; '.join(violations)}")
+        return estimate
+
+    def meter_embeddings(self, embeddings: Any, stage: str, model: str, query_stage: str = "query") -> "MeteredEmbeddings":
+        """Wrap a LangChain embeddings object so every call through it is budgeted and metered."""
+        if isinstance(embeddings, MeteredEmbeddings):
+            return embeddings
+        return MeteredEmbeddings(embeddings, self, stage, model, query_stage)
+
+    def budgets(self) -> Dict:
+        return {"tokens": self.token_budget, "cost_usd": self.cost_budget,
+                "stage_tokens": self.stage_token_budgets, "stage_cost_usd": self.stage_cost_budgets}
+
+    def summary(self) -> Dict:
+        """Totals for the run, per stage and per model, with the configured budgets."""
+        with self._lock:
+            return {
+                "total": self.total.to_dict(),
+                "stages": {stage: usage.to_dict() for stage, usage in sorted(self.stages.items())},
+                "models": {model: usage.to_dict() for model, usage in sorted(self.models.items())},
+                "budgets": self.budgets(),
+            }
+
+    def log_summary(self):
+        """Log the run totals with the tokens used per stage."""
+        summary = self.summary()
+        per_stage = ", ".join(f"{stage}: {usage['tokens']}" for stage, usage in summary["stages"].items())
+        logger.info(f"Token usage: {summary['total']['tokens']} tokens, ${summary['total']['cost_usd']} "
+                    f"({per_stage or 'no calls'})")
+
+
+class MeteredEmbeddings:
+    """
+    Embeddings wrapper that checks every batch against the budgets and meters its tokens.
+    Embedding APIs report no usage through LangChain, so tokens are counted with tiktoken.
+    Everything else is delegated to the wrapped object.
+    """
+
+    def __init__(self, embeddings: Any, accountant: TokenAccountant, stage: str, model: str, query_stage: str = "query"):
+        self.embeddings = embeddings
+        self.accountant = accountant
+        self.stage = stage
+        self.model = model
+        self.query_stage = query_stage
+
+    def _tokens(self, texts: List[str]) -> int:
+        return sum(count_tokens(text, self.model) for text in texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = self._tokens(texts)
+        with self.accountant.metered(self.stage, self.model, tokens) as meter:
+            vectors = self.embeddings.embed_documents(texts)
+            meter.record()
+        telemetry.incr("tokens_embedded", tokens, model=self.model)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.accountant.metered(self.query_stage, self.model, self._tokens([text])) as meter:
+            vector = self.embeddings.embed_query(text)
+            meter.record()
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = self._tokens(texts)
+        with self.accountant.metered(self.stage, self.model, tokens) as meter:
+            vectors = await self.embeddings.aembed_documents(texts)
+            meter.record()
+        telemetry.incr("tokens_embedded", tokens, model=self.model)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with self.accountant.metered(self.query_stage, self.model, self._tokens([text])) as meter:
+            vector = await self.embeddings.aembed_query(text)
+            meter.record()
+        return vector
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.embeddings, name)
+
+
+# The process-wide ledger every embedding and chat call is booked in
+accountant = TokenAccountant.from_env()
+
+
+def main():
+    """Dry-run estimate of the embedding and translation budgets: [project_path]"""
+    project_path = sys.argv[1] if len(sys.argv) > 1 else "ANDROID_APP"
+
+    print("🧮 Token Budget Estimate")
+    print("=" * 40)
+
+    from android_rag_processor import AndroidProjectRAGProcessor
+    processor = AndroidProjectRAGProcessor(project_path)
+    estimates = {"budgets": accountant.budgets()}
+    try:
+        estimates["rag"] = processor.preflight_embedding()
+    except BudgetExceededError as e:
+        print(f"❌ {e}")
+
+    from unified_store import unified_layout, unified_store_path
+    if os.path.exists(unified_store_path() if unified_layout() else "./component_vector_db"):
+        from kotlin_to_swift_translator import KotlinToSwiftTranslator
+        translator = KotlinToSwiftTranslator(project_path=project_path)
+        try:
+            estimates["translate"] = translator.preflight_translation()
+        except BudgetExceededError as e:
+            print(f"❌ {e}")
+
+    print(json.dumps(estimates, indent=2))
+
+
+if __name__ == "__main__":
+    main()
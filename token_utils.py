@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Token Utilities
+Token counting with tiktoken, falling back to a character-based estimate when
+tiktoken (or the model's encoding) is not available.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for code and English text
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """tiktoken encoding for a model, or None when tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.debug("tiktoken not installed, using character-based token estimates")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = "gpt-4") -> int:
+    """Number of tokens `text` uses for `model`."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model or "gpt-4")
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
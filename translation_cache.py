@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Translation Cache
+Disk-backed cache of Kotlin -> Swift translations keyed by prompt template
+version, component source, model and sampling parameters. Only the raw model
+output is stored; it is cleaned on every read, so sanitizer changes apply to
+cached translations too.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Dict, Optional
+
+from file_utils import atomic_write_text, sha256_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class TranslationCache:
+    """
+    Stores the raw LLM output per cache key as small JSON files,
+    sharded by the first two hex characters of the key.
+    """
+
+    def __init__(self, cache_dir: str = "./translation_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(template_version: str, component_type: str, source: str,
+                 model: str, temperature: float) -> str:
+        """Hash everything that influences the LLM output."""
+        payload = json.dumps([template_version, component_type, model, temperature, source])
+        return sha256_text(payload)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached entry (with the `raw` output) or None."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable translation cache entry {path}: {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def contains(self, key: str) -> bool:
+        """Whether an entry exists, without reading it or counting a hit or miss."""
+        return os.path.exists(self._entry_path(key))
+
+    def put(self, key: str, raw: str, **info) -> Dict:
+        """Store a raw translation. Extra keyword arguments are kept as entry metadata."""
+        entry = {"raw": raw, "created_at": time.time(), **info}
+        try:
+            atomic_write_text(self._entry_path(key), json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"Could not write translation cache entry {key}: {e}")
+        return entry
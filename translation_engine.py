@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Async Translation Engine
+Runs LLM translation calls concurrently with a bounded semaphore, token-bucket
+rate limiting and jittered exponential backoff on 429 / 5xx responses.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Iterable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket. Holds up to `capacity` tokens and refills at `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and take them."""
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status code of a provider exception."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    status = get_status_code(error)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if the provider sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncTranslationEngine:
+    """
+    Executes chat model calls with bounded concurrency, rate limiting and retries.
+    """
+
+    def __init__(self, concurrency: int = 4, requests_per_minute: float = 60,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Asyncio primitives are bound to an event loop, so each loop using the engine gets its own
+        self._primitives = weakref.WeakKeyDictionary()
+
+    def _ensure_primitives(self) -> Tuple[asyncio.Semaphore, TokenBucket]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._primitives:
+            self._primitives[loop] = (asyncio.Semaphore(self.concurrency),
+                                      TokenBucket(rate=self.requests_per_minute / 60.0, capacity=self.concurrency))
+        return self._primitives[loop]
+
+    def run_sync(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        """
+        Run `coroutine` to completion from synchronous code. Inside a running event loop
+        (e.g. a sync API called from an async pipeline) it runs on a fresh loop in a helper
+        thread, since asyncio.run cannot nest; that blocks the caller's loop until it is done,
+        so a warning names the coroutine to await instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        logger.warning(f"Sync translation API called inside a running event loop; the loop is blocked "
+                       f"until it finishes. Await {coroutine.__qualname__}() instead.")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than a Retry-After hint."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = get_retry_after(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def invoke(self, llm: Any, prompt: str) -> str:
+        """Call `llm.ainvoke(prompt)` under the concurrency and rate limits and return the text."""
+        return (await self.invoke_message(llm, prompt)).content
+
+    async def invoke_message(self, llm: Any, prompt: str) -> Any:
+        """Call `llm.ainvoke(prompt)` under the concurrency and rate limits, retrying transient errors."""
+        semaphore, bucket = self._ensure_primitives()
+
+        attempt = 0
+        while True:
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    return await llm.ainvoke(prompt)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable_error(e):
+                        raise
+                    delay = self._backoff_delay(attempt, e)
+                    attempt += 1
+                    logger.warning(f"Transient LLM error ({get_status_code(e) or type(e).__name__}), "
+                                   f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            # Sleep outside the semaphore so other requests can use the slot
+            await asyncio.sleep(delay)
+
+    async def run(self, jobs: Iterable[Tuple[str, Callable[[], Awaitable[Any]]]],
+                  on_complete: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Run job coroutines concurrently and call `on_complete(key, result)` as each one finishes.
+        Failed jobs are logged and left out of the results.
+        """
+        self._ensure_primitives()
+
+        async def run_job(key: str, job: Callable[[], Awaitable[Any]]):
+            try:
+                return key, await job(), None
+            except Exception as e:
+                return key, None, e
+
+        tasks = [asyncio.ensure_future(run_job(key, job)) for key, job in jobs]
+        results = {}
+        for next_done in asyncio.as_completed(tasks):
+            key, result, error = await next_done
+            if error is not None:
+                logger.error(f"Translation job {key} failed: {error}")
+                continue
+            results[key] = result
+            if on_complete:
+                on_complete(key, result)
+        return results
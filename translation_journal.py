@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Translation Journal
+Append-only checkpoint log of completed component translations, so an
+interrupted run can resume without re-paying for finished components.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Dict, Optional
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class TranslationJournal:
+    """
+    One JSON line per completed component: its id, the hash of its translation
+    inputs, the output path and the output hash. The last line for an id wins.
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self.entries: Dict[str, Dict] = {}
+
+    def load(self) -> Dict[str, Dict]:
+        """Read the journal, ignoring a torn last line from an interrupted write."""
+        self.entries = {}
+        if not os.path.exists(self.journal_path):
+            return self.entries
+
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt journal line {line_number} in {self.journal_path}")
+                    continue
+                self.entries[entry["component_id"]] = entry
+
+        logger.info(f"Loaded {len(self.entries)} completed components from {self.journal_path}")
+        return self.entries
+
+    def completed(self, component_id: str, input_hash: str) -> Optional[Dict]:
+        """The journal entry if the component was translated from the same inputs and its output still exists."""
+        entry = self.entries.get(component_id)
+        if not entry or entry.get("input_hash") != input_hash:
+            return None
+        if not os.path.exists(entry.get("output_path", "")):
+            return None
+        return entry
+
+    def record(self, component_id: str, input_hash: str, output_path: str, output_hash: str):
+        """Append a completed component and flush it to disk immediately."""
+        entry = {
+            "component_id": component_id,
+            "input_hash": input_hash,
+            "output_path": output_path,
+            "output_hash": output_hash,
+            "completed_at": time.time(),
+        }
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[component_id] = entry
+
+    def compact(self):
+        """Rewrite the journal with only the latest entry per component."""
+        lines = "".join(json.dumps(entry) + "\n" for entry in self.entries.values())
+        atomic_write_text(self.journal_path, lines)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Unified Store
+One persistent Chroma collection for everything the pipeline embeds, divided
+into logical namespaces: chunks (the project's file chunks), structure (the
+file structure tree) and components (classified Kotlin chunks). A record is
+stored and embedded once and can belong to several namespaces, each keeping
+its own metadata under `<namespace>.` keys: a component shares the vector of
+the chunk it came from, and the tree document is embedded once instead of
+twice. Queries spanning namespaces are a single round trip, and every user in
+the process shares one client. Enabled with STORE_LAYOUT=unified.
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from telemetry import telemetry
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NAMESPACES = ("chunks", "structure", "components")
+COLLECTION_NAME = "android_rag"
+# Records written per Chroma call (Chroma rejects batches above its max_batch_size)
+BATCH_SIZE = 1000
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def unified_layout() -> bool:
+    """True when the pipeline keeps everything in the unified store (STORE_LAYOUT=unified)."""
+    return os.getenv("STORE_LAYOUT", "separate").lower() == "unified"
+
+
+def unified_store_path() -> str:
+    return os.getenv("UNIFIED_STORE_PATH", "./rag_store")
+
+
+def record_id(metadata: Dict[str, Any]) -> str:
+    """Stable id of a chunk (its file and position), so every namespace refers to the same record."""
+    return f"{metadata.get('file_path', '')}::{metadata.get('chunk_index', 0)}"
+
+
+def record_chunk_index(record: str) -> int:
+    """Chunk index encoded in a `record_id`."""
+    index = record.rpartition("::")[2]
+    return int(index) if index.isdigit() else 0
+
+
+def chunk_counts(metadatas: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """File id -> current chunk count, from full (not yet compacted) chunk metadata."""
+    return {meta["file_id"]: meta.get("total_chunks", 1) for meta in metadatas if "file_id" in meta}
+
+
+def namespace_flag(namespace: str) -> str:
+    """Metadata key marking a record as a member of `namespace`."""
+    if namespace not in NAMESPACES:
+        raise ValueError(f"Unknown namespace: {namespace} (expected one of {', '.join(NAMESPACES)})")
+    return f"ns_{namespace}"
+
+
+def namespace_key(namespace: str, key: str) -> str:
+    """Metadata key under which `namespace` stores its own `key`, so namespaces never overwrite each other."""
+    return f"{namespace}.{key}"
+
+
+def _scoped_where(namespace: str, where: Dict) -> List[Dict]:
+    """`where` as a list of single-key clauses on `namespace`'s metadata keys."""
+    clauses = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            clauses.append({key: [_merge_clauses(_scoped_where(namespace, clause)) for clause in value]})
+        else:
+            clauses.append({namespace_key(namespace, key): value})
+    return clauses
+
+
+def _merge_clauses(clauses: List[Dict]) -> Dict:
+    # Chroma takes one key per filter dict, so several clauses are combined with $and
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def namespace_where(namespaces: Iterable[str], where: Optional[Dict] = None) -> Dict:
+    """A Chroma where filter matching records of any of `namespaces` whose own metadata matches `where`."""
+    clauses = [_merge_clauses([{namespace_flag(namespace): True}] + (_scoped_where(namespace, where) if where else []))
+               for namespace in namespaces]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def namespace_metadata(metadata: Optional[Dict[str, Any]], namespaces: Iterable[str]) -> Dict[str, Any]:
+    """A stored record's metadata as seen by the first of `namespaces` it belongs to."""
+    metadata = metadata or {}
+    for namespace in namespaces:
+        if metadata.get(namespace_flag(namespace)):
+            prefix = namespace_key(namespace, "")
+            return {key[len(prefix):]: value for key, value in metadata.items() if key.startswith(prefix)}
+    return {}
+
+
+def _client(path: str) -> Any:
+    """The process-wide Chroma client of `path`."""
+    import chromadb
+
+    path = os.path.abspath(path)
+    with _clients_lock:
+        if path not in _clients:
+            _clients[path] = chromadb.PersistentClient(path=path)
+        return _clients[path]
+
+
+class UnifiedStore:
+    """
+    The single namespaced store. Records are keyed by `record_id`; each namespace a record
+    belongs to sets an `ns_<namespace>` flag and keeps its metadata under `<namespace>.` keys.
+    Reads return the metadata of the namespace queried, without the prefix.
+    """
+
+    def __init__(self, path: Optional[str] = None, embeddings: Any = None):
+        self.path = path or unified_store_path()
+        self.embeddings = embeddings
+        self.collection = _client(self.path).get_or_create_collection(COLLECTION_NAME)
+
+    def namespace(self, namespace: str) -> "NamespaceView":
+        namespace_flag(namespace)
+        return NamespaceView(self, namespace)
+
+    def add(self, namespace: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]],
+            embeddings: Optional[List[List[float]]] = None) -> List[List[float]]:
+        """
+        Put records into `namespace`. A record already stored with the same text only gains the
+        namespace or replaces its metadata there, reusing the stored vector. New or changed texts are embedded
+        (unless `embeddings` are given) and replace the stored record. Returns every record's vector.
+        """
+        vectors = []
+        for start in range(0, len(ids), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            vectors.extend(self._add_batch(namespace, ids[start:end], texts[start:end], metadatas[start:end],
+                                           embeddings[start:end] if embeddings is not None else None))
+        return vectors
+
+    def _add_batch(self, namespace: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]],
+                   embeddings: Optional[List[List[float]]]) -> List[List[float]]:
+        flag = namespace_flag(namespace)
+        prefix = namespace_key(namespace, "")
+        stored = self.collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        stored_vectors = stored["embeddings"] if stored["embeddings"] is not None else []
+        known = {record: (text, meta, vector) for record, text, meta, vector
+                 in zip(stored["ids"], stored["documents"], stored["metadatas"], stored_vectors)}
+
+        vectors: List[Optional[List[float]]] = [None] * len(ids)
+        shared_ids, shared_metadatas, new = [], [], []
+        for index, (record, text, meta) in enumerate(zip(ids, texts, metadatas)):
+            entry = known.get(record)
+            if entry is not None and entry[0] == text:
+                shared_ids.append(record)
+                # Chroma merges updated metadata: keys this namespace no longer sets are removed with None
+                own = {namespace_key(namespace, key): value for key, value in meta.items()}
+                dropped = {key: None for key in (entry[1] or {}) if key.startswith(prefix) and key not in own}
+                shared_metadatas.append({**dropped, **own, flag: True})
+                vectors[index] = list(entry[2])
+            else:
+                new.append(index)
+
+        if new:
+            if embeddings is not None:
+                new_vectors = [embeddings[index] for index in new]
+            else:
+                with telemetry.timer("embedding_seconds", store="unified"):
+                    new_vectors = self.embeddings.embed_documents([texts[index] for index in new])
+            for index, vector in zip(new, new_vectors):
+                vectors[index] = vector
+            # A changed text invalidates what other namespaces said about the record
+            changed = [ids[index] for index in new if ids[index] in known]
+            with telemetry.timer("store_write_seconds", store="unified"):
+                if changed:
+                    self.collection.delete(ids=changed)
+                self.collection.add(ids=[ids[index] for index in new], embeddings=new_vectors,
+                                    documents=[texts[index] for index in new],
+                                    metadatas=[{**{namespace_key(namespace, key): value
+                                                   for key, value in metadatas[index].items()}, flag: True}
+                                               for index in new])
+        if shared_ids:
+            with telemetry.timer("store_write_seconds", store="unified"):
+                self.collection.update(ids=shared_ids, metadatas=shared_metadatas)
+            telemetry.incr("unified_store_shared_records", len(shared_ids), namespace=namespace)
+        return vectors
+
+    def prune(self, namespace: str, counts: Dict[int, int]) -> int:
+        """
+        Drop from `namespace` the records of re-ingested files (file id -> current chunk count, see
+        `chunk_counts`) at or past their chunk count, left over from a longer earlier version.
+        Safe to call per batch, since a file's remaining chunks are not touched. Returns the records dropped.
+        """
+        if not counts:
+            return 0
+        stored = self.collection.get(where=namespace_where([namespace], {"file_id": {"$in": list(counts)}}),
+                                     include=["metadatas"])
+        stale = [(record, meta) for record, meta in zip(stored["ids"], stored["metadatas"])
+                 if record_chunk_index(record) >= counts.get((meta or {}).get(namespace_key(namespace, "file_id")), 0)]
+        self._leave(namespace, stale)
+        return len(stale)
+
+    def remove_files(self, file_ids: List[int]) -> int:
+        """Delete every record, in any namespace, of files that no longer exist. Returns the records deleted."""
+        if not file_ids:
+            return 0
+        stored = self.collection.get(where=namespace_where(NAMESPACES, {"file_id": {"$in": list(file_ids)}}),
+                                     include=[])
+        with telemetry.timer("store_write_seconds", store="unified"):
+            for start in range(0, len(stored["ids"]), BATCH_SIZE):
+                self.collection.delete(ids=stored["ids"][start:start + BATCH_SIZE])
+        return len(stored["ids"])
+
+    def _leave(self, namespace: str, records: List[Tuple[str, Optional[Dict[str, Any]]]]):
+        """Take `records` (id, stored metadata) out of `namespace`, deleting those left in no namespace."""
+        flag = namespace_flag(namespace)
+        prefix = namespace_key(namespace, "")
+        orphans, kept_ids, kept_metadatas = [], [], []
+        for record, meta in records:
+            meta = meta or {}
+            if any(meta.get(namespace_flag(other)) for other in NAMESPACES if other != namespace):
+                kept_ids.append(record)
+                kept_metadatas.append({key: None for key in meta if key == flag or key.startswith(prefix)})
+            else:
+                orphans.append(record)
+        with telemetry.timer("store_write_seconds", store="unified"):
+            for start in range(0, len(orphans), BATCH_SIZE):
+                self.collection.delete(ids=orphans[start:start + BATCH_SIZE])
+            for start in range(0, len(kept_ids), BATCH_SIZE):
+                self.collection.update(ids=kept_ids[start:start + BATCH_SIZE],
+                                       metadatas=kept_metadatas[start:start + BATCH_SIZE])
+
+    def get(self, namespaces: Iterable[str], where: Optional[Dict] = None, ids: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Records of any of `namespaces`, in the shape of Chroma's get()."""
+        namespaces = list(namespaces)
+        result = self.collection.get(ids=ids, where=namespace_where(namespaces, where), limit=limit, offset=offset,
+                                     include=include or ["documents", "metadatas"])
+        if result.get("metadatas") is not None:
+            result["metadatas"] = [namespace_metadata(meta, namespaces) for meta in result["metadatas"]]
+        return result
+
+    def similarity_search(self, query: str, k: int = 4, namespaces: Iterable[str] = ("chunks",),
+                          where: Optional[Dict] = None) -> List[Document]:
+        """The `k` records nearest to `query` across all of `namespaces`, in one query."""
+        from langchain_core.documents import Document
+
+        namespaces = list(namespaces)
+        vector = self.embeddings.embed_query(query)
+        result = self.collection.query(query_embeddings=[vector], n_results=k,
+                                       where=namespace_where(namespaces, where),
+                                       include=["documents", "metadatas"])
+        return [Document(page_content=text, metadata=namespace_metadata(meta, namespaces))
+                for text, meta in zip(result["documents"][0], result["metadatas"][0])]
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        """Records in `namespace`, or in the whole store."""
+        if namespace is None:
+            return self.collection.count()
+        return len(self.collection.get(where=namespace_where([namespace]), include=[])["ids"])
+
+
+class NamespaceView:
+    """One namespace of the store, with the part of the LangChain Chroma interface the pipeline uses."""
+
+    def __init__(self, store: UnifiedStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]],
+            embeddings: Optional[List[List[float]]] = None) -> List[List[float]]:
+        return self.store.add(self.namespace, ids, texts, metadatas, embeddings)
+
+    def prune(self, counts: Dict[int, int]) -> int:
+        return self.store.prune(self.namespace, counts)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self.store.get([self.namespace], where=where, ids=ids, limit=limit, offset=offset, include=include)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+        return self.store.similarity_search(query, k=k, namespaces=[self.namespace], where=filter)
+
+    def count(self) -> int:
+        return self.store.count(self.namespace)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Workflow State
+Make-style bookkeeping for the workflow steps. Each step declares its input
+files, the environment settings it depends on, its upstream steps and its
+outputs; a step is skipped when none of those changed since it last ran and its
+outputs were not modified by anything else.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from file_utils import atomic_write_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 1
+
+# Directories that never influence a step's result
+IGNORED_DIRECTORIES = {".git", ".gradle", ".idea", "build", "__pycache__"}
+
+
+def fingerprint_path(path: str) -> str:
+    """
+    Cheap content fingerprint of a file or directory tree from paths, sizes and
+    modification times only; no file is read. Missing paths have their own fingerprint.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+    entries = []
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRECTORIES:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append(f"{os.path.relpath(entry.path, path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    entries.sort()
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+
+class StepSpec:
+    """What a workflow step depends on and what it produces."""
+
+    def __init__(self, name: str, inputs: Iterable[str] = (), config: Iterable[str] = (),
+                 upstream: Iterable[str] = (), outputs: Iterable[str] = ()):
+        self.name = name
+        self.inputs = list(inputs)
+        self.config = list(config)
+        self.upstream = list(upstream)
+        self.outputs = list(outputs)
+
+
+class WorkflowState:
+    """
+    Persistent record of each step's input hash and output fingerprints, plus the
+    fingerprint every output path had after the last step that wrote it.
+    """
+
+    def __init__(self, state_path: str = "./.workflow_state.json"):
+        self.state_path = state_path
+        self.steps: Dict[str, Dict] = {}
+        self.artifacts: Dict[str, str] = {}
+
+    def load(self) -> "WorkflowState":
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get("version") == STATE_FORMAT_VERSION:
+            self.steps = data.get("steps", {})
+            self.artifacts = data.get("artifacts", {})
+        return self
+
+    def save(self):
+        atomic_write_text(self.state_path, json.dumps(
+            {"version": STATE_FORMAT_VERSION, "steps": self.steps, "artifacts": self.artifacts}, indent=2
+        ))
+
+    def input_hash(self, spec: StepSpec) -> str:
+        """Hash of everything the step's result depends on."""
+        parts = {
+            "inputs": {path: fingerprint_path(path) for path in spec.inputs},
+            "config": {name: os.getenv(name) for name in spec.config},
+            # Upstream outputs as they were when the upstream step produced them
+            "upstream": {name: self.steps.get(name, {}).get("outputs") for name in spec.upstream},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def is_current(self, spec: StepSpec, input_hash: str) -> bool:
+        """True when the step already ran with these inputs and nothing touched its outputs since."""
+        previous = self.steps.get(spec.name)
+        if not previous or previous.get("input_hash") != input_hash:
+            return False
+        return all(self.artifacts.get(path) == fingerprint_path(path) and self.artifacts[path] != "missing"
+                   for path in spec.outputs)
+
+    def record(self, spec: StepSpec, input_hash: str):
+        """Remember a successful run of the step and the outputs it left behind."""
+        outputs = {path: fingerprint_path(path) for path in spec.outputs}
+        self.steps[spec.name] = {"input_hash": input_hash, "outputs": outputs}
+        self.artifacts.update(outputs)
+        self.save()
+
+    def invalidate(self, names: Optional[List[str]] = None):
+        """Forget steps (all when `names` is None) so they run again."""
+        for name in list(self.steps) if names is None else names:
+            self.steps.pop(name, None)
+        self.save()